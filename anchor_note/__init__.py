@@ -2,8 +2,27 @@
 
 __version__ = "0.1.0"
 
-# Expose key top-level conveniences for consumers
-from .core import scheduler as scheduler  # noqa: E402,F401
-from .core import checklist as checklist  # noqa: E402,F401
-from .core import alerts as alerts        # noqa: E402,F401
-from .core import calendar_sync as calendar_sync  # noqa: E402,F401
+# Expose key top-level conveniences for consumers. Submodules are imported on first
+# attribute access, so `import anchor_note` (and the CLI) doesn't pay for the scheduler,
+# calendar libraries or audio/notification backends up front.
+_LAZY_MODULES = {
+    "scheduler": ".core.scheduler",
+    "checklist": ".core.checklist",
+    "alerts": ".core.alerts",
+    "calendar_sync": ".core.calendar_sync",
+}
+
+
+def __getattr__(name):
+    target = _LAZY_MODULES.get(name)
+    if target is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    module = importlib.import_module(target, __name__)
+    globals()[name] = module
+    return module
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_MODULES))
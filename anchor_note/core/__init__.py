@@ -1,6 +1,32 @@
 """Core subpackage"""
 
-from .scheduler import Scheduler, init_db  # noqa: F401
-from .checklist import list_pending_tasks, mark_task_done  # noqa: F401
-from .alerts import notify_and_alert, stop_alert_for_task  # noqa: F401
-from .calendar_sync import sync_from_ics, sync_from_caldav_nextcloud, sync_from_google_calendar  # noqa: F401
+# name -> submodule; resolved on first access (see anchor_note/__init__.py)
+_LAZY = {
+    "Scheduler": "scheduler",
+    "init_db": "scheduler",
+    "count_pending": "checklist",
+    "list_pending_tasks": "checklist",
+    "mark_task_done": "checklist",
+    "notify_and_alert": "alerts",
+    "stop_alert_for_task": "alerts",
+    "sync_from_ics": "calendar_sync",
+    "sync_from_caldav_nextcloud": "calendar_sync",
+    "sync_from_google_calendar": "calendar_sync",
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -3,45 +3,62 @@ alerts.py
 
 Notification + repeating sound control.
 
-- notify_and_alert(task_id, title, red_flag, config)
-    -> shows desktop notification and starts repeating audio alert (if red_flag)
+- notify_and_alert(task_id, title, red_flag, config, repeat=False)
+    -> queues a desktop notification (see notifications.py; never blocks the caller)
+       and starts repeating audio alert (if red_flag); repeat=True marks a scheduled
+       repeat, which the per-task notification rate limit lets through
 - stop_alert_for_task(task_id) -> stops repeating alert
+- escalate(task_id, title, config) -> extra channel for an escalated alert: runs
+  escalation_command, if set (no shell; "{title}" and "{task_id}" are filled in)
+
+Repeats and escalation are scheduled by the Scheduler; each repeat calls
+notify_and_alert() again with the level's sound settings in config.
+
+plyer and pygame (via utils.audio) are imported on the first alert, not at import time.
 """
 
 import threading
 import logging
-from plyer import notification
-from ..utils.audio import RepeatingAlert
 from .settings import load_user_config
+from .notifications import get_dispatcher
 
 LOG = logging.getLogger(__name__)
 
 # keep registry of active alerts
-_ACTIVE: dict[int, RepeatingAlert] = {}
+_ACTIVE: dict = {}  # task_id -> RepeatingAlert
 _LOCK = threading.Lock()
 
-def notify_and_alert(task_id: int, title: str, red_flag: int, config: dict | None = None):
+def notify_and_alert(task_id: int, title: str, red_flag: int, config: dict | None = None, repeat: bool = False):
     cfg = (config or load_user_config()).copy()
-    # show desktop notification (non-blocking)
+    # show desktop notification (queued; delivered by the dispatcher thread)
     try:
-        notification.notify(title=f"Due: {title}", message="Open checklist to mark done.", timeout=10)
+        get_dispatcher().submit(int(task_id), title, cfg, repeat=repeat)
     except Exception:
-        LOG.exception("desktop notification failed")
+        LOG.exception("queueing desktop notification failed")
 
     if red_flag:
         # start repeating sound alert
         sound_file = cfg.get("sound_file")
         burst = int(cfg.get("red_alert_burst_seconds", 30))
         interval = int(cfg.get("red_alert_repeat_seconds", 120))
+        volume = float(cfg.get("red_alert_volume", 1.0))
         try:
-            ra = RepeatingAlert(sound_file=sound_file, burst_seconds=burst, repeat_interval_seconds=interval)
+            from ..utils.audio import RepeatingAlert
+            # cheap handle: the shared audio engine coalesces all active alerts into one cycle
+            ra = RepeatingAlert(sound_file=sound_file, burst_seconds=burst, repeat_interval_seconds=interval,
+                                volume=volume)
             with _LOCK:
+                prev = _ACTIVE.get(int(task_id))
+                if prev is not None and prev.key == ra.key:
+                    return  # a repeat at the same level: the sound cycle keeps its own rhythm
                 _ACTIVE[int(task_id)] = ra
+            if prev:
+                prev.stop()
             ra.start()
         except Exception:
             LOG.exception("failed starting repeating alert for task %s", task_id)
 
-def stop_alert_for_task(task_id: int):
+def stop_alert_for_task(task_id: int) -> bool:
     with _LOCK:
         ra = _ACTIVE.pop(int(task_id), None)
     if ra:
@@ -49,3 +66,16 @@ def stop_alert_for_task(task_id: int):
             ra.stop()
         except Exception:
             LOG.exception("failed stopping alert %s", task_id)
+    return ra is not None
+
+def escalate(task_id: int, title: str, config: dict | None = None):
+    command = (config or load_user_config()).get("escalation_command")
+    if not command:
+        return
+    import shlex
+    import subprocess
+    try:
+        args = [a.format(title=title, task_id=task_id) for a in shlex.split(command)]
+        subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except Exception:
+        LOG.exception("escalation command failed for task %s", task_id)
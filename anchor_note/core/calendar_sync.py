@@ -2,143 +2,425 @@
 calendar_sync.py
 
 Minimal calendar sync utilities:
-- sync_from_ics(path): parses local .ics and upserts into core DB
+- sync_from_ics(path): streams a local .ics and upserts changed events into core DB
 - sync_from_caldav_nextcloud(url, username, password, calendar_name): optional, uses caldav lib
 - sync_from_google_calendar(client_secrets_file, token_file, calendar_id): optional, uses google-api libs
 
-All sync functions call upsert_task() in the scheduler module so the DB is consistent.
+All sync functions stream (uid, title, start_ts, end_ts, red_alert) rows into a writer
+(see writer.py): by default rows go straight to upsert_tasks() in the scheduler module as
+one batched DB transaction; the sync orchestrator passes a QueuedWriter instead so all
+sources share a single DB writer thread.
+
+Recurring ICS/CalDAV events (RRULE/RDATE) are not stored as one task: the series goes
+to recurrence.py, which materializes its occurrences inside a rolling lookahead window.
+Google needs none of that, since events().list(singleEvents=True) expands server-side.
 """
 
+import hashlib
 import logging
+import os
 from datetime import timezone, datetime, timedelta
 from pathlib import Path
 
 LOG = logging.getLogger(__name__)
 
 # local import to avoid circular import issues
-from .scheduler import upsert_task
-try:
-    from ics import Calendar
-except Exception:
-    Calendar = None
+from .retention import get_archived_etags
+from .scheduler import get_source_etags, get_sync_state
+from .writer import DIRECT_WRITER
+from .settings import load_user_config
+from .ics_stream import UnsupportedValue, iter_vevents, iter_vevents_from_text, parse_vtimezones, read_vtimezones
+from .recurrence import delete_series, occurrence_uid, series_spec, sync_series
+
+_RED_KEYWORDS = ("med", "medicine", "pill", "take")
+
+def _is_red(title: str) -> int:
+    return 1 if any(k in (title or "").lower() for k in _RED_KEYWORDS) else 0
+
+def _resolve(db_path: str | None, chunk_size: int | None):
+    """Read config once per sync (not per event) for the DB path and batch size."""
+    if db_path and chunk_size:
+        return db_path, chunk_size
+    cfg = load_user_config()
+    return db_path or cfg["db_path"], chunk_size or int(cfg.get("sync_batch_size", 500))
+
+def _recurrence_horizon(days: int | None) -> int:
+    """End of the window recurring events are expanded into."""
+    if days is None:
+        days = load_user_config().get("recurrence_lookahead_days", 14)
+    return int(datetime.now(timezone.utc).timestamp()) + int(days) * 86400
+
+def _ics_event_row(ev):
+    uid = getattr(ev, "uid", None) or f"{ev.begin}-{ev.name}"
+    title = ev.name or "No title"
+    try:
+        start_ts = int(ev.begin.astimezone(timezone.utc).timestamp()) if ev.begin else 0
+        end_ts = int(ev.end.astimezone(timezone.utc).timestamp()) if ev.end else start_ts
+    except Exception:
+        # fallback: not timezone-aware
+        start_ts = 0
+        end_ts = 0
+    return uid, title, start_ts, end_ts, _is_red(title)
 
-def sync_from_ics(path: str) -> int:
+def _fallback_row(ev, timezones: dict):
+    """Parse a single streamed event with the full `ics` library (unknown TZIDs etc.)."""
+    try:
+        from ics import Calendar  # slow to import; only needed for events the stream parser can't handle
+    except Exception:
+        LOG.warning("skipping event %s: needs the ics library", ev.uid)
+        return None
+    text = ("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//anchor-note//EN\r\n"
+            + "".join(timezones.get(t, "") for t in ev.tzids) + ev.text() + "END:VCALENDAR\r\n")
+    for e in Calendar(text).events:
+        return _ics_event_row(e)
+    return None
+
+def _iter_stream_rows(events, load_timezones, counter: dict, series: dict | None = None):
+    """Yield task rows for streamed events.
+
+    With a `series` collector ({"specs": [], "overrides": {}}), recurring masters are
+    collected as series specs instead of rows, and RECURRENCE-ID overrides become rows
+    keyed like the occurrence they replace."""
+    timezones = None  # VTIMEZONE blocks, loaded only if some event needs the fallback parser
+    for ev in events:
+        try:
+            title = ev.summary or "No title"
+            uid = ev.uid or f"{ev.get('DTSTART')}-{title}"
+            if series is not None:
+                rid_ts = ev.recurrence_id_ts()
+                if rid_ts is not None:
+                    series["overrides"].setdefault(uid, []).append(rid_ts)
+                    uid = occurrence_uid(uid, rid_ts)
+                else:
+                    try:
+                        spec = series_spec(ev, title, _is_red(title))
+                    except UnsupportedValue:
+                        LOG.warning("cannot expand recurrence of %s; storing it as a single task", uid)
+                        spec = None
+                    if spec is not None:
+                        series["specs"].append(spec)
+                        counter["n"] += 1
+                        continue
+            start_ts = ev.start_ts() or 0
+            end_ts = ev.end_ts() or start_ts
+            row = (uid, title, start_ts, end_ts, _is_red(title))
+        except UnsupportedValue:
+            try:
+                if timezones is None:
+                    timezones = load_timezones()
+                row = _fallback_row(ev, timezones)
+            except Exception:
+                LOG.exception("Failed to read event: %s", ev.uid)
+                continue
+            if row is None:
+                continue
+        counter["n"] += 1
+        yield row
+
+def _collected_specs(series: dict) -> list:
+    """Series specs with their RECURRENCE-ID overrides attached."""
+    for spec in series["specs"]:
+        spec["overrides"] = sorted(set(series["overrides"].get(spec["uid"], ())))
+    return series["specs"]
+
+def _row_etag(row) -> str:
+    """Content hash of the fields we store, used to skip unchanged events on re-sync."""
+    uid, title, start_ts, end_ts, red = row[:5]
+    return hashlib.sha1(f"{title}\x1f{start_ts}\x1f{end_ts}\x1f{red}".encode("utf-8")).hexdigest()
+
+def _iter_changed(rows, known: dict, seen: set, counter: dict, archived=None, batch_size: int = 500):
+    """Yield rows (with etag appended) whose content differs from what `known` has stored.
+
+    `archived(uids)` -> uid -> etag is asked, one batch of rows at a time, about the uids
+    `known` doesn't have."""
+    batch = []
+
+    def flush():
+        found = archived([r[0] for r, _ in batch if r[0] not in known]) if archived else {}
+        for row, etag in batch:
+            stored = known[row[0]] if row[0] in known else found.get(row[0])
+            if stored == etag:
+                continue
+            counter["changed"] += 1
+            yield (*row[:5], etag)
+        batch.clear()
+
+    for row in rows:
+        seen.add(row[0])
+        batch.append((row, _row_etag(row)))
+        if len(batch) >= batch_size:
+            yield from flush()
+    yield from flush()
+
+def _file_digest(p: Path) -> str:
+    h = hashlib.sha256()
+    with p.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def sync_from_ics(path: str, db_path: str | None = None, chunk_size: int | None = None, force: bool = False,
+                  use_mmap: bool = False, writer=None, recurrence_days: int | None = None) -> int:
     """Parse a local .ics file and upsert events into the tasks DB.
-    Returns number of events processed. Requires `ics` package."""
-    if not Calendar:
-        LOG.error("ics library not installed; sync_from_ics disabled.")
-        return 0
+
+    Incremental: the file is skipped when its mtime/size (or, failing that, content hash)
+    match the previous sync, and otherwise only added/modified events are written and
+    events no longer in the file are deleted. `force` re-reads the file regardless.
+
+    The file is streamed one VEVENT at a time (see ics_stream), so memory stays flat for
+    large exports; the `ics` package is only used for events the streaming reader can't
+    convert. Recurring events are expanded `recurrence_days` ahead (default: the
+    recurrence_lookahead_days setting). Returns number of events added or modified."""
     p = Path(path)
     if not p.exists():
         LOG.debug("ICS path does not exist: %s", path)
         return 0
-    with p.open("r", encoding="utf-8") as fh:
-        cal = Calendar(fh.read())
-    processed = 0
-    for ev in cal.events:
-        uid = getattr(ev, "uid", None) or f"{ev.begin}-{ev.name}"
-        title = ev.name or "No title"
-        try:
-            start_ts = int(ev.begin.astimezone(timezone.utc).timestamp()) if ev.begin else 0
-            end_ts = int(ev.end.astimezone(timezone.utc).timestamp()) if ev.end else start_ts
-        except Exception:
-            # fallback: not timezone-aware
-            start_ts = 0
-            end_ts = 0
-        red = 1 if any(k in (title or "").lower() for k in ("med","medicine","pill","take")) else 0
-        upsert_task(Path(__file__).parent.parent / "settings.py") if False else None  # no-op to avoid linter errors
-        # upsert_task expects db_path; we call module-level upsert_task using scheduler DB path
-        try:
-            # import scheduler config at runtime to avoid circular import
-            from .settings import load_user_config
-            db = load_user_config()["db_path"]
-            upsert_task(db, uid, title, start_ts, end_ts, red)
-            processed += 1
-        except Exception:
-            LOG.exception("Failed to upsert event: %s", uid)
-    LOG.info("ICS sync processed %d events", processed)
-    return processed
+    db_path, chunk_size = _resolve(db_path, chunk_size)
+    writer = writer or DIRECT_WRITER
+    source = "ics:" + os.path.abspath(path)
+    st = p.stat()
+    file_state = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    prev = get_sync_state(db_path, source) or {}
+    if not force and prev.get("mtime_ns") == st.st_mtime_ns and prev.get("size") == st.st_size:
+        LOG.debug("ICS file unchanged, skipping: %s", path)
+        return 0
+    file_state["sha256"] = _file_digest(p)
+    if not force and prev.get("sha256") == file_state["sha256"]:
+        # touched but not modified
+        writer.set_state(db_path, source, file_state)
+        return 0
+
+    known = get_source_etags(db_path, source)
+    seen = set()
+    counter = {"n": 0, "changed": 0}
+    series = {"specs": [], "overrides": {}}
+    try:
+        events = iter_vevents(p, use_mmap=use_mmap)
+        # archived (expired) events still in the file are unchanged, not new: don't revive them
+        rows = _iter_changed(_iter_stream_rows(events, lambda: read_vtimezones(p), counter, series), known,
+                             seen, counter, lambda uids: get_archived_etags(db_path, source, uids), chunk_size)
+        writer.upsert(db_path, rows, chunk_size=chunk_size, source=source)
+        removed = writer.delete(db_path, set(known) - seen)
+        counter["changed"] += writer.call(sync_series, db_path, source, _collected_specs(series),
+                                          _recurrence_horizon(recurrence_days))
+    except Exception:
+        LOG.exception("Failed to upsert events from %s", path)
+        return 0
+    writer.set_state(db_path, source, file_state)
+    LOG.info("ICS sync processed %d events (%d added/modified, %d removed)", counter["n"], counter["changed"], removed)
+    return counter["changed"]
 
 # Optional CalDAV adapter
-def sync_from_caldav_nextcloud(url, username=None, password=None, calendar_name=None):
+def _caldav_changes(coll, state: dict):
+    """Return ({href: etag} to fetch, [deleted hrefs], new sync token) relative to `state`.
+
+    Uses an RFC 6578 sync-collection REPORT with the stored token; if the token was
+    rejected it retries as an initial sync, and if the server has no sync-collection
+    support it diffs a PROPFIND etag listing against the stored etags instead."""
+    known = state.get("hrefs", {})
+    token = state.get("sync_token")
+    for attempt in ([token, None] if token else [None]):
+        try:
+            changed, deleted, new_token = coll.sync_collection(attempt)
+        except Exception as exc:
+            LOG.debug("sync-collection failed for %s (token=%s): %s", coll.url, bool(attempt), exc)
+            continue
+        if not attempt:
+            # full listing: anything we knew about that wasn't listed is gone
+            deleted = [h for h in known if h not in changed]
+        changed = {h: e for h, e in changed.items() if not e or known.get(h, {}).get("etag") != e}
+        return changed, deleted, new_token
+    listing = coll.list_etags()
+    changed = {h: e for h, e in listing.items() if not e or known.get(h, {}).get("etag") != e}
+    return changed, [h for h in known if h not in listing], None
+
+def _sync_caldav_collection(coll, db_path: str, chunk_size: int, counter: dict, writer=DIRECT_WRITER,
+                            recurrence_days: int | None = None):
+    source = "caldav:" + coll.url
+    state = get_sync_state(db_path, source) or {}
+    ctag, _ = coll.get_ctag()
+    if ctag and ctag == state.get("ctag") and "hrefs" in state:
+        LOG.debug("CalDAV calendar unchanged (ctag), skipping: %s", coll.url)
+        return
+    changed, deleted, new_token = _caldav_changes(coll, state)
+    hrefs = dict(state.get("hrefs", {}))
+    stale_uids = set()
+    for h in deleted:
+        stale_uids.update(hrefs.pop(h, {}).get("uids", []))
+    specs = []
+
+    def rows():
+        # stream multiget bodies straight into the batched upsert
+        for href, etag, data in coll.multiget(changed):
+            old = set(hrefs.get(href, {}).get("uids", []))
+            uids = []
+            series = {"specs": [], "overrides": {}}
+            events = iter_vevents_from_text(data)
+            for row in _iter_stream_rows(events, lambda: parse_vtimezones(data.splitlines()), counter, series):
+                uids.append(row[0])
+                yield (*row, _row_etag(row))
+            specs.extend(_collected_specs(series))
+            uids.extend(spec["uid"] for spec in series["specs"])
+            hrefs[href] = {"etag": etag or changed.get(href), "uids": uids}
+            stale_uids.update(old - set(uids))
+
+    writer.upsert(db_path, rows(), chunk_size=chunk_size, source=source)
+    removed = writer.delete(db_path, stale_uids)
+    # uids listed per href include series uids; dropping a series also drops its occurrences
+    removed += writer.call(delete_series, db_path, stale_uids)
+    writer.call(sync_series, db_path, source, specs, _recurrence_horizon(recurrence_days), False)
+    writer.set_state(db_path, source, {"ctag": ctag, "sync_token": new_token, "hrefs": hrefs})
+    LOG.info("CalDAV %s: %d changed resources, %d removed events", coll.url, len(changed), removed)
+
+def sync_from_caldav_nextcloud(url, username=None, password=None, calendar_name=None,
+                               db_path: str | None = None, chunk_size: int | None = None, writer=None,
+                               timeout: float | None = None, recurrence_days: int | None = None):
+    """Incrementally sync CalDAV calendars (e.g. Nextcloud) into the tasks DB.
+
+    Per calendar, the ctag and sync-token are kept in the sync_state table; unchanged
+    calendars are skipped, changed ones fetch only added/modified resources (one
+    calendar-multiget per batch) and tasks of deleted resources are removed.
+    Returns number of events added or modified."""
     try:
         from caldav import DAVClient
     except Exception:
         LOG.error("caldav library not installed; sync_from_caldav_nextcloud disabled")
         return 0
-    client = DAVClient(url, username=username, password=password)
+    from .webdav import CalendarCollection
+    db_path, chunk_size = _resolve(db_path, chunk_size)
+    client = DAVClient(url, username=username, password=password, timeout=timeout)
     principal = client.principal()
     cals = principal.calendars()
     if calendar_name:
-        cals = [c for c in cals if getattr(c, "name", "").lower() == calendar_name.lower()]
-    processed = 0
+        cals = [c for c in cals if (getattr(c, "name", "") or "").lower() == calendar_name.lower()]
+    counter = {"n": 0}
     for cal in cals:
-        for evobj in cal.events():
-            raw = evobj.data
-            try:
-                # try parsing with ics
-                if Calendar:
-                    c = Calendar(raw)
-                    for e in c.events:
-                        uid = getattr(e, "uid", None) or f"{e.begin}-{e.name}"
-                        title = e.name or "No title"
-                        start_ts = int(e.begin.astimezone(timezone.utc).timestamp()) if e.begin else 0
-                        end_ts = int(e.end.astimezone(timezone.utc).timestamp()) if e.end else start_ts
-                        red = 1 if any(k in (title or "").lower() for k in ("med","medicine","pill","take")) else 0
-                        from .settings import load_user_config
-                        upsert_task(load_user_config()["db_path"], uid, title, start_ts, end_ts, red)
-                        processed += 1
-                else:
-                    # fallback: skip if no ics parser
-                    processed += 0
-            except Exception:
-                LOG.exception("Failed parsing CalDAV event")
-    LOG.info("CalDAV sync processed %d events", processed)
-    return processed
+        try:
+            _sync_caldav_collection(CalendarCollection(client, cal.url), db_path, chunk_size, counter,
+                                    writer or DIRECT_WRITER, recurrence_days)
+        except Exception:
+            LOG.exception("CalDAV sync failed for %s", getattr(cal, "url", cal))
+    LOG.info("CalDAV sync processed %d events", counter["n"])
+    return counter["n"]
 
 # Optional Google Calendar sync (uses google-api-python-client)
-def sync_from_google_calendar(client_secrets_file, token_file="token.json", calendar_id="primary", lookahead_days=7):
+_GOOGLE_FIELDS = "nextPageToken,nextSyncToken,items(id,etag,status,summary,start,end)"
+_GOOGLE_PAGE_SIZE = 2500  # API maximum
+
+def _google_event_row(e):
+    uid = e.get('id')
+    title = e.get('summary', 'No title')
+    start = e.get('start', {}).get('dateTime') or (e.get('start', {}).get('date') + "T00:00:00Z")
+    end = e.get('end', {}).get('dateTime') or (e.get('end', {}).get('date') + "T00:00:00Z")
+    start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+    end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
+    start_ts = int(start_dt.astimezone(timezone.utc).timestamp())
+    end_ts = int(end_dt.astimezone(timezone.utc).timestamp())
+    return uid, title, start_ts, end_ts, _is_red(title), e.get('etag')
+
+def _is_gone(exc) -> bool:
+    """True for HTTP 410 Gone (expired syncToken) from googleapiclient's HttpError."""
+    status = getattr(getattr(exc, "resp", None), "status", None) or getattr(exc, "status_code", None)
+    return str(status) == "410"
+
+def _google_pages(service, **params):
+    """Yield each page of events().list, following nextPageToken."""
+    page_token = None
+    while True:
+        page = service.events().list(pageToken=page_token, **params).execute()
+        yield page
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return
+
+def _sync_google_events(service, calendar_id: str, db_path: str, chunk_size: int, lookahead_days: int,
+                        writer=DIRECT_WRITER) -> int:
+    source = f"google:{calendar_id}"
+    state = get_sync_state(db_path, source) or {}
+    now = datetime.now(timezone.utc)
+    token = state.get("sync_token")
+    # the initial fetch covers [now, now + lookahead]; deltas don't extend that window, so
+    # refresh it with a full sync once half of it has elapsed
+    if token and now.timestamp() > state.get("window_end", 0) - lookahead_days * 86400 / 2:
+        token = None
+    base = dict(calendarId=calendar_id, singleEvents=True, maxResults=_GOOGLE_PAGE_SIZE, fields=_GOOGLE_FIELDS)
+    if token:
+        params = dict(base, syncToken=token)
+        known = get_source_etags(db_path, source)
+    else:
+        window_end = now + timedelta(days=lookahead_days)
+        params = dict(base, timeMin=now.isoformat(), timeMax=window_end.isoformat())
+        # a full sync only speaks for the window, so only tasks ending inside it can be stale;
+        # later ones (added by deltas) are not listed and must not be deleted
+        known = get_source_etags(db_path, source, min_end_ts=int(now.timestamp()),
+                                 max_end_ts=int(window_end.timestamp()))
+    counter = {"n": 0}
+    seen, cancelled = set(), []
+    result = {}
+
+    def rows():
+        for page in _google_pages(service, **params):
+            for e in page.get('items', []):
+                if e.get('status') == 'cancelled':
+                    cancelled.append(e.get('id'))
+                    continue
+                try:
+                    row = _google_event_row(e)
+                except Exception:
+                    continue
+                seen.add(row[0])
+                if row[5] and known.get(row[0]) == row[5]:
+                    continue
+                counter["n"] += 1
+                yield row
+            if page.get('nextSyncToken'):
+                result["sync_token"] = page['nextSyncToken']
+
     try:
-        from google.oauth2.credentials import Credentials
-        from google_auth_oauthlib.flow import InstalledAppFlow
-        from googleapiclient.discovery import build
-    except Exception:
-        LOG.error("google client libs not installed; sync_from_google_calendar disabled")
-        return 0
+        writer.upsert(db_path, rows(), chunk_size=chunk_size, source=source)
+    except Exception as exc:
+        if token and _is_gone(exc):
+            LOG.info("Google sync token expired for %s; doing a full resync", calendar_id)
+            writer.set_state(db_path, source, None)
+            return _sync_google_events(service, calendar_id, db_path, chunk_size, lookahead_days, writer)
+        raise
+    stale = set(cancelled) if token else (set(known) - seen) | set(cancelled)
+    removed = writer.delete(db_path, stale)
+    new_state = {"sync_token": result.get("sync_token"),
+                 "window_end": state.get("window_end", 0) if token else int(window_end.timestamp())}
+    writer.set_state(db_path, source, new_state)
+    LOG.info("Google Calendar %s (%s): %d added/modified, %d removed", calendar_id,
+             "delta" if token else "full", counter["n"], removed)
+    return counter["n"]
+
+def sync_from_google_calendar(client_secrets_file, token_file="token.json", calendar_id="primary", lookahead_days=7,
+                              db_path: str | None = None, chunk_size: int | None = None, service=None, writer=None):
+    """Sync a Google calendar into the tasks DB.
 
-    SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
-    creds = None
-    if Path(token_file).exists():
-        creds = Credentials.from_authorized_user_file(token_file, SCOPES)
-    if not creds or not creds.valid:
-        flow = InstalledAppFlow.from_client_secrets_file(client_secrets_file, SCOPES)
-        creds = flow.run_local_server(port=0)
-        with open(token_file, "w", encoding="utf-8") as fh:
-            fh.write(creds.to_json())
-
-    service = build('calendar', 'v3', credentials=creds)
-    now = datetime.utcnow().isoformat() + 'Z'
-    max_time = (datetime.utcnow() + timedelta(days=lookahead_days)).isoformat() + 'Z'
-    events_result = service.events().list(calendarId=calendar_id, timeMin=now, timeMax=max_time,
-                                          singleEvents=True, orderBy='startTime').execute()
-    events = events_result.get('items', [])
-    processed = 0
-    from .settings import load_user_config
-    db = load_user_config()["db_path"]
-    for e in events:
-        uid = e.get('id')
-        title = e.get('summary', 'No title')
-        start = e.get('start', {}).get('dateTime') or (e.get('start', {}).get('date') + "T00:00:00Z")
-        end = e.get('end', {}).get('dateTime') or (e.get('end', {}).get('date') + "T00:00:00Z")
+    The first run (and a periodic window refresh) lists the next `lookahead_days` page by
+    page; the returned nextSyncToken is stored in sync_state so later runs only fetch
+    deltas. An expired token (HTTP 410) falls back to a full resync. `service` may be a
+    prebuilt calendar v3 service (skips the OAuth flow). Returns number of events
+    added or modified."""
+    if service is None:
         try:
-            start_dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
-            end_dt = datetime.fromisoformat(end.replace("Z", "+00:00"))
-            start_ts = int(start_dt.astimezone(timezone.utc).timestamp())
-            end_ts = int(end_dt.astimezone(timezone.utc).timestamp())
+            from google.oauth2.credentials import Credentials
+            from google_auth_oauthlib.flow import InstalledAppFlow
+            from googleapiclient.discovery import build
         except Exception:
-            continue
-        red = 1 if any(k in (title or "").lower() for k in ("med","medicine","pill","take")) else 0
-        upsert_task(db, uid, title, start_ts, end_ts, red)
-        processed += 1
-    LOG.info("Google Calendar sync processed %d events", processed)
-    return processed
+            LOG.error("google client libs not installed; sync_from_google_calendar disabled")
+            return 0
+
+        SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
+        creds = None
+        if Path(token_file).exists():
+            creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+        if not creds or not creds.valid:
+            flow = InstalledAppFlow.from_client_secrets_file(client_secrets_file, SCOPES)
+            creds = flow.run_local_server(port=0)
+            with open(token_file, "w", encoding="utf-8") as fh:
+                fh.write(creds.to_json())
+        service = build('calendar', 'v3', credentials=creds)
+
+    db_path, chunk_size = _resolve(db_path, chunk_size)
+    return _sync_google_events(service, calendar_id, db_path, chunk_size, int(lookahead_days), writer or DIRECT_WRITER)
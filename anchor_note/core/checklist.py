@@ -3,31 +3,117 @@ checklist.py
 
 Thin layer providing checklist operations backed by the scheduler's SQLite DB.
 This allows UI layers (gui_agent, kivy_app) to read pending tasks and mark them done.
+
+Reads go through a TaskView per DB: the pending rows are loaded once and reused until
+db.change_token() reports a write, so a UI polling every few seconds costs one
+PRAGMA per poll while nothing changes. Task dicts convert "start"/"end" to local
+datetimes only when a caller reads them.
+
+- list_pending_tasks() -> list of task dicts (cached, treat as read-only)
+- count_pending() -> number of pending tasks
+- get_view(db_path=None) -> the TaskView for db_path (default: the configured DB)
 """
 
+import threading
+from datetime import datetime, timezone
+
+from .alerts import stop_alert_for_task
+from .db import change_token, get_connection
 from .settings import load_user_config
 from .scheduler import get_pending_tasks, mark_done as _mark_done
-from datetime import datetime, timezone
+
+
+def _local_dt(ts):
+    return datetime.fromtimestamp(ts, tz=timezone.utc).astimezone() if ts else None
+
+
+class TaskDict(dict):
+    """Task dict whose "start"/"end" datetimes are built on first access."""
+
+    _LAZY = {"start": "start_ts", "end": "end_ts"}
+
+    def __missing__(self, key):
+        src = self._LAZY.get(key)
+        if src is None:
+            raise KeyError(key)
+        value = self[key] = _local_dt(self[src])
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
+def _task(row) -> TaskDict:
+    task_id, uid, title, start_ts, end_ts, status, red_alert = row
+    return TaskDict(id=int(task_id), uid=uid, title=title, start_ts=start_ts, end_ts=end_ts,
+                    status=status, red=bool(red_alert))
+
+
+class TaskView:
+    """Read-through cache of one DB's pending tasks."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._token = None
+        self._tasks = None
+        self._count = None
+
+    def _check(self):
+        # called with self._lock held: drop cached results if the DB changed
+        token = change_token(self.db_path)
+        if token != self._token:
+            self._token = token
+            self._tasks = None
+            self._count = None
+
+    def snapshot(self) -> tuple:
+        """Pending tasks as an immutable tuple of TaskDicts (shared between callers)."""
+        with self._lock:
+            self._check()
+            if self._tasks is None:
+                self._tasks = tuple(_task(r) for r in get_pending_tasks(self.db_path))
+                self._count = len(self._tasks)
+            return self._tasks
+
+    def count_pending(self) -> int:
+        with self._lock:
+            self._check()
+            if self._count is None:
+                # uses the partial pending index; no rows are loaded
+                con = get_connection(self.db_path)
+                self._count = con.execute("SELECT count(*) FROM tasks WHERE status!='done'").fetchone()[0]
+            return self._count
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+
+
+_VIEWS: dict[str, TaskView] = {}
+_VIEWS_LOCK = threading.Lock()
+
+
+def get_view(db_path: str | None = None) -> TaskView:
+    db_path = db_path or load_user_config()["db_path"]
+    with _VIEWS_LOCK:
+        view = _VIEWS.get(db_path)
+        if view is None:
+            view = _VIEWS[db_path] = TaskView(db_path)
+        return view
+
 
 def list_pending_tasks():
-    cfg = load_user_config()
-    rows = get_pending_tasks(cfg["db_path"])
-    out = []
-    for r in rows:
-        task_id, uid, title, start_ts, end_ts, status, red_alert = r
-        start = datetime.fromtimestamp(start_ts, tz=timezone.utc).astimezone() if start_ts else None
-        end = datetime.fromtimestamp(end_ts, tz=timezone.utc).astimezone() if end_ts else None
-        out.append({
-            "id": int(task_id),
-            "uid": uid,
-            "title": title,
-            "start": start,
-            "end": end,
-            "status": status,
-            "red": bool(red_alert),
-        })
-    return out
+    return list(get_view().snapshot())
+
+def count_pending() -> int:
+    return get_view().count_pending()
 
 def mark_task_done(task_id: int):
     cfg = load_user_config()
     _mark_done(cfg["db_path"], int(task_id))
+    # also when no Scheduler runs in this process to hear the "done" event
+    stop_alert_for_task(int(task_id))
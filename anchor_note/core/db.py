@@ -0,0 +1,132 @@
+"""
+db.py
+
+Shared SQLite connection layer for the tasks DB.
+
+Connections are opened once per (thread, db_path) and reused by every helper, instead
+of a connect/commit/close cycle per statement. Each connection is configured with:
+- WAL journaling, so the GUI / Kivy / service readers don't block the sync writer
+- synchronous=NORMAL (safe with WAL, one fsync per checkpoint instead of per commit)
+- a busy timeout, so concurrent writers wait instead of failing with "database is locked"
+- a larger prepared-statement cache (sqlite3 caches compiled statements per connection)
+- incremental auto-vacuum for newly created DB files
+
+- get_connection(db_path) -> this thread's connection for db_path
+- transaction(db_path) -> context manager yielding a connection; commits or rolls back
+- close_connections(db_path=None) -> close pooled connections (all threads)
+- change_token(db_path) -> value that changes whenever the DB was written (by this
+  process or another); used to invalidate read caches (see checklist.TaskView)
+"""
+
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+
+class _Connection(sqlite3.Connection):
+    # subclass so connections can be tracked in a WeakSet and carry their pool key
+    db_key = ""
+    closed = False
+    serial = 0
+
+
+_local = threading.local()
+_ALL = weakref.WeakSet()
+_ALL_LOCK = threading.Lock()
+_SERIAL = itertools.count(1)
+_WRITES: dict[str, int] = {}  # committed transactions per DB in this process
+
+
+def _key(db_path) -> str:
+    return os.path.abspath(str(db_path))
+
+
+def _open(db_path: str) -> sqlite3.Connection:
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    new = not Path(db_path).exists()
+    con = sqlite3.connect(
+        db_path,
+        timeout=BUSY_TIMEOUT_MS / 1000.0,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # owned by one thread; close_connections may run elsewhere
+        factory=_Connection,
+    )
+    con.db_key = _key(db_path)
+    con.serial = next(_SERIAL)
+    try:
+        if new:
+            # only takes effect before the first table exists; lets retention.py return freed
+            # pages to the OS with incremental_vacuum instead of a full VACUUM
+            con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        con.execute(f"PRAGMA busy_timeout={int(BUSY_TIMEOUT_MS)}")
+    except sqlite3.DatabaseError:
+        # e.g. read-only media or a locked DB during startup; defaults still work
+        LOG.warning("could not apply pragmas to %s", db_path, exc_info=True)
+    return con
+
+
+def get_connection(db_path) -> sqlite3.Connection:
+    """Return the calling thread's pooled connection for db_path, opening it on first use."""
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    key = _key(db_path)
+    con = conns.get(key)
+    if con is None or con.closed:
+        con = conns[key] = _open(str(db_path))
+        with _ALL_LOCK:
+            _ALL.add(con)
+    return con
+
+
+@contextmanager
+def transaction(db_path):
+    """Yield the pooled connection inside a transaction (commit on success, rollback on error)."""
+    con = get_connection(db_path)
+    with con:
+        yield con
+    key = con.db_key
+    with _ALL_LOCK:
+        _WRITES[key] = _WRITES.get(key, 0) + 1
+
+
+def change_token(db_path) -> tuple:
+    """Cheap "has the DB changed?" check, without reading any table.
+
+    PRAGMA data_version changes when another connection (any thread or process) commits,
+    but not for the connection's own commits; those are counted by transaction(). The
+    connection is part of the token because data_version is only comparable on the same one.
+    """
+    con = get_connection(db_path)
+    version = con.execute("PRAGMA data_version").fetchone()[0]
+    with _ALL_LOCK:
+        writes = _WRITES.get(con.db_key, 0)
+    return con.serial, version, writes
+
+
+def close_connections(db_path=None):
+    """Close pooled connections for db_path (or all DBs) across all threads.
+
+    Other threads notice the closed flag and reopen on their next get_connection().
+    """
+    key = _key(db_path) if db_path is not None else None
+    with _ALL_LOCK:
+        targets = [c for c in _ALL if key is None or c.db_key == key]
+    for con in targets:
+        con.closed = True
+        try:
+            con.close()
+        except Exception:
+            LOG.exception("failed closing connection to %s", con.db_key)
@@ -0,0 +1,112 @@
+"""
+deadlines.py
+
+In-memory deadline engine used by the Scheduler.
+
+Tasks are kept in a min-heap keyed on end_ts so the scheduler can sleep exactly
+until the next task is due instead of rescanning the tasks table:
+
+- push(task_id, end_ts, title, red_alert) -> add or reschedule a task
+- discard(task_id) -> forget a task (done / removed)
+- pop_due(now) -> list of (task_id, end_ts, title, red_alert) that are due
+- wait(timeout) -> block until the timeout expires or the queue changes
+
+Stale heap entries left behind by reschedules are skipped lazily on pop.
+"""
+
+import heapq
+import threading
+import time
+
+
+class DeadlineQueue:
+    def __init__(self):
+        self._heap: list[tuple[int, int, int]] = []  # (end_ts, seq, task_id)
+        self._entries: dict[int, tuple[int, int, str, int]] = {}  # task_id -> (seq, end_ts, title, red)
+        self._seq = 0
+        self._changed = False
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._entries)
+
+    def __contains__(self, task_id):
+        with self._cond:
+            return int(task_id) in self._entries
+
+    def push(self, task_id: int, end_ts: int, title: str, red_alert: int = 0):
+        """Add a task, or update it if already queued. Wakes waiters when the head moves."""
+        task_id = int(task_id)
+        end_ts = int(end_ts)
+        with self._cond:
+            cur = self._entries.get(task_id)
+            if cur and cur[1] == end_ts:
+                # same deadline: refresh metadata only, heap position is unchanged
+                self._entries[task_id] = (cur[0], end_ts, title, int(red_alert))
+                return
+            self._seq += 1
+            self._entries[task_id] = (self._seq, end_ts, title, int(red_alert))
+            heapq.heappush(self._heap, (end_ts, self._seq, task_id))
+            if self._heap[0][1] == self._seq:
+                self._changed = True
+                self._cond.notify_all()
+            self._compact()
+
+    def discard(self, task_id: int):
+        with self._cond:
+            self._entries.pop(int(task_id), None)
+            self._compact()
+
+    def clear(self):
+        with self._cond:
+            self._heap.clear()
+            self._entries.clear()
+            self._changed = True
+            self._cond.notify_all()
+
+    def next_due(self) -> int | None:
+        """end_ts of the earliest queued task, or None when the queue is empty."""
+        with self._cond:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_ts: float | None = None) -> list[tuple[int, int, str, int]]:
+        now_ts = time.time() if now_ts is None else now_ts
+        due = []
+        with self._cond:
+            while self._heap and self._heap[0][0] <= now_ts:
+                end_ts, seq, task_id = heapq.heappop(self._heap)
+                cur = self._entries.get(task_id)
+                if not cur or cur[0] != seq:
+                    continue
+                del self._entries[task_id]
+                due.append((task_id, end_ts, cur[2], cur[3]))
+        return due
+
+    def wait(self, timeout: float | None):
+        """Sleep up to `timeout` seconds; returns early when an earlier deadline is pushed or wake() is called."""
+        with self._cond:
+            if not self._changed:
+                self._cond.wait(timeout=None if timeout is None else max(0.0, timeout))
+            self._changed = False
+
+    def wake(self):
+        with self._cond:
+            self._changed = True
+            self._cond.notify_all()
+
+    # internal (caller holds the lock)
+    def _drop_stale(self):
+        while self._heap:
+            end_ts, seq, task_id = self._heap[0]
+            cur = self._entries.get(task_id)
+            if cur and cur[0] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    def _compact(self):
+        # rebuild when stale entries dominate so reschedule-heavy syncs don't grow the heap
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._entries):
+            self._heap = [(e[1], e[0], tid) for tid, e in self._entries.items()]
+            heapq.heapify(self._heap)
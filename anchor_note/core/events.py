@@ -0,0 +1,98 @@
+"""
+events.py
+
+Task event stream pushed to GUI agents.
+
+Instead of re-sending every overdue task on a timer, the service publishes an event
+only when a task changes state. Every event carries a monotonically increasing "seq";
+the last `capacity` events are kept in a ring buffer so a client reconnecting with its
+last seen seq gets only what it missed (or None -> the caller sends a snapshot).
+
+- EventStream(capacity).publish(type, **fields) -> event dict with "type" and "seq"
+- EventStream.since(last_seq, epoch=None) -> events after last_seq, or None if they
+  are no longer buffered (or the stream was restarted: different epoch)
+- task_fields(row) -> event fields for a tasks row
+- task_listener(stream, db_path) -> scheduler task listener translating DB changes into
+  "alert" / "updated" / "done" / "removed" events
+"""
+
+import logging
+import os
+import threading
+import uuid
+from collections import deque
+from itertools import islice
+
+LOG = logging.getLogger(__name__)
+
+
+class EventStream:
+    def __init__(self, capacity: int = 1024):
+        # changes on every service start, so a client can't resume against a new sequence
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self._buffer = deque(maxlen=max(1, int(capacity)))
+        self._subscribers = []
+        # held while publishing; hold it to hand a client a replay/snapshot with no event
+        # slipping in between the replay and the live stream
+        self.lock = threading.RLock()
+
+    def subscribe(self, fn):
+        with self.lock:
+            if fn not in self._subscribers:
+                self._subscribers.append(fn)
+
+    def unsubscribe(self, fn):
+        with self.lock:
+            if fn in self._subscribers:
+                self._subscribers.remove(fn)
+
+    def publish(self, type: str, **fields) -> dict:
+        with self.lock:
+            self.seq += 1
+            event = {"type": type, "seq": self.seq, **fields}
+            self._buffer.append(event)
+            for fn in self._subscribers:
+                try:
+                    fn(event)
+                except Exception:
+                    LOG.exception("event subscriber failed")
+        return event
+
+    def since(self, last_seq: int, epoch: str | None = None) -> list | None:
+        with self.lock:
+            if epoch is not None and epoch != self.epoch:
+                return None
+            if last_seq > self.seq or last_seq < 0:
+                return None
+            if last_seq == self.seq:
+                return []
+            oldest = self._buffer[0]["seq"]
+            if last_seq + 1 < oldest:
+                return None  # fell out of the ring buffer
+            return list(islice(self._buffer, last_seq + 1 - oldest, None))
+
+
+def task_fields(row) -> dict:
+    task_id, uid, title, start_ts, end_ts, status, red_alert = row
+    return {"task_id": int(task_id), "uid": uid, "title": title, "start_ts": int(start_ts or 0),
+            "end_ts": int(end_ts or 0), "status": status, "red": 1 if red_alert else 0}
+
+
+def task_listener(stream: EventStream, db_path: str):
+    """Scheduler task listener (see scheduler.add_task_listener) publishing to stream."""
+    target = os.path.abspath(db_path)
+
+    def on_change(path, event, payload):
+        if os.path.abspath(path) != target:
+            return
+        if event == "upsert":
+            stream.publish("updated", **task_fields(payload))
+        elif event == "due":
+            stream.publish("alert", **payload)
+        elif event == "done":
+            stream.publish("done", task_id=int(payload))
+        elif event == "delete":
+            stream.publish("removed", task_id=int(payload))
+
+    return on_change
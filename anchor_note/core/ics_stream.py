@@ -0,0 +1,263 @@
+"""
+ics_stream.py
+
+Streaming, low-memory VEVENT reader for large .ics exports.
+
+Instead of loading the whole file and building a full `ics` object model, the file is
+read line by line (optionally through an mmap), RFC 5545 folded lines are unfolded on
+the fly, and each VEVENT is yielded as a lightweight IcsEvent as soon as its END line
+is seen. Only the properties the sync needs are interpreted; events we can't convert
+ourselves (unknown TZID, odd values) are flagged so the caller can hand just that one
+event to the `ics` library.
+
+- iter_unfolded_lines(lines) -> unfolded text lines from an iterable of raw (bytes) lines
+- iter_vevents(path, use_mmap=False) -> IcsEvent records from a file
+- iter_vevents_from_text(text) -> IcsEvent records from an in-memory string (CalDAV bodies)
+- read_vtimezones(path) / parse_vtimezones(lines) -> TZID -> VTIMEZONE text, for fallback parsing
+"""
+
+import logging
+import mmap
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # pragma: no cover - python < 3.9
+    ZoneInfo = None
+
+LOG = logging.getLogger(__name__)
+
+# properties kept on each event; everything else is skipped while scanning
+_KEEP = {"UID", "SUMMARY", "DTSTART", "DTEND", "DURATION", "SEQUENCE", "LAST-MODIFIED",
+         "RRULE", "RDATE", "EXDATE", "RECURRENCE-ID", "STATUS"}
+
+_DURATION_RE = re.compile(
+    r"^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+
+class UnsupportedValue(ValueError):
+    """Raised when a property can't be converted without the full `ics` parser."""
+
+
+class IcsEvent:
+    __slots__ = ("props", "raw", "tzids")
+
+    def __init__(self, props: dict, raw: list, tzids: set):
+        self.props = props  # NAME -> list of (params dict, value)
+        self.raw = raw      # unfolded lines BEGIN:VEVENT..END:VEVENT, for fallback parsing
+        self.tzids = tzids  # TZIDs referenced by the event
+
+    def get(self, name: str, default=None):
+        vals = self.props.get(name)
+        return vals[0][1] if vals else default
+
+    def params(self, name: str) -> dict:
+        vals = self.props.get(name)
+        return vals[0][0] if vals else {}
+
+    @property
+    def uid(self):
+        return self.get("UID")
+
+    @property
+    def summary(self):
+        s = self.get("SUMMARY")
+        return unescape_text(s) if s is not None else None
+
+    @property
+    def sequence(self) -> int:
+        try:
+            return int(self.get("SEQUENCE", 0))
+        except ValueError:
+            return 0
+
+    def start_ts(self) -> int | None:
+        return self._ts("DTSTART")
+
+    def recurrence_id_ts(self) -> int | None:
+        """Start of the occurrence this event overrides (RECURRENCE-ID), if any."""
+        return self._ts("RECURRENCE-ID")
+
+    def end_ts(self) -> int | None:
+        """DTEND, else DTSTART + DURATION, else DTSTART."""
+        end = self._ts("DTEND")
+        if end is not None:
+            return end
+        start = self.start_ts()
+        dur = self.get("DURATION")
+        if start is not None and dur:
+            return start + int(parse_duration(dur).total_seconds())
+        return start
+
+    def _ts(self, name):
+        vals = self.props.get(name)
+        if not vals:
+            return None
+        params, value = vals[0]
+        return int(parse_datetime(value, params).timestamp())
+
+    def text(self) -> str:
+        return "\r\n".join(self.raw) + "\r\n"
+
+
+def unescape_text(value: str) -> str:
+    out = []
+    it = iter(value)
+    for ch in it:
+        if ch == "\\":
+            nxt = next(it, "")
+            out.append("\n" if nxt in ("n", "N") else nxt)
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def parse_duration(value: str) -> timedelta:
+    m = _DURATION_RE.match(value.strip())
+    if not m:
+        raise UnsupportedValue(f"bad DURATION {value!r}")
+    parts = {k: int(v) for k, v in m.groupdict().items() if v and k != "sign"}
+    td = timedelta(weeks=parts.get("weeks", 0), days=parts.get("days", 0), hours=parts.get("hours", 0),
+                   minutes=parts.get("minutes", 0), seconds=parts.get("seconds", 0))
+    return -td if m.group("sign") == "-" else td
+
+
+def parse_datetime(value: str, params: dict | None = None) -> datetime:
+    """Convert a DATE / DATE-TIME value to an aware datetime.
+
+    DATE values are midnight UTC (same convention as the Google adapter), floating
+    times are local time, and TZID values need zoneinfo to know the zone."""
+    params = params or {}
+    value = value.strip()
+    try:
+        if params.get("VALUE") == "DATE" or len(value) == 8:
+            return datetime.strptime(value[:8], "%Y%m%d").replace(tzinfo=timezone.utc)
+        if value.endswith("Z"):
+            return datetime.strptime(value[:15], "%Y%m%dT%H%M%S").replace(tzinfo=timezone.utc)
+        naive = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    except ValueError:
+        raise UnsupportedValue(f"bad date-time {value!r}") from None
+    tzid = params.get("TZID")
+    if tzid:
+        if ZoneInfo is None:
+            raise UnsupportedValue("zoneinfo unavailable")
+        try:
+            return naive.replace(tzinfo=ZoneInfo(tzid.strip('"')))
+        except Exception:
+            raise UnsupportedValue(f"unknown TZID {tzid!r}") from None
+    return naive.astimezone()
+
+
+def _split_property(line: str):
+    """'NAME;P1=a;P2="b:c":value' -> ('NAME', {'P1': 'a', 'P2': 'b:c'}, 'value')."""
+    in_quotes = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            in_quotes = not in_quotes
+        elif ch == ":" and not in_quotes:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return None
+    name, _, rest = head.partition(";")
+    params = {}
+    if rest:
+        for part in re.findall(r'(?:[^;"]|"[^"]*")+', rest):
+            k, _, v = part.partition("=")
+            params[k.upper()] = v.strip('"')
+    return name.upper(), params, value
+
+
+def iter_unfolded_lines(lines):
+    """Unfold RFC 5545 continuation lines (leading space / tab) from raw bytes or str lines."""
+    cur = None
+    for raw in lines:
+        if isinstance(raw, bytes):
+            raw = raw.decode("utf-8", errors="replace")
+        raw = raw.rstrip("\r\n")
+        if raw[:1] in (" ", "\t"):
+            if cur is not None:
+                cur += raw[1:]
+            continue
+        if cur is not None:
+            yield cur
+        cur = raw
+    if cur is not None and cur != "":
+        yield cur
+
+
+def iter_vevents_from_lines(lines):
+    """Yield an IcsEvent per VEVENT from raw lines; nested components (VALARM) are skipped."""
+    depth = 0       # nesting inside the current VEVENT (VALARM etc.)
+    props = None
+    raw = None
+    tzids = None
+    for line in iter_unfolded_lines(lines):
+        upper = line[:12].upper()
+        if props is None:
+            if upper.startswith("BEGIN:VEVENT"):
+                props, raw, tzids, depth = {}, [line], set(), 0
+            continue
+        raw.append(line)
+        if upper.startswith("BEGIN:"):
+            depth += 1
+            continue
+        if upper.startswith("END:"):
+            if depth:
+                depth -= 1
+                continue
+            yield IcsEvent(props, raw, tzids)
+            props = raw = tzids = None
+            continue
+        if depth:
+            continue
+        parsed = _split_property(line)
+        if not parsed:
+            continue
+        name, params, value = parsed
+        if name in _KEEP:
+            props.setdefault(name, []).append((params, value))
+            if "TZID" in params:
+                tzids.add(params["TZID"])
+
+
+def iter_vevents(path, use_mmap: bool = False):
+    """Stream IcsEvent records from an .ics file without reading it into memory."""
+    p = Path(path)
+    with p.open("rb") as fh:
+        if use_mmap and p.stat().st_size:
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from iter_vevents_from_lines(iter(mm.readline, b""))
+        else:
+            yield from iter_vevents_from_lines(fh)
+
+
+def iter_vevents_from_text(text: str):
+    return iter_vevents_from_lines(text.splitlines())
+
+
+def read_vtimezones(path) -> dict:
+    """TZID -> raw VTIMEZONE text, used to give fallback-parsed events their zone."""
+    with Path(path).open("rb") as fh:
+        return parse_vtimezones(fh)
+
+
+def parse_vtimezones(lines) -> dict:
+    out = {}
+    cur = None
+    for line in iter_unfolded_lines(lines):
+        upper = line.upper()
+        if upper.startswith("BEGIN:VTIMEZONE"):
+            cur = [line]
+        elif cur is not None:
+            cur.append(line)
+            if upper.startswith("END:VTIMEZONE"):
+                tzid = next((l.split(":", 1)[1] for l in cur if l.upper().startswith("TZID")), None)
+                if tzid:
+                    out[tzid] = "\r\n".join(cur) + "\r\n"
+                cur = None
+    return out
@@ -0,0 +1,154 @@
+"""
+notifications.py
+
+Desktop notifications sent off the scheduler thread.
+
+notify_and_alert() only queues a notification here; one dispatcher thread delivers it:
+- bursts are coalesced: everything submitted within notify_coalesce_seconds of the
+  first item goes out as one popup ("7 tasks due") instead of seven
+- per-task rate limit: a task notified less than notify_min_interval_seconds ago is
+  not notified again (re-syncs, quick snoozes)
+- the backend call (plyer) runs on a helper thread with notify_timeout_seconds; a call
+  that hangs is abandoned and, while it is still stuck, later popups are dropped rather
+  than piling up more stuck threads
+
+- NotificationDispatcher(backend).submit(task_id, title, config, repeat) -> False if rate-limited
+  (scheduled repeats of an alert pass repeat=True and are not rate-limited)
+- get_dispatcher() -> the shared, lazily started dispatcher
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from ..utils import metrics, profiling
+
+LOG = logging.getLogger(__name__)
+
+_SENT = metrics.counter("anchor_notifications_total", "Notifications by outcome")
+
+MAX_PENDING = 1000
+MAX_LISTED_TITLES = 5
+
+
+def plyer_notify(title: str, message: str):
+    from plyer import notification  # slow import; only needed once something is due
+
+    notification.notify(title=title, message=message, timeout=10)
+
+
+class NotificationDispatcher:
+    def __init__(self, backend=None):
+        self.backend = backend or plyer_notify
+        self._cond = threading.Condition()
+        self._pending = deque()      # (task_id, title, submitted_at)
+        self._last_sent = {}         # task_id -> monotonic time of its last notification
+        self._settings = (1.0, 60.0, 5.0)  # coalesce, min interval, timeout (from the last submit)
+        self._inflight = None        # backend call thread that timed out and hasn't returned yet
+        self._thread = None
+        self._stopping = False
+
+    def submit(self, task_id: int, title: str, config: dict | None = None, repeat: bool = False) -> bool:
+        now = time.monotonic()
+        cfg = config or {}
+        with self._cond:
+            self._settings = (float(cfg.get("notify_coalesce_seconds", 1.0)),
+                              float(cfg.get("notify_min_interval_seconds", 60)),
+                              float(cfg.get("notify_timeout_seconds", 5)))
+            last = self._last_sent.get(task_id)
+            if not repeat and last is not None and now - last < self._settings[1]:
+                _SENT.inc(result="rate_limited")
+                return False
+            if len(self._pending) >= MAX_PENDING:
+                self._pending.popleft()
+                _SENT.inc(result="dropped")
+            self._pending.append((task_id, title, now))
+            self._last_sent[task_id] = now
+            self._ensure_thread()
+            self._cond.notify()
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+
+    def _ensure_thread(self):
+        # called with self._cond held
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="anchor-note-notify")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                # hold the first item for the coalesce window so a burst leaves as one popup
+                coalesce = self._settings[0]
+                deadline = self._pending[0][2] + coalesce
+                while not self._stopping and time.monotonic() < deadline:
+                    self._cond.wait(deadline - time.monotonic())
+                batch = list(self._pending)
+                self._pending.clear()
+                timeout = self._settings[2]
+                self._prune(time.monotonic())
+            self._deliver(batch, timeout)
+
+    def _prune(self, now):
+        # called with self._cond held; keeps _last_sent from growing with every task ever seen
+        if len(self._last_sent) > 1024:
+            interval = self._settings[1]
+            self._last_sent = {t: ts for t, ts in self._last_sent.items() if now - ts < interval}
+
+    def _deliver(self, batch, timeout: float):
+        if len(batch) == 1:
+            title, message = f"Due: {batch[0][1]}", "Open checklist to mark done."
+        else:
+            titles = [t for _, t, _ in batch[:MAX_LISTED_TITLES]]
+            more = len(batch) - len(titles)
+            title = f"{len(batch)} tasks due"
+            message = ", ".join(titles) + (f" and {more} more" if more > 0 else "")
+            _SENT.inc(len(batch) - 1, result="coalesced")
+        if self._inflight is not None and self._inflight.is_alive():
+            LOG.warning("notification backend still stuck; dropping %r", title)
+            _SENT.inc(result="dropped")
+            return
+        self._inflight = None
+        failed = []
+
+        def call():
+            try:
+                with profiling.slow_op("notify", count=len(batch)):
+                    self.backend(title, message)
+            except Exception as exc:
+                failed.append(exc)
+
+        worker = threading.Thread(target=call, daemon=True, name="anchor-note-notify-call")
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            LOG.warning("notification backend did not return within %.1fs", timeout)
+            self._inflight = worker
+            _SENT.inc(result="timeout")
+        elif failed:
+            LOG.error("desktop notification failed: %s", failed[0])
+            _SENT.inc(result="error")
+        else:
+            _SENT.inc(result="sent")
+
+
+_DISPATCHER = None
+_DISPATCHER_LOCK = threading.Lock()
+
+
+def get_dispatcher() -> NotificationDispatcher:
+    global _DISPATCHER
+    with _DISPATCHER_LOCK:
+        if _DISPATCHER is None:
+            _DISPATCHER = NotificationDispatcher()
+        return _DISPATCHER
@@ -0,0 +1,244 @@
+"""
+recurrence.py
+
+RRULE / RDATE / EXDATE expansion for recurring calendar events.
+
+A recurring master event is stored once in the `recurrences` table as a series spec and
+its occurrences are materialized as ordinary task rows (uid "<series uid>#<start_ts>")
+only inside a rolling lookahead window. extend_recurrences() moves the window forward as
+time advances, expanding just the newly covered range; a series is only re-expanded from
+scratch when its content (UID + SEQUENCE + rule text) changes. Parsed rule sets are
+cached per UID + SEQUENCE, so periodic extension doesn't re-parse thousands of series.
+
+- series_spec(ev) -> spec dict for a streamed master VEVENT with RRULE/RDATE, else None
+- expand(spec, after_ts, until_ts) -> occurrence start timestamps in (after_ts, until_ts]
+- sync_series(db_path, source, specs, horizon_ts, complete=True) -> store/refresh series
+- extend_recurrences(db_path, horizon_ts) -> materialize occurrences up to horizon_ts
+- delete_series(db_path, uids) -> drop series and their pending occurrences
+"""
+
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from .ics_stream import UnsupportedValue, parse_datetime
+from .scheduler import upsert_tasks, delete_tasks, get_connection, transaction
+
+try:
+    from dateutil.rrule import rrulestr, rruleset
+except Exception:
+    rrulestr = rruleset = None
+
+LOG = logging.getLogger(__name__)
+
+# hard cap per series and window, so a MINUTELY/SECONDLY rule can't flood the DB
+MAX_OCCURRENCES = 2000
+OCCURRENCE_SOURCE_SUFFIX = "#rrule"
+
+
+def occurrence_uid(uid: str, start_ts: int) -> str:
+    return f"{uid}#{int(start_ts)}"
+
+
+def series_spec(ev, title: str, red_alert: int) -> dict | None:
+    """Build a series spec from a master VEVENT; None if the event doesn't recur.
+
+    Raises UnsupportedValue when the rule can't be expanded (caller then treats the
+    event as a single task)."""
+    if rrulestr is None or ev.props.get("RECURRENCE-ID"):
+        return None
+    if not ev.props.get("RRULE") and not ev.props.get("RDATE"):
+        return None
+    start, end = ev.start_ts(), ev.end_ts()
+    spec = {
+        "uid": ev.uid or f"{ev.get('DTSTART')}-{title}",
+        "sequence": ev.sequence,
+        "title": title,
+        "red": int(red_alert),
+        "dtstart": [ev.params("DTSTART"), ev.get("DTSTART")],
+        "duration": (end - start) if start is not None and end is not None else 0,
+        "rrule": [v for _, v in ev.props.get("RRULE", [])],
+        "rdate": [[p, v] for p, v in ev.props.get("RDATE", [])],
+        "exdate": [[p, v] for p, v in ev.props.get("EXDATE", [])],
+        "overrides": [],
+    }
+    _ruleset_for(spec)  # validate now, while the caller can still fall back
+    return spec
+
+
+def spec_etag(spec: dict) -> str:
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _naive_kind(params: dict, value: str):
+    """'date' / 'floating' for values expanded without a zone, None for aware ones."""
+    value = value.strip()
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return "date"
+    if not value.endswith("Z") and not params.get("TZID"):
+        return "floating"
+    return None
+
+
+def _parse(params: dict, value: str, kind):
+    if kind is None:
+        return parse_datetime(value, params)
+    try:
+        if len(value) == 8:
+            return datetime.strptime(value, "%Y%m%d")
+        return datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    except ValueError:
+        raise UnsupportedValue(f"bad date-time {value!r}") from None
+
+
+def _to_ts(dt, kind) -> int:
+    if kind == "date":
+        dt = dt.replace(tzinfo=timezone.utc)
+    elif kind == "floating":
+        dt = dt.astimezone()
+    return int(dt.timestamp())
+
+
+def _from_ts(ts, kind):
+    if kind == "date":
+        return datetime.fromtimestamp(ts, tz=timezone.utc).replace(tzinfo=None)
+    if kind == "floating":
+        return datetime.fromtimestamp(ts)
+    return datetime.fromtimestamp(ts, tz=timezone.utc)
+
+
+@lru_cache(maxsize=4096)
+def _ruleset(uid: str, sequence: int, etag: str, spec_json: str):
+    # keyed on UID + SEQUENCE (+ content hash, for servers that don't bump SEQUENCE)
+    spec = json.loads(spec_json)
+    params, value = spec["dtstart"]
+    kind = _naive_kind(params, value)
+    dtstart = _parse(params, value, kind)
+    rs = rruleset()
+    try:
+        for rule in spec["rrule"]:
+            # naive series: drop the UTC marker from UNTIL so dateutil accepts it
+            rs.rrule(rrulestr(rule, dtstart=dtstart, ignoretz=kind is not None))
+        for key, add in (("rdate", rs.rdate), ("exdate", rs.exdate)):
+            for p, v in spec[key]:
+                if p.get("VALUE") == "PERIOD":
+                    continue
+                for part in v.split(","):
+                    add(_parse(p, part, kind))
+    except (ValueError, TypeError) as exc:
+        raise UnsupportedValue(f"bad recurrence for {uid}: {exc}") from None
+    return rs, kind
+
+
+def _ruleset_for(spec: dict):
+    rule_part = {k: spec[k] for k in ("dtstart", "rrule", "rdate", "exdate")}
+    spec_json = json.dumps(rule_part, sort_keys=True)
+    return _ruleset(spec["uid"], int(spec.get("sequence", 0)), spec_etag(rule_part), spec_json)
+
+
+def expand(spec: dict, after_ts: int, until_ts: int) -> list:
+    """Occurrence start timestamps in (after_ts, until_ts], minus RECURRENCE-ID overrides."""
+    rs, kind = _ruleset_for(spec)
+    overrides = set(spec.get("overrides", ()))
+    out = []
+    for dt in rs.xafter(_from_ts(after_ts, kind), count=MAX_OCCURRENCES, inc=False):
+        ts = _to_ts(dt, kind)
+        if ts > until_ts:
+            break
+        if ts not in overrides:
+            out.append(ts)
+    return out
+
+
+def _occurrence_rows(spec, starts):
+    for ts in starts:
+        yield (occurrence_uid(spec["uid"], ts), spec["title"], ts, ts + int(spec["duration"]), spec["red"])
+
+
+def _pending_occurrences(con, uid: str, min_start_ts: int | None = None) -> list:
+    # '#' < '$', so [uid#, uid$) is exactly the occurrence uids, as an index range scan
+    sql = "SELECT uid FROM tasks WHERE uid >= ? AND uid < ? AND status!='done'"
+    args = [uid + "#", uid + "$"]
+    if min_start_ts is not None:
+        sql += " AND start_ts >= ?"
+        args.append(int(min_start_ts))
+    return [r[0] for r in con.execute(sql, args)]
+
+
+def sync_series(db_path: str, source: str, specs, horizon_ts: int, complete: bool = True,
+                now_ts: int | None = None) -> int:
+    """Store series from `source` and (re)materialize occurrences of new or changed ones.
+
+    Unchanged series are left alone (extend_recurrences moves their window). With
+    complete=True, `specs` is the full set for the source and missing series are removed.
+    Returns the number of occurrences written."""
+    now_ts = int(time.time()) if now_ts is None else int(now_ts)
+    con = get_connection(db_path)
+    existing = {uid: etag for uid, etag in con.execute("SELECT uid, etag FROM recurrences WHERE source=?", (source,))}
+    written = 0
+    seen = set()
+    for spec in specs:
+        uid = spec["uid"]
+        seen.add(uid)
+        etag = spec_etag(spec)
+        if existing.get(uid) == etag:
+            continue
+        try:
+            starts = expand(spec, now_ts, horizon_ts)
+        except UnsupportedValue:
+            LOG.warning("cannot expand recurring event %s", uid)
+            continue
+        keep = {occurrence_uid(uid, ts) for ts in starts} | {occurrence_uid(uid, ts) for ts in spec["overrides"]}
+        delete_tasks(db_path, [u for u in _pending_occurrences(con, uid, now_ts) if u not in keep])
+        written += upsert_tasks(db_path, _occurrence_rows(spec, starts), source=source + OCCURRENCE_SOURCE_SUFFIX)
+        with transaction(db_path) as c:
+            c.execute("INSERT OR REPLACE INTO recurrences(uid, source, sequence, etag, spec, expanded_until) "
+                      "VALUES (?, ?, ?, ?, ?, ?)",
+                      (uid, source, int(spec.get("sequence", 0)), etag, json.dumps(spec), int(horizon_ts)))
+    if complete:
+        delete_series(db_path, set(existing) - seen)
+    return written
+
+
+def extend_recurrences(db_path: str, horizon_ts: int, now_ts: int | None = None) -> int:
+    """Materialize occurrences for every series whose window ends before horizon_ts.
+
+    Only (expanded_until, horizon_ts] is expanded. Returns the number of occurrences written."""
+    now_ts = int(time.time()) if now_ts is None else int(now_ts)
+    con = get_connection(db_path)
+    rows = con.execute("SELECT uid, source, spec, expanded_until FROM recurrences WHERE expanded_until < ?",
+                       (int(horizon_ts),)).fetchall()
+    written = 0
+    done = []
+    for uid, source, spec_json, expanded_until in rows:
+        spec = json.loads(spec_json)
+        try:
+            starts = expand(spec, max(int(expanded_until or 0), now_ts), horizon_ts)
+        except UnsupportedValue:
+            LOG.warning("cannot expand recurring event %s", uid)
+            continue
+        if starts:
+            written += upsert_tasks(db_path, _occurrence_rows(spec, starts), source=source + OCCURRENCE_SOURCE_SUFFIX)
+        done.append((int(horizon_ts), uid))
+    if done:
+        with transaction(db_path) as c:
+            c.executemany("UPDATE recurrences SET expanded_until=? WHERE uid=?", done)
+    if written:
+        LOG.info("recurrence window extended: %d occurrences across %d series", written, len(done))
+    return written
+
+
+def delete_series(db_path: str, uids) -> int:
+    """Remove series (and their not-yet-done occurrences). Returns occurrences deleted."""
+    uids = list(uids)
+    if not uids:
+        return 0
+    con = get_connection(db_path)
+    occurrences = [u for uid in uids for u in _pending_occurrences(con, uid)]
+    removed = delete_tasks(db_path, occurrences)
+    with transaction(db_path) as c:
+        c.executemany("DELETE FROM recurrences WHERE uid=?", [(u,) for u in uids])
+    return removed
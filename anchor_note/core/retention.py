@@ -0,0 +1,177 @@
+"""
+retention.py
+
+Retention and compaction for the tasks DB.
+
+Done tasks older than retention_done_days (by completion time) and pending tasks more
+than retention_past_days past due are moved to the `tasks_archive` table, so the live
+table and its indexes only hold what the scheduler and UIs still look at. Rows move
+in small batches, each in its own short transaction, so sync writes and mark-done
+requests interleave with a long compaction instead of waiting for it. Afterwards free
+pages are returned to the OS with PRAGMA incremental_vacuum and the planner statistics
+are refreshed (PRAGMA optimize).
+
+- archive_batch(db_path, done_before, past_before, batch_size) -> rows archived
+- incremental_vacuum(db_path) -> bytes reclaimed
+- enable_incremental_vacuum(db_path) -> one-time full VACUUM converting a DB created
+  before auto_vacuum=INCREMENTAL; blocks writers while it runs, so only the
+  `anchor-note compact` command does it, never the scheduled job
+- get_archived_etags(db_path, source, uids) -> uid -> etag of those archived rows (so
+  syncs don't re-insert them)
+- run_maintenance(db_path, config, writer) -> stats dict; the orchestrator's daily job
+"""
+
+import logging
+import os
+import time
+
+from .scheduler import _MAX_SQL_VARS, _emit, get_connection, transaction
+from .settings import load_user_config
+from .writer import DIRECT_WRITER
+
+LOG = logging.getLogger(__name__)
+
+_ARCHIVE_COLUMNS = "id, uid, title, start_ts, end_ts, status, red_alert, source, etag, done_ts"
+VACUUM_STEP_PAGES = 1000   # pages freed per incremental_vacuum call (one short write each)
+BATCH_PAUSE_SECONDS = 0.05  # yield between batches so other writers get the lock
+
+
+def get_archived_etags(db_path: str, source: str, uids) -> dict:
+    """uid -> etag for the given uids archived from `source` (the archive is never purged,
+    so callers look up one batch at a time instead of loading it whole)."""
+    uids = list(uids)
+    con = get_connection(db_path)
+    found = {}
+    for i in range(0, len(uids), _MAX_SQL_VARS):
+        part = uids[i:i + _MAX_SQL_VARS]
+        marks = ",".join("?" * len(part))
+        found.update(con.execute(f"SELECT uid, etag FROM tasks_archive WHERE uid IN ({marks}) AND source=?",
+                                 (*part, source)))
+    return found
+
+
+def archive_batch(db_path: str, done_before: int | None, past_before: int | None, batch_size: int = 500) -> int:
+    """Move up to batch_size expired rows to tasks_archive in one transaction."""
+    con = get_connection(db_path)
+    ids = []
+    if done_before is not None:
+        ids += [r[0] for r in con.execute(
+            "SELECT id FROM tasks WHERE status='done' AND COALESCE(done_ts, end_ts) < ? LIMIT ?",
+            (int(done_before), int(batch_size)))]
+    pending = []
+    if past_before is not None and len(ids) < batch_size:
+        pending = [r[0] for r in con.execute(
+            "SELECT id FROM tasks WHERE status!='done' AND end_ts < ? AND end_ts > 0 ORDER BY end_ts LIMIT ?",
+            (int(past_before), int(batch_size) - len(ids)))]
+        ids += pending
+    if not ids:
+        return 0
+    now = int(time.time())
+    marks = ",".join("?" * len(ids))
+    with transaction(db_path) as c:
+        c.execute(f"INSERT INTO tasks_archive({_ARCHIVE_COLUMNS}, archived_ts) "
+                  f"SELECT {_ARCHIVE_COLUMNS}, ? FROM tasks WHERE id IN ({marks})", (now, *ids))
+        c.execute(f"DELETE FROM alert_state WHERE task_id IN ({marks})", ids)
+        c.execute(f"DELETE FROM tasks WHERE id IN ({marks})", ids)
+    for task_id in pending:
+        # still pending: let the scheduler drop its deadline/alert and clients their row
+        _emit(db_path, "delete", task_id)
+    return len(ids)
+
+
+def _db_bytes(con) -> int:
+    return con.execute("PRAGMA page_count").fetchone()[0] * con.execute("PRAGMA page_size").fetchone()[0]
+
+
+def incremental_vacuum(db_path: str, max_pages: int = VACUUM_STEP_PAGES) -> int:
+    """Release up to max_pages free pages; returns bytes reclaimed.
+
+    A no-op (0) on DB files created before incremental auto-vacuum was enabled; see
+    enable_incremental_vacuum()."""
+    con = get_connection(db_path)
+    if con.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        return 0
+    before = _db_bytes(con)
+    # frees one page per step; execute() would step once, executescript() runs it out
+    con.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+    return max(0, before - _db_bytes(con))
+
+
+def enable_incremental_vacuum(db_path: str) -> bool:
+    """Convert the DB to incremental auto-vacuum with a full VACUUM; False if it already is.
+
+    Holds an exclusive lock for the whole rewrite: run it while the service is stopped."""
+    con = get_connection(db_path)
+    if con.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+        return False
+    LOG.info("converting %s to incremental auto-vacuum (full VACUUM)", db_path)
+    con.commit()
+    con.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    con.execute("VACUUM")
+    return True
+
+
+def _incremental(db_path: str) -> bool:
+    return get_connection(db_path).execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def _free_pages(db_path: str) -> int:
+    return get_connection(db_path).execute("PRAGMA freelist_count").fetchone()[0]
+
+
+def _file_bytes(db_path: str) -> int:
+    return sum(os.path.getsize(p) for p in (db_path, db_path + "-wal") if os.path.exists(p))
+
+
+def _optimize(db_path: str):
+    con = get_connection(db_path)
+    con.execute("PRAGMA optimize")  # re-ANALYZEs only the tables whose statistics went stale
+    con.commit()
+
+
+def _checkpoint(db_path: str):
+    # truncate the WAL too, otherwise the bytes just moved out of the main file stay on disk
+    get_connection(db_path).execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def run_maintenance(db_path: str, config: dict | None = None, writer=None, now_ts: int | None = None) -> dict:
+    """Archive expired rows, reclaim free pages and refresh statistics.
+
+    Every DB write goes through `writer.call` (see writer.py), one batch at a time."""
+    cfg = config or load_user_config()
+    writer = writer or DIRECT_WRITER
+    now_ts = int(time.time()) if now_ts is None else int(now_ts)
+    done_days = float(cfg.get("retention_done_days", 30) or 0)
+    past_days = float(cfg.get("retention_past_days", 0) or 0)
+    batch = max(1, int(cfg.get("maintenance_batch_size", 500)))
+    done_before = now_ts - int(done_days * 86400) if done_days > 0 else None
+    past_before = now_ts - int(past_days * 86400) if past_days > 0 else None
+    size_before = _file_bytes(db_path)
+
+    archived = 0
+    while done_before is not None or past_before is not None:
+        n = writer.call(archive_batch, db_path, done_before, past_before, batch)
+        archived += n
+        if n < batch:
+            break
+        time.sleep(BATCH_PAUSE_SECONDS)
+
+    reclaimed = 0
+    if writer.call(_free_pages, db_path) and not writer.call(_incremental, db_path):
+        LOG.info("%s has free pages but predates incremental auto-vacuum; run `anchor-note compact` "
+                 "with the service stopped to reclaim them", db_path)
+    while True:
+        freed = writer.call(incremental_vacuum, db_path)
+        reclaimed += freed
+        if not freed or not writer.call(_free_pages, db_path):
+            break
+        time.sleep(BATCH_PAUSE_SECONDS)
+    writer.call(_optimize, db_path)
+    writer.call(_checkpoint, db_path)
+
+    size_after = _file_bytes(db_path)
+    stats = {"archived": archived, "bytes_reclaimed": reclaimed, "file_bytes_before": size_before,
+             "file_bytes_after": size_after}
+    LOG.info("DB maintenance: archived %d rows, reclaimed %d bytes (%d -> %d bytes on disk)",
+             archived, reclaimed, size_before, size_after)
+    return stats
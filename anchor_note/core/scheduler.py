@@ -3,137 +3,784 @@ scheduler.py
 
 Simple scheduler that:
 - keeps a local SQLite tasks DB (for pending/due tasks)
-- syncs calendar sources via calendar_sync
-- polls for due tasks and triggers alerts via alerts.notify_and_alert
+- syncs calendar sources in the background via sync_orchestrator / calendar_sync
+- keeps pending tasks in a deadline queue and sleeps until the next one is due,
+  then triggers alerts via alerts.notify_and_alert
+- queues tasks written by other processes too: upserts stamp rows with a change
+  counter (task_rev), re-read whenever db.change_token() moves
+- persists each alert's lifecycle (fired / acknowledged / snoozed) in the alert_state
+  table, so a restart restores ringing and snoozed alerts, keeps acknowledged ones
+  silent and catches up on missed ones a few at a time
+- repeats red alerts from the same deadline queue, escalating (shorter interval, louder
+  sound, escalation_command) after escalate_after_repeats, with snooze and repeat caps
 - exposes a lightweight Scheduler class with start/stop
 """
 
-from datetime import datetime, timezone
-import sqlite3
+import json
+import os
 from pathlib import Path
 import threading
 import time
 import logging
 
-from .settings import load_user_config
-from .calendar_sync import sync_from_ics
-from .alerts import notify_and_alert, stop_alert_for_task
+from .settings import get_config_service, load_user_config
+from .db import change_token, get_connection, transaction
+from .alerts import escalate, notify_and_alert, stop_alert_for_task
+from .deadlines import DeadlineQueue
+from ..utils import metrics, profiling
 
 LOG = logging.getLogger(__name__)
 
-# DB helper functions (kept here so core package is self-contained)
+_DB_OP = metrics.histogram("anchor_db_op_seconds", "Duration of tasks DB helper calls")
+_LOOP = metrics.histogram("anchor_scheduler_loop_seconds", "Duration of one deadline loop iteration")
+_LATENESS = metrics.histogram("anchor_alert_lateness_seconds", "Alert time minus the task's due time",
+                              buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600))
+_ALERTS = metrics.counter("anchor_alerts_fired_total", "Alerts fired by the scheduler")
+_DEADLINES = metrics.gauge("anchor_deadlines_pending", "Tasks waiting in the deadline queue")
+
+
+def _db_op(name: str):
+    """Latency histogram + slow-op log for a DB helper (both no-ops unless enabled)."""
+    def decorate(fn):
+        return metrics.instrument(_DB_OP, op=name)(profiling.slow_ops(f"db.{name}")(fn))
+    return decorate
+
+# Change listeners: callables(db_path, event, payload) invoked after a write commits.
+#   event "upsert" -> payload is the full task row (same shape as get_pending_tasks rows)
+#   event "done"   -> payload is the task id
+#   event "delete" -> payload is the task id (row removed, e.g. event deleted upstream)
+_LISTENERS = []
+_LISTENERS_LOCK = threading.Lock()
+
+def add_task_listener(fn):
+    with _LISTENERS_LOCK:
+        if fn not in _LISTENERS:
+            _LISTENERS.append(fn)
+
+def remove_task_listener(fn):
+    with _LISTENERS_LOCK:
+        if fn in _LISTENERS:
+            _LISTENERS.remove(fn)
+
+def _emit(db_path: str, event: str, payload):
+    with _LISTENERS_LOCK:
+        listeners = list(_LISTENERS)
+    for fn in listeners:
+        try:
+            fn(db_path, event, payload)
+        except Exception:
+            LOG.exception("task listener failed")
+
+# DB helper functions (kept here so core package is self-contained); connections come
+# from the shared per-thread pool in db.py
+
+# Schema migrations, applied in order; PRAGMA user_version records the last one applied.
+_MIGRATIONS = [
+    # 1: initial schema
+    """
+    CREATE TABLE IF NOT EXISTS tasks (
+        id INTEGER PRIMARY KEY,
+        uid TEXT UNIQUE,
+        title TEXT,
+        start_ts INTEGER,
+        end_ts INTEGER,
+        status TEXT DEFAULT 'pending',
+        red_alert INTEGER DEFAULT 0
+    );
+    """,
+    # 2: per-source change tracking for incremental sync
+    """
+    ALTER TABLE tasks ADD COLUMN source TEXT;
+    ALTER TABLE tasks ADD COLUMN etag TEXT;
+    CREATE INDEX IF NOT EXISTS idx_tasks_source ON tasks(source);
+    CREATE TABLE IF NOT EXISTS sync_state (
+        source TEXT PRIMARY KEY,
+        state TEXT
+    );
+    """,
+    # 3: recurring series, expanded into task rows inside a rolling window (see recurrence.py)
+    """
+    CREATE TABLE IF NOT EXISTS recurrences (
+        uid TEXT PRIMARY KEY,
+        source TEXT,
+        sequence INTEGER DEFAULT 0,
+        etag TEXT,
+        spec TEXT,
+        expanded_until INTEGER DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS idx_recurrences_source ON recurrences(source);
+    CREATE INDEX IF NOT EXISTS idx_recurrences_expanded ON recurrences(expanded_until);
+    """,
+    # 4: range/status queries (query_tasks); partial indexes only hold pending rows, so
+    # they stay small however many done tasks accumulate
+    """
+    CREATE INDEX IF NOT EXISTS idx_tasks_status_end ON tasks(status, end_ts);
+    CREATE INDEX IF NOT EXISTS idx_tasks_pending_end ON tasks(end_ts) WHERE status!='done';
+    CREATE INDEX IF NOT EXISTS idx_tasks_red_pending_end ON tasks(end_ts) WHERE status!='done' AND red_alert=1;
+    ANALYZE;
+    """,
+    # 5: completion time for the retention policy, and the archive old rows move to (retention.py)
+    """
+    ALTER TABLE tasks ADD COLUMN done_ts INTEGER;
+    CREATE TABLE IF NOT EXISTS tasks_archive (
+        archive_id INTEGER PRIMARY KEY,
+        id INTEGER,
+        uid TEXT,
+        title TEXT,
+        start_ts INTEGER,
+        end_ts INTEGER,
+        status TEXT,
+        red_alert INTEGER,
+        source TEXT,
+        etag TEXT,
+        done_ts INTEGER,
+        archived_ts INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_archive_source ON tasks_archive(source);
+    """,
+    # 6: alert lifecycle, so a restart neither re-fires handled alerts nor loses ringing or
+    # snoozed ones; rows are deleted together with the task's completion (see Scheduler)
+    """
+    CREATE TABLE IF NOT EXISTS alert_state (
+        task_id INTEGER PRIMARY KEY,
+        fired_at INTEGER,
+        acked_at INTEGER,
+        snoozed_until INTEGER,
+        repeats INTEGER DEFAULT 0
+    );
+    """,
+    # 7: snooze count, for the per-alert snooze cap
+    """
+    ALTER TABLE alert_state ADD COLUMN snoozes INTEGER DEFAULT 0;
+    """,
+    # 8: archived etags are looked up by uid, one sync batch at a time (retention.py)
+    """
+    CREATE INDEX IF NOT EXISTS idx_tasks_archive_uid ON tasks_archive(uid);
+    """,
+    # 9: change counter, so a Scheduler can pick up tasks written by other processes
+    # (CLI --sync-ics, the Kivy app) without rescanning the table; every upserting
+    # transaction bumps task_rev once and stamps its rows with the new value
+    """
+    ALTER TABLE tasks ADD COLUMN rev INTEGER DEFAULT 0;
+    CREATE INDEX IF NOT EXISTS idx_tasks_pending_rev ON tasks(rev) WHERE status!='done';
+    CREATE TABLE IF NOT EXISTS task_rev (rev INTEGER NOT NULL);
+    INSERT INTO task_rev(rev) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM task_rev);
+    """,
+]
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+def _migrate(con):
+    if con.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+        return
+    with con:
+        # explicit write lock: DDL is not wrapped in an implicit transaction, and another
+        # process may be migrating the same file
+        con.execute("BEGIN IMMEDIATE")
+        version = con.execute("PRAGMA user_version").fetchone()[0]
+        for i in range(version, SCHEMA_VERSION):
+            LOG.info("migrating tasks DB schema to version %d", i + 1)
+            for stmt in _MIGRATIONS[i].split(";"):
+                if stmt.strip():
+                    con.execute(stmt)
+            con.execute(f"PRAGMA user_version={i + 1}")
+
 def _ensure_db(db_path: str):
     p = Path(db_path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS tasks (
-            id INTEGER PRIMARY KEY,
-            uid TEXT UNIQUE,
-            title TEXT,
-            start_ts INTEGER,
-            end_ts INTEGER,
-            status TEXT DEFAULT 'pending',
-            red_alert INTEGER DEFAULT 0
-        )
-    """)
-    con.commit()
-    con.close()
+    _migrate(get_connection(db_path))
+
+_UPSERT_SQL = """
+    INSERT INTO tasks(uid,title,start_ts,end_ts,red_alert,source,etag,rev)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(uid) DO UPDATE SET
+        title=excluded.title,
+        start_ts=excluded.start_ts,
+        end_ts=excluded.end_ts,
+        red_alert=excluded.red_alert,
+        source=COALESCE(excluded.source, tasks.source),
+        etag=COALESCE(excluded.etag, tasks.etag),
+        rev=excluded.rev
+"""
+_TASK_COLUMNS = "id, uid, title, start_ts, end_ts, status, red_alert"
+_MAX_SQL_VARS = 500  # stay well below SQLITE_MAX_VARIABLE_NUMBER on old builds
 
+def _next_rev(con) -> int:
+    """Bump task_rev inside the caller's write transaction; rows it upserts carry the new value."""
+    con.execute("UPDATE task_rev SET rev=rev+1")
+    return con.execute("SELECT rev FROM task_rev").fetchone()[0]
+
+@_db_op("upsert_task")
 def upsert_task(db_path: str, uid: str, title: str, start_ts: int, end_ts: int, red_alert: int = 0):
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("""
-        INSERT INTO tasks(uid,title,start_ts,end_ts,red_alert)
-        VALUES (?, ?, ?, ?, ?)
-        ON CONFLICT(uid) DO UPDATE SET
-            title=excluded.title,
-            start_ts=excluded.start_ts,
-            end_ts=excluded.end_ts,
-            red_alert=excluded.red_alert
-    """, (uid, title, int(start_ts), int(end_ts), int(red_alert)))
-    con.commit()
-    con.close()
+    with transaction(db_path) as con:
+        con.execute(_UPSERT_SQL, (uid, title, int(start_ts), int(end_ts), int(red_alert), None, None, _next_rev(con)))
+    row = None
+    if _LISTENERS:
+        row = con.execute(f"SELECT {_TASK_COLUMNS} FROM tasks WHERE uid=?", (uid,)).fetchone()
+    if row:
+        _emit(db_path, "upsert", row)
+
+@_db_op("upsert_tasks")
+def upsert_tasks(db_path: str, rows, chunk_size: int = 500, source: str | None = None) -> int:
+    """Bulk upsert an iterable of (uid, title, start_ts, end_ts, red_alert[, etag]) tuples.
+
+    Rows are consumed lazily and written with executemany in chunks of chunk_size, all
+    inside one transaction (one commit / fsync per sync). `source` tags the rows with the
+    calendar they came from so later syncs can diff against them. Returns the number of
+    rows written.
+    """
+    chunk_size = max(1, int(chunk_size))
+    count = 0
+    changed = []
+    with transaction(db_path) as con:
+        rev = _next_rev(con)
+        chunk = []
+        for uid, title, start_ts, end_ts, red_alert, *etag in rows:
+            chunk.append((uid, title, int(start_ts), int(end_ts), int(red_alert), source, etag[0] if etag else None, rev))
+            if len(chunk) >= chunk_size:
+                count += _write_chunk(con, chunk, changed)
+                chunk = []
+        if chunk:
+            count += _write_chunk(con, chunk, changed)
+    for row in changed:
+        _emit(db_path, "upsert", row)
+    return count
 
+def _write_chunk(con, chunk, changed) -> int:
+    con.executemany(_UPSERT_SQL, chunk)
+    if _LISTENERS:
+        # read back ids/status for the change listeners while still inside the transaction
+        for i in range(0, len(chunk), _MAX_SQL_VARS):
+            uids = [r[0] for r in chunk[i:i + _MAX_SQL_VARS]]
+            marks = ",".join("?" * len(uids))
+            changed.extend(con.execute(f"SELECT {_TASK_COLUMNS} FROM tasks WHERE uid IN ({marks})", uids))
+    return len(chunk)
+
+@_db_op("get_pending_tasks")
 def get_pending_tasks(db_path: str):
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("SELECT id, uid, title, start_ts, end_ts, status, red_alert FROM tasks WHERE status!='done'")
-    rows = cur.fetchall()
-    con.close()
-    return rows
+    con = get_connection(db_path)
+    return con.execute(f"SELECT {_TASK_COLUMNS} FROM tasks WHERE status!='done'").fetchall()
+
+def current_rev(db_path: str) -> int:
+    return get_connection(db_path).execute("SELECT rev FROM task_rev").fetchone()[0]
+
+@_db_op("tasks_changed_since")
+def tasks_changed_since(db_path: str, rev: int) -> tuple[list, int]:
+    """Pending tasks upserted after change counter `rev` -> (rows, latest rev seen)."""
+    con = get_connection(db_path)
+    latest = max(int(rev), current_rev(db_path))
+    rows = con.execute(f"SELECT {_TASK_COLUMNS}, rev FROM tasks WHERE rev>? AND status!='done'",
+                       (int(rev),)).fetchall()
+    if rows:
+        latest = max(latest, max(r[7] for r in rows))
+    return [r[:7] for r in rows], latest
+
+def get_task(db_path: str, task_id: int):
+    con = get_connection(db_path)
+    return con.execute(f"SELECT {_TASK_COLUMNS} FROM tasks WHERE id=?", (int(task_id),)).fetchone()
+
+@_db_op("query_tasks")
+def query_tasks(db_path: str, status: str | None = "pending", due_from: int | None = None,
+                due_before: int | None = None, red: bool | None = None, limit: int | None = None,
+                cursor: str | None = None) -> tuple[list, str | None]:
+    """Tasks ordered by (end_ts, id), filtered by status ("pending" / "done" / None for all),
+    due window due_from <= end_ts < due_before and red flag.
+
+    Paged by keyset: pass the returned cursor back to get the next page (None once the
+    last page was returned). Pending/red queries are answered from the partial indexes
+    of migration 4, so only the requested rows are read."""
+    where, args = [], []
+    if status == "pending":
+        where.append("status!='done'")  # literal, so the partial indexes apply
+    elif status:
+        where.append("status=?")
+        args.append(status)
+    if red is not None:
+        where.append("red_alert=1" if red else "red_alert=0")
+    if due_from is not None:
+        where.append("end_ts>=?")
+        args.append(int(due_from))
+    if due_before is not None:
+        where.append("end_ts<?")
+        args.append(int(due_before))
+    if cursor:
+        try:
+            c_end, c_id = (int(x) for x in str(cursor).split(":", 1))
+        except ValueError:
+            raise ValueError(f"bad cursor {cursor!r}") from None
+        where.append("(end_ts>? OR (end_ts=? AND id>?))")
+        args.extend((c_end, c_end, c_id))
+    sql = f"SELECT {_TASK_COLUMNS} FROM tasks"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY end_ts, id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        args.append(max(1, int(limit)) + 1)  # one extra row tells whether another page exists
+    rows = get_connection(db_path).execute(sql, args).fetchall()
+    next_cursor = None
+    if limit is not None and len(rows) > max(1, int(limit)):
+        rows = rows[:max(1, int(limit))]
+        next_cursor = f"{rows[-1][4] or 0}:{rows[-1][0]}"
+    return rows, next_cursor
+
+def list_tasks(db_path: str, status: str | None = "pending", due_before: int | None = None,
+               red: bool | None = None, limit: int | None = None) -> list:
+    """First page of query_tasks() (rows only)."""
+    return query_tasks(db_path, status, due_before=due_before, red=red, limit=limit)[0]
+
+def tasks_due_before(db_path: str, before_ts: int, limit: int | None = None, cursor: str | None = None):
+    """Pending tasks with end_ts < before_ts -> (rows, next_cursor)."""
+    return query_tasks(db_path, due_before=before_ts, limit=limit, cursor=cursor)
+
+def tasks_due_in_window(db_path: str, window_start: int, window_end: int, limit: int | None = None,
+                        cursor: str | None = None):
+    """Pending tasks due in [window_start, window_end) -> (rows, next_cursor)."""
+    return query_tasks(db_path, due_from=window_start, due_before=window_end, limit=limit, cursor=cursor)
+
+def red_pending_tasks(db_path: str, limit: int | None = None, cursor: str | None = None):
+    """Pending red-flag tasks -> (rows, next_cursor)."""
+    return query_tasks(db_path, red=True, limit=limit, cursor=cursor)
+
+def get_source_etags(db_path: str, source: str, min_end_ts: int | None = None, max_end_ts: int | None = None) -> dict:
+    """uid -> etag for every task previously synced from `source` (ending in [min_end_ts, max_end_ts))."""
+    sql, args = "SELECT uid, etag FROM tasks WHERE source=?", [source]
+    if min_end_ts is not None:
+        sql += " AND end_ts>=?"
+        args.append(int(min_end_ts))
+    if max_end_ts is not None:
+        sql += " AND end_ts<?"
+        args.append(int(max_end_ts))
+    return dict(get_connection(db_path).execute(sql, args))
+
+@_db_op("delete_tasks")
+def delete_tasks(db_path: str, uids) -> int:
+    """Delete tasks by uid (events removed from their calendar). Returns rows deleted."""
+    uids = list(uids)
+    ids = []
+    with transaction(db_path) as con:
+        for i in range(0, len(uids), _MAX_SQL_VARS):
+            part = uids[i:i + _MAX_SQL_VARS]
+            marks = ",".join("?" * len(part))
+            ids.extend(r[0] for r in con.execute(f"SELECT id FROM tasks WHERE uid IN ({marks})", part))
+            con.execute(f"DELETE FROM alert_state WHERE task_id IN (SELECT id FROM tasks WHERE uid IN ({marks}))", part)
+            con.execute(f"DELETE FROM tasks WHERE uid IN ({marks})", part)
+    for task_id in ids:
+        _emit(db_path, "delete", task_id)
+    return len(ids)
+
+def get_sync_state(db_path: str, source: str) -> dict | None:
+    row = get_connection(db_path).execute("SELECT state FROM sync_state WHERE source=?", (source,)).fetchone()
+    return json.loads(row[0]) if row else None
+
+def set_sync_state(db_path: str, source: str, state: dict | None):
+    """Persist per-source sync bookkeeping (file stats, tokens, ...); None clears it."""
+    with transaction(db_path) as con:
+        if state is None:
+            con.execute("DELETE FROM sync_state WHERE source=?", (source,))
+        else:
+            con.execute("INSERT OR REPLACE INTO sync_state(source, state) VALUES (?, ?)", (source, json.dumps(state)))
+
+# Alert lifecycle per task (migrations 6-7), as lists
+# [fired_at, acked_at, snoozed_until, repeats, snoozes]:
+#   fired_at      when the alert last fired (None if it was snoozed before ever firing)
+#   acked_at      when it was acknowledged, silenced by alert_max_repeats, or (one-shot,
+#                 non-red alerts) when it fired; it does not fire again (None while ringing)
+#   snoozed_until when a snoozed alert fires again (None if not snoozed)
+#   repeats       times it fired since it was last snoozed (drives escalation)
+#   snoozes       times it was snoozed (capped by snooze_max)
+# mark_done / mark_tasks_done / delete_tasks drop the row in the same transaction, so no
+# state outlives its task whichever process completes it.
 
+def load_alert_states(db_path: str) -> dict:
+    """task_id -> [fired_at, acked_at, snoozed_until, repeats, snoozes] for pending tasks."""
+    con = get_connection(db_path)
+    rows = con.execute("SELECT a.task_id, a.fired_at, a.acked_at, a.snoozed_until, a.repeats, a.snoozes "
+                       "FROM alert_state a JOIN tasks t ON t.id=a.task_id WHERE t.status!='done'")
+    return {r[0]: list(r[1:]) for r in rows}
+
+def clear_alert_state(db_path: str, task_id: int):
+    with transaction(db_path) as con:
+        con.execute("DELETE FROM alert_state WHERE task_id=?", (int(task_id),))
+
+def _ringing(state) -> bool:
+    return state[0] is not None and state[1] is None and state[2] is None
+
+@_db_op("save_alert_states")
+def save_alert_states(db_path: str, states: dict):
+    """Persist {task_id: [fired_at, acked_at, snoozed_until, repeats, snoozes]} in one transaction."""
+    if not states:
+        return
+    with transaction(db_path) as con:
+        con.executemany("INSERT OR REPLACE INTO alert_state(task_id, fired_at, acked_at, snoozed_until, repeats, snoozes) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", [(int(t), *s) for t, s in states.items()])
+
+def pending_task_ids(db_path: str, task_ids) -> set:
+    """The subset of task_ids that still exist and are not done."""
+    ids = list(task_ids)
+    con = get_connection(db_path)
+    pending = set()
+    for i in range(0, len(ids), _MAX_SQL_VARS):
+        part = ids[i:i + _MAX_SQL_VARS]
+        marks = ",".join("?" * len(part))
+        pending.update(r[0] for r in con.execute(
+            f"SELECT id FROM tasks WHERE id IN ({marks}) AND status!='done'", part))
+    return pending
+
+@_db_op("mark_done")
 def mark_done(db_path: str, task_id: int):
-    con = sqlite3.connect(db_path)
-    cur = con.cursor()
-    cur.execute("UPDATE tasks SET status='done' WHERE id=?", (int(task_id),))
-    con.commit()
-    con.close()
+    with transaction(db_path) as con:
+        con.execute("UPDATE tasks SET status='done', done_ts=? WHERE id=?", (int(time.time()), int(task_id)))
+        con.execute("DELETE FROM alert_state WHERE task_id=?", (int(task_id),))
+    _emit(db_path, "done", int(task_id))
+
+@_db_op("mark_tasks_done")
+def mark_tasks_done(db_path: str, task_ids) -> list:
+    """Mark several tasks done in one transaction; returns the ids that were pending."""
+    ids = sorted({int(t) for t in task_ids})
+    if not ids:
+        return []
+    with transaction(db_path) as con:
+        changed = []
+        for i in range(0, len(ids), _MAX_SQL_VARS):
+            part = ids[i:i + _MAX_SQL_VARS]
+            marks = ",".join("?" * len(part))
+            changed.extend(r[0] for r in con.execute(
+                f"SELECT id FROM tasks WHERE id IN ({marks}) AND status!='done'", part))
+        now = int(time.time())
+        con.executemany("UPDATE tasks SET status='done', done_ts=? WHERE id=?", [(now, t) for t in changed])
+        con.executemany("DELETE FROM alert_state WHERE task_id=?", [(t,) for t in changed])
+    for task_id in changed:
+        _emit(db_path, "done", task_id)
+    return changed
 
 # Scheduler class
+ALERT_RECONCILE_SECONDS = 30  # while alerts are held, check this often for tasks completed by other processes
+
 class Scheduler:
-    def __init__(self, config: dict | None = None):
-        self.config = (config or load_user_config()).copy()
+    def __init__(self, config: dict | None = None, follow_config: bool | None = None):
+        # follow_config: apply config.json edits while running; by default only when no
+        # config was passed in
+        self._follow_config = config is None if follow_config is None else bool(follow_config)
+        self.config = dict(config) if config is not None else load_user_config()
         self.db_path = self.config["db_path"]
         _ensure_db(self.db_path)
         self._stop = threading.Event()
         self._thread = None
         self._lock = threading.Lock()
-        self._active_alerts = {}  # task_id -> True (used to avoid duplicate alert starts)
+        # task_id -> [fired_at, acked_at, snoozed_until, repeats, snoozes]; mirrors alert_state for pending tasks
+        self._alerts = {}
+        self._alerts_token = None
+        self._rev = 0  # task_rev already queued; newer rows came from writes we may not have heard of
+        self._db_token = None
+        self._deadlines = DeadlineQueue()
+        # imported here: the sync modules import this module for the DB helpers
+        from .sync_orchestrator import SyncOrchestrator
+        self._sync = SyncOrchestrator(self.config, self.db_path)
 
     def _sync_calendars(self):
         """
-        Sync calendars into DB by reading .ics (simple fallback).
-        For more advanced CalDAV/Google sync, call calendar_sync functions externally.
+        Request an immediate sync of every configured calendar source. Syncs run on the
+        orchestrator's worker pool (see sync_orchestrator), never on the deadline loop.
         """
-        ics_path = self.config.get("ics_path")
-        if ics_path:
+        self._sync.sync_now()
+
+    def _load_changes(self):
+        """Queue tasks upserted since the last check, including by other processes (CLI
+        --sync-ics, the Kivy app) whose writes no change listener here reports.
+
+        Gated on db.change_token(), so an idle DB costs one PRAGMA per check."""
+        token = change_token(self.db_path)
+        if token == self._db_token:
+            return
+        self._db_token = token
+        rows, self._rev = tasks_changed_since(self.db_path, self._rev)
+        for row in rows:
+            self._queue_row(row)
+
+    def _on_task_change(self, db_path, event, payload):
+        if os.path.abspath(db_path) != os.path.abspath(self.db_path):
+            return
+        if event == "upsert":
+            self._queue_row(payload)
+        elif event in ("done", "delete"):
+            # the alert_state row went with the same transaction; drop the in-memory copy
+            self._deadlines.discard(payload)
+            with self._lock:
+                state = self._alerts.pop(payload, None)
+            if state:
+                stop_alert_for_task(payload)
+
+    def _on_config_change(self, old, new, changed):
+        if "db_path" in changed and new["db_path"] != self.db_path:
+            LOG.warning("db_path changed to %s; restart the service to use it", new["db_path"])
+        config = dict(new, db_path=self.db_path)
+        self.config = config  # read per alert, so alert sound/burst settings apply right away
+        metrics.configure(config)
+        if any(k.startswith("profiling_") for k in changed):
+            profiling.configure(config)  # otherwise keep what was switched at runtime
+        self._sync.reconfigure(config)
+
+    def acknowledge(self, task_id: int) -> bool:
+        """Silence a ringing (or snoozed) alert without marking the task done; it won't fire again."""
+        with self._lock:
+            state = self._alerts.get(task_id)
+            if state is None or state[1] is not None:
+                return False
+            state[1] = int(time.time())
+            state[2] = None
+            saved = {task_id: list(state)}
+        self._deadlines.discard(task_id)
+        save_alert_states(self.db_path, saved)
+        return stop_alert_for_task(task_id)
+
+    def snooze(self, task_id: int, seconds: float | None = None) -> int | None:
+        """Silence the task's alert and fire it again after `seconds` (default snooze_default_minutes).
+
+        Returns the new due time, None if the task is not pending. Raises ValueError once
+        the alert has been snoozed snooze_max times. Escalation starts over after a snooze."""
+        row = get_task(self.db_path, task_id)
+        if row is None or row[5] == "done":
+            return None
+        if seconds is None:
+            seconds = float(self.config.get("snooze_default_minutes", 10)) * 60
+        due = int(time.time() + max(0.0, float(seconds)))
+        limit = int(self.config.get("snooze_max", 0) or 0)
+        with self._lock:
+            state = self._alerts.get(task_id) or [None, None, None, 0, 0]
+            snoozes = state[4] or 0
+            if limit and snoozes >= limit:
+                raise ValueError(f"alert already snoozed {snoozes} times (snooze_max)")
+            state = self._alerts[task_id] = [state[0], None, due, 0, snoozes + 1]
+            saved = {task_id: list(state)}
+        save_alert_states(self.db_path, saved)
+        stop_alert_for_task(task_id)
+        self._deadlines.push(task_id, due, row[2], row[6])
+        return due
+
+    def _queue_row(self, row):
+        task_id, uid, title, start_ts, end_ts, status, red_alert = row
+        if status == "done" or not end_ts:
+            self._deadlines.discard(task_id)
+            return
+        now = time.time()
+        with self._lock:
+            state = self._alerts.get(task_id)
+            # moved to a time after everything the alert state covers: a fresh deadline
+            moved = state is not None and end_ts > now and end_ts > (state[0] or 0) and end_ts > (state[2] or 0)
+            if moved:
+                del self._alerts[task_id]
+            snoozed_until = state[2] if state is not None else None
+        if moved:
+            clear_alert_state(self.db_path, task_id)
+            if _ringing(state):
+                stop_alert_for_task(task_id)
+        elif state is not None:
+            # other changes don't re-arm an alerted task; a snoozed one keeps its time
+            if snoozed_until is not None:
+                self._deadlines.push(task_id, snoozed_until, title, red_alert)
+            return
+        if end_ts <= now and task_id in self._deadlines:
+            return  # overdue and already waiting for its catch-up slot
+        self._deadlines.push(task_id, end_ts, title, red_alert)
+
+    def _load_deadlines(self):
+        """Seed the deadline queue and alert states once; afterwards the change listener and
+        _load_changes() maintain them.
+
+        Alerts that came due while the service was down, and alerts that were ringing or
+        whose snooze ran out, are not fired all at once: red-flag tasks first, they are
+        released alert_catchup_batch at a time every alert_catchup_spacing_seconds.
+        Missed alerts older than alert_catchup_max_age_seconds are skipped; acknowledged
+        ones stay silent."""
+        self._db_token = change_token(self.db_path)
+        self._rev = current_rev(self.db_path)
+        states = load_alert_states(self.db_path)
+        with self._lock:
+            self._alerts = states
+        now = time.time()
+        batch = max(1, int(self.config.get("alert_catchup_batch", 5)))
+        spacing = max(0.0, float(self.config.get("alert_catchup_spacing_seconds", 10)))
+        max_age = float(self.config.get("alert_catchup_max_age_seconds", 86400) or 0)
+        overdue = []
+        for task_id, _, title, _, end_ts, _, red_alert in query_tasks(self.db_path, due_from=1)[0]:
+            # (tasks without a due time never fire)
+            state = states.get(task_id)
+            if state is None:
+                due = end_ts
+                if max_age and now - due > max_age:
+                    continue
+            elif state[2] is not None:
+                due = state[2]
+            elif state[1] is None and red_alert:
+                due = min(now, state[0] or now)  # was ringing when the service stopped
+            else:
+                continue  # acknowledged, or a one-shot alert that already fired
+            if due > now:
+                self._deadlines.push(task_id, due, title, red_alert)
+            else:
+                overdue.append((not red_alert, due, task_id, title, red_alert))
+        overdue.sort()
+        for i, (_, _, task_id, title, red_alert) in enumerate(overdue):
+            self._deadlines.push(task_id, int(now + (i // batch) * spacing), title, red_alert)
+        if overdue:
+            LOG.info("catching up on %d overdue alerts", len(overdue))
+
+    def _repeat_interval(self, repeats: int) -> tuple[float, bool]:
+        """(seconds until the next repeat, escalated?) for a red alert that has fired `repeats` times.
+
+        Up to escalate_after_repeats fires repeat every red_alert_repeat_seconds; after that
+        each interval is escalation_backoff times the previous one, down to
+        escalation_min_repeat_seconds."""
+        cfg = self.config
+        base = max(1.0, float(cfg.get("red_alert_repeat_seconds", 120)))
+        after = int(cfg.get("escalate_after_repeats", 3) or 0)
+        if not after or repeats <= after:
+            return base, False
+        factor = float(cfg.get("escalation_backoff", 0.5))
+        floor = max(1.0, float(cfg.get("escalation_min_repeat_seconds", 30)))
+        return max(floor, base * factor ** min(repeats - after, 64)), True
+
+    def _alert_config(self, interval: float, escalated: bool) -> dict:
+        cfg = dict(self.config, red_alert_repeat_seconds=interval)
+        if escalated:
+            cfg["sound_file"] = self.config.get("escalation_sound_file") or self.config.get("sound_file")
+            cfg["red_alert_volume"] = 1.0
+        return cfg
+
+    def _fire_due(self):
+        """Fire due alerts. Red alerts go back into the deadline queue for their next
+        repeat, so repeats, escalation and snoozes all run off this one timer queue."""
+        now = time.time()
+        due = self._deadlines.pop_due(now)
+        if not due:
+            return
+        # skip tasks completed elsewhere (another process) since they were queued
+        pending = pending_task_ids(self.db_path, [d[0] for d in due])
+        max_repeats = int(self.config.get("alert_max_repeats", 0) or 0)
+        fire, capped, saved = [], [], {}
+        with self._lock:
+            for task_id, end_ts, title, red_alert in due:
+                state = self._alerts.get(task_id)
+                if task_id not in pending:
+                    self._alerts.pop(task_id, None)
+                    continue
+                if state is not None and state[1] is not None:
+                    continue  # acknowledged meanwhile
+                if state is not None and state[2] is None and max_repeats and state[3] >= max_repeats:
+                    # repeat cap reached: silence it as if acknowledged
+                    state[1] = int(now)
+                    saved[task_id] = list(state)
+                    capped.append(task_id)
+                    continue
+                repeats = (state[3] if state else 0) + 1
+                # only red alerts keep ringing; others are handled once they fired
+                state = self._alerts[task_id] = [int(now), None if red_alert else int(now), None, repeats,
+                                                 state[4] if state else 0]
+                saved[task_id] = list(state)
+                fire.append((task_id, end_ts, title, red_alert, repeats))
+        try:
+            save_alert_states(self.db_path, saved)
+        except Exception:
+            LOG.exception("failed saving alert state")
+        for task_id in capped:
+            LOG.warning("alert for task %s silenced after %d repeats (alert_max_repeats)", task_id, max_repeats)
+            stop_alert_for_task(task_id)
+        for task_id, end_ts, title, red_alert, repeats in fire:
+            config = self.config
+            if red_alert:
+                interval, escalated = self._repeat_interval(repeats)
+                self._deadlines.push(task_id, int(now + interval), title, red_alert)
+                config = self._alert_config(interval, escalated)
+                if escalated and not self._repeat_interval(repeats - 1)[1]:
+                    LOG.warning("alert for task %s escalated after %d repeats", task_id, repeats - 1)
+                    escalate(task_id, title, config)
+            if repeats == 1:
+                _LATENESS.observe(max(0.0, now - end_ts))
+            _ALERTS.inc(red=1 if red_alert else 0)
             try:
-                # sync_from_ics should call upsert (we import its implementation)
-                sync_from_ics(ics_path)  # calendar_sync module is expected to upsert into same DB
+                notify_and_alert(task_id, title, red_alert, config=config, repeat=repeats > 1)
             except Exception:
-                LOG.exception("calendar sync failed")
+                LOG.exception("alert failed for task %s", task_id)
+            _emit(self.db_path, "due", {"task_id": int(task_id), "title": title, "end_ts": int(end_ts),
+                                        "red": 1 if red_alert else 0, "repeat": repeats})
+
+    def _reconcile_alerts(self):
+        """Forget alerts of tasks another process marked done or removed (no change event reaches us).
+
+        Runs on every loop iteration while alerts are held, and at least every
+        ALERT_RECONCILE_SECONDS while one is ringing."""
+        token = change_token(self.db_path)
+        if token == self._alerts_token:
+            return
+        self._alerts_token = token
+        with self._lock:
+            held = list(self._alerts)
+        pending = pending_task_ids(self.db_path, held)
+        gone = [t for t in held if t not in pending]
+        with self._lock:
+            for task_id in gone:
+                self._alerts.pop(task_id, None)
+        for task_id in gone:
+            self._deadlines.discard(task_id)
+            stop_alert_for_task(task_id)
 
     def _poll_loop(self):
-        check_interval = int(self.config.get("check_interval_seconds", 60))
+        try:
+            self._load_deadlines()
+        except Exception:
+            LOG.exception("failed loading pending tasks")
         while not self._stop.is_set():
             try:
-                # optionally sync (every loop is simple; you can make sync less frequent)
-                self._sync_calendars()
-
-                now_ts = int(datetime.now(timezone.utc).timestamp())
-                rows = get_pending_tasks(self.db_path)
-                for row in rows:
-                    task_id, uid, title, start_ts, end_ts, status, red_alert = row
-                    # due if end_ts <= now (or if event time passed)
-                    if end_ts and end_ts <= now_ts and status != "done":
-                        # start persistent alert if not already active
-                        if task_id not in self._active_alerts:
-                            self._active_alerts[task_id] = True
-                            notify_and_alert(task_id, title, red_alert, config=self.config)
-                # small sleep
+                with profiling.sample("scheduler"), metrics.timed(_LOOP):
+                    self._load_changes()
+                    self._fire_due()
+                    if self._alerts:
+                        self._reconcile_alerts()
             except Exception:
                 LOG.exception("scheduler loop error")
-            for _ in range(max(1, check_interval)):
-                if self._stop.is_set():
-                    break
-                time.sleep(1)
+            # sleep until the next deadline; upserts of earlier deadlines and stop() wake us,
+            # other processes' writes are noticed within db_watch_seconds
+            nxt = self._deadlines.next_due()
+            timeout = None if nxt is None else nxt - time.time()
+            watch = float(self.config.get("db_watch_seconds", 5) or 0)
+            if watch > 0:
+                timeout = watch if timeout is None else min(timeout, watch)
+            with self._lock:
+                ringing = any(_ringing(st) for st in self._alerts.values())
+            if ringing:
+                timeout = ALERT_RECONCILE_SECONDS if timeout is None else min(timeout, ALERT_RECONCILE_SECONDS)
+            self._deadlines.wait(timeout)
 
     def start(self):
         if self._thread and self._thread.is_alive():
             return
         self._stop.clear()
+        add_task_listener(self._on_task_change)
+        metrics.configure(self.config)
+        profiling.configure(self.config)
+        _DEADLINES.set_function(self._deadlines.__len__)
+        if self._follow_config:
+            service = get_config_service()
+            service.subscribe(self._on_config_change)
+            service.watch()
         self._thread = threading.Thread(target=self._poll_loop, daemon=True)
         self._thread.start()
+        self._sync.start()
         LOG.info("Scheduler started")
 
     def stop(self):
         self._stop.set()
+        self._sync.stop()
+        remove_task_listener(self._on_task_change)
+        get_config_service().unsubscribe(self._on_config_change)
+        _DEADLINES.remove()
+        self._deadlines.wake()
         if self._thread:
             self._thread.join(timeout=2)
-        # stop active alerts
-        for tid in list(self._active_alerts.keys()):
+        # silence ringing alerts; their state stays in alert_state for the next start
+        with self._lock:
+            ringing = [t for t, st in self._alerts.items() if _ringing(st)]
+        for tid in ringing:
             try:
                 stop_alert_for_task(tid)
             except Exception:
@@ -1,29 +1,239 @@
-"""Default configuration and user-overrides"""
+"""Default configuration and user-overrides
+
+The user's config.json is read through one ConfigService:
+- the parsed, validated config is cached as an immutable snapshot (a read-only mapping;
+  lists become tuples); load_user_config() hands out plain dict copies of it
+- the file is stat()ed at most every STAT_INTERVAL seconds and re-read only when its
+  mtime/size changed, or on reload() (the daemon calls it on SIGHUP)
+- values whose type doesn't match the default are logged once and replaced by the default;
+  the optional paths/commands in NULLABLE also accept null, which switches them off
+- subscribe(fn) -> fn(old, new, changed_keys) after every change; watch() polls the file
+  from a background thread so subscribers hear about edits nobody asked for yet
+
+- load_user_config() -> a plain dict copy of the current snapshot (callers may modify it)
+- reload_config() -> re-read the file now, notify subscribers; returns a copy like load_user_config()
+- get_config_service() -> the shared ConfigService
+"""
 
 from pathlib import Path
+from types import MappingProxyType
 import json
+import logging
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
 
 HOME = Path.home()
+CONFIG_FILE = HOME / ".anchor_note" / "config.json"
+STAT_INTERVAL = 1.0  # seconds between mtime checks on the load_user_config() path
 DEFAULT_CONFIG = {
     "db_path": str(HOME / ".anchor_note" / "tasks.db"),
+    "pid_file": str(HOME / ".anchor_note" / "anchor-note.pid"),   # used by `anchor-note daemon`
     "ics_path": str(HOME / "calendar.ics"),
     "check_interval_seconds": 60,        # poll every 60s
+    "config_watch_seconds": 5,           # how often a running service checks config.json for edits
+    "db_watch_seconds": 5,               # how often the scheduler checks for tasks written by other processes
+    "sync_batch_size": 500,              # rows per executemany chunk during calendar sync
     "checklist_interval_hours": 6,
     "red_alert_burst_seconds": 30,
-    "red_alert_repeat_seconds": 120,
+    "red_alert_repeat_seconds": 120,     # red alerts sound and re-notify this often until acknowledged
+    "red_alert_volume": 0.7,             # leaves headroom for escalation (always full volume)
+    "escalate_after_repeats": 3,         # red alerts fired this many times unacknowledged escalate (0 = never)
+    "escalation_backoff": 0.5,           # each escalated repeat interval is this times the previous one...
+    "escalation_min_repeat_seconds": 30,  # ...but not shorter than this
+    "escalation_sound_file": "",         # sound once escalated ("" = sound_file)
+    "escalation_command": "",            # extra channel once escalated, e.g. "notify-send -u critical {title}"
+    "alert_max_repeats": 0,              # silence a red alert after this many repeats (0 = never)
+    "snooze_default_minutes": 10,
+    "snooze_max": 0,                     # snoozes allowed per alert (0 = unlimited)
+    "notify_coalesce_seconds": 1.0,      # notifications due within this window share one popup
+    "notify_min_interval_seconds": 60,   # per-task: don't notify the same task again sooner
+    "notify_timeout_seconds": 5,         # a notification backend call taking longer is abandoned
+    "alert_catchup_batch": 5,            # after a restart, overdue alerts are released this many at a time...
+    "alert_catchup_spacing_seconds": 10,  # ...this far apart
+    "alert_catchup_max_age_seconds": 86400,  # alerts missed longer ago than this are not caught up (0 = all)
     "sound_file": str(Path(__file__).parent.parent / "assets" / "alert.wav"),
+    # calendar sources synced in the background; each entry is a dict with "type"
+    # ("ics" | "caldav" | "google"), its adapter arguments and an optional
+    # "interval_seconds". Empty -> only ics_path is synced, every check_interval_seconds.
+    #   {"type": "ics", "path": "~/calendar.ics", "interval_seconds": 60}
+    #   {"type": "caldav", "url": "...", "username": "...", "password": "...", "calendar_name": null}
+    #   {"type": "google", "client_secrets_file": "...", "token_file": "token.json", "calendar_id": "primary"}
+    "sync_sources": [],
+    "sync_workers": 4,
+    "sync_timeout_seconds": 300,         # a source running longer is treated as failed
+    "sync_max_backoff_seconds": 3600,    # cap for exponential backoff after failures
+    "recurrence_lookahead_days": 14,     # recurring events are materialized this far ahead
+    "recurrence_extend_interval_seconds": 3600,
+    "retention_done_days": 30,           # done tasks are moved to the archive table after this
+    "retention_past_days": 180,          # ...and so are pending tasks this far past due (0 = never)
+    "maintenance_interval_seconds": 86400,  # archive + incremental vacuum + ANALYZE
+    "maintenance_batch_size": 500,       # rows moved per (short) write transaction
     "socket_host": "127.0.0.1",
     "socket_port": 8765,
+    "socket_max_queue_bytes": 1048576,   # per-client unsent data before the slow-consumer policy applies
+    "socket_slow_consumer": "disconnect",  # or "drop_oldest"
+    "event_buffer_size": 1024,           # events kept for clients resuming after a reconnect
+    "metrics_enabled": False,            # record hot-path metrics (socket "stats" command)
+    "metrics_port": 0,                   # also serve them at http://127.0.0.1:<port>/metrics (0 = off)
+    "profiling_slow_ms": 0,              # log DB calls / syncs / notifications slower than this (0 = off)
+    "profiling_dir": str(HOME / ".anchor_note" / "profiles"),  # cProfile/tracemalloc captures
+    "profiling_iterations": 20,          # loop iterations per capture (SIGUSR2 / socket "profile")
 }
 
-def load_user_config() -> dict:
-    cfgfile = HOME / ".anchor_note" / "config.json"
+# null turns these off (no ICS import, no sound, no escalation channel)
+NULLABLE = frozenset({"ics_path", "sound_file", "escalation_sound_file", "escalation_command"})
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _valid(default, value) -> bool:
+    if default is None or value is None:
+        return default is None
+    if isinstance(default, bool):
+        return isinstance(value, bool)
+    if isinstance(default, (int, float)):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if isinstance(default, list):
+        return isinstance(value, list)
+    return isinstance(value, type(default))
+
+
+def validate(data: dict) -> dict:
+    """DEFAULT_CONFIG overlaid with data; mistyped values are logged and skipped."""
     cfg = DEFAULT_CONFIG.copy()
-    if cfgfile.exists():
+    for key, value in data.items():
+        if key in DEFAULT_CONFIG and not (value is None and key in NULLABLE) and not _valid(DEFAULT_CONFIG[key], value):
+            LOG.warning("config: ignoring %s=%r (expected %s)", key, value, type(DEFAULT_CONFIG[key]).__name__)
+            continue
+        cfg[key] = value
+    return cfg
+
+
+class ConfigService:
+    def __init__(self, path=CONFIG_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._stamp = None
+        self._checked = 0.0
+        self._subscribers = []
+        self._watcher = None
+        self._watch_stop = threading.Event()
+
+    def _file_stamp(self):
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _read(self) -> dict:
+        if not self.path.exists():
+            return {}
         try:
-            with open(cfgfile, "r", encoding="utf-8") as fh:
+            with open(self.path, "r", encoding="utf-8") as fh:
                 data = json.load(fh)
-            cfg.update(data)
         except Exception:
-            pass
-    return cfg
+            LOG.warning("could not read %s, using defaults", self.path, exc_info=True)
+            return {}
+        if not isinstance(data, dict):
+            LOG.warning("%s is not a JSON object, using defaults", self.path)
+            return {}
+        return data
+
+    def get(self):
+        """Current (read-only, shared) snapshot; re-reads the file only if it changed since the last check."""
+        snap = self._snapshot
+        if snap is not None and time.monotonic() - self._checked < STAT_INTERVAL:
+            return snap
+        return self._refresh(force=False)
+
+    def reload(self):
+        return self._refresh(force=True)
+
+    def _refresh(self, force: bool):
+        with self._lock:
+            old = self._snapshot
+            stamp = self._file_stamp()
+            self._checked = time.monotonic()
+            if old is not None and not force and stamp == self._stamp:
+                return old
+            self._stamp = stamp
+            new = _freeze(validate(self._read()))
+            changed = {k for k in set(new) | set(old or {}) if (old or {}).get(k) != new.get(k)}
+            if old is not None and not changed:
+                return old
+            self._snapshot = new
+            subscribers = list(self._subscribers) if old is not None else []
+        if changed and old is not None:
+            LOG.info("configuration changed: %s", ", ".join(sorted(changed)))
+        for fn in subscribers:
+            try:
+                fn(old, new, changed)
+            except Exception:
+                LOG.exception("config subscriber failed")
+        return new
+
+    def subscribe(self, fn):
+        with self._lock:
+            if fn not in self._subscribers:
+                self._subscribers.append(fn)
+
+    def unsubscribe(self, fn):
+        with self._lock:
+            if fn in self._subscribers:
+                self._subscribers.remove(fn)
+
+    def watch(self, interval: float | None = None):
+        """Start a daemon thread checking the file every `interval` seconds (idempotent)."""
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._watch_stop.clear()
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True,
+                                             name="anchor-note-config")
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+
+    def _watch(self, interval):
+        while True:
+            wait = interval or float(self.get().get("config_watch_seconds", 5)) or 5.0
+            if self._watch_stop.wait(max(STAT_INTERVAL, wait)):
+                return
+            try:
+                self._refresh(force=False)
+            except Exception:
+                LOG.exception("config watch failed")
+
+
+_SERVICE = ConfigService()
+
+
+def get_config_service() -> ConfigService:
+    return _SERVICE
+
+
+def load_user_config() -> dict:
+    """A copy of the current config snapshot; changing it doesn't affect other callers."""
+    return _thaw(_SERVICE.get())
+
+
+def reload_config() -> dict:
+    return _thaw(_SERVICE.reload())
@@ -0,0 +1,223 @@
+"""
+sync_orchestrator.py
+
+Background, multi-source calendar sync.
+
+Sources come from the "sync_sources" setting (falling back to the single ics_path).
+Each source runs on its own interval in a bounded thread pool, so a slow CalDAV or
+Google call never delays the Scheduler's deadline loop or the other sources:
+
+- per-source timeout: a run exceeding sync_timeout_seconds counts as a failure and the
+  source is not started again until the stuck run returns
+- exponential backoff after failures, capped at sync_max_backoff_seconds
+- all DB writes go through one QueuedWriter thread
+- an internal "recurrence" job moves the recurring-event window forward
+  (recurrence_extend_interval_seconds)
+- an internal "maintenance" job archives expired tasks and compacts the DB
+  (maintenance_interval_seconds, see retention.py)
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .writer import QueuedWriter
+from ..utils import metrics, profiling
+
+LOG = logging.getLogger(__name__)
+
+_SYNC_SECONDS = metrics.histogram("anchor_sync_duration_seconds", "Duration of one sync run, per source")
+_SYNC_RUNS = metrics.counter("anchor_sync_runs_total", "Finished sync runs by source and result")
+
+
+class SyncSource:
+    def __init__(self, spec: dict, default_interval: int):
+        self.spec = dict(spec)
+        self.kind = str(self.spec.get("type", "ics")).lower()
+        self.interval = max(1, int(self.spec.get("interval_seconds", default_interval)))
+        self.name = self.spec.get("name") or self._default_name()
+        self.next_run = 0.0
+        self.failures = 0
+        self.future = None
+        self.started_at = 0.0
+        self.timed_out = False
+
+    def _default_name(self):
+        key = self.spec.get("path") or self.spec.get("url") or self.spec.get("calendar_id") or ""
+        return f"{self.kind}:{key}"
+
+
+def sources_from_config(config: dict) -> list:
+    interval = int(config.get("check_interval_seconds", 60))
+    specs = config.get("sync_sources") or []
+    if not specs and config.get("ics_path"):
+        specs = [{"type": "ics", "path": config["ics_path"], "interval_seconds": interval}]
+    return [SyncSource(s, interval) for s in specs]
+
+
+class SyncOrchestrator:
+    def __init__(self, config: dict, db_path: str | None = None):
+        self.config = config
+        self.db_path = db_path or config["db_path"]
+        self.sources = self._build_sources(config)
+        self._apply_settings(config)
+        self._workers = max(1, int(config.get("sync_workers", 4)))
+        self._lock = threading.RLock()  # add_done_callback may run _finished inline
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self.writer = None
+
+    @staticmethod
+    def _build_sources(config: dict) -> list:
+        sources = sources_from_config(config)
+        sources.append(SyncSource({"type": "recurrence", "name": "recurrence",
+                                   "interval_seconds": config.get("recurrence_extend_interval_seconds", 3600)},
+                                  3600))
+        sources.append(SyncSource({"type": "maintenance", "name": "maintenance",
+                                   "interval_seconds": config.get("maintenance_interval_seconds", 86400)},
+                                  86400))
+        return sources
+
+    def _apply_settings(self, config: dict):
+        self.recurrence_days = int(config.get("recurrence_lookahead_days", 14))
+        self.timeout = float(config.get("sync_timeout_seconds", 300))
+        self.max_backoff = float(config.get("sync_max_backoff_seconds", 3600))
+        self.chunk_size = int(config.get("sync_batch_size", 500))
+
+    def reconfigure(self, config: dict):
+        """Apply a changed config while running: sources, intervals, timeouts.
+
+        Sources are matched by name; a kept source keeps its schedule, failure count and
+        any run in progress, and runs early if its new interval is already over."""
+        new_sources = self._build_sources(config)
+        with self._lock:
+            self.config = config
+            self._apply_settings(config)
+            old = {src.name: src for src in self.sources}
+            for src in new_sources:
+                prev = old.get(src.name)
+                if prev is None:
+                    continue
+                src.failures, src.future = prev.failures, prev.future
+                src.started_at, src.timed_out = prev.started_at, prev.timed_out
+                src.next_run = min(prev.next_run, prev.next_run - prev.interval + src.interval)
+                if src.future is not None:
+                    # the pending done-callback is bound to prev; hand its result to src too
+                    src.future.add_done_callback(lambda f, s=src: self._finished(s, f))
+            self.sources = new_sources
+        self._wake.set()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        if all(s.kind in ("recurrence", "maintenance") for s in self.sources):
+            LOG.info("no calendar sources configured")
+        self._stop.clear()
+        self.writer = QueuedWriter()
+        self.writer.start()
+        self._pool = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="anchor-note-sync")
+        self._thread = threading.Thread(target=self._run, daemon=True, name="anchor-note-sync-loop")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._pool:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        if self.writer:
+            self.writer.stop()
+
+    def sync_now(self):
+        """Make every idle source due immediately."""
+        with self._lock:
+            for src in self.sources:
+                src.next_run = 0.0
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                for src in self.sources:
+                    self._check_timeout(src, now)
+                    if src.future is None and now >= src.next_run:
+                        src.started_at = now
+                        src.timed_out = False
+                        src.future = self._pool.submit(self._run_source, src)
+                        src.future.add_done_callback(lambda f, s=src: self._finished(s, f))
+                wake_at = min(self._next_event(src) for src in self.sources)
+            self._wake.wait(min(60.0, max(0.0, wake_at - time.monotonic())))
+
+    def _next_event(self, src):
+        if src.future is not None:
+            # running: next check is its timeout; a timed-out run wakes us when it returns
+            return src.started_at + self.timeout if not src.timed_out else float("inf")
+        return src.next_run
+
+    def _check_timeout(self, src, now):
+        if src.future is not None and not src.timed_out and now - src.started_at > self.timeout:
+            # the worker thread can't be killed; count it as a failure and wait for it to return
+            src.timed_out = True
+            src.failures += 1
+            _SYNC_RUNS.inc(source=src.name, result="timeout")
+            src.next_run = now + self._backoff(src)
+            LOG.warning("sync source %s timed out after %.0fs", src.name, self.timeout)
+
+    def _backoff(self, src) -> float:
+        return min(self.max_backoff, src.interval * (2 ** max(0, src.failures - 1)))
+
+    def _finished(self, src, fut):
+        now = time.monotonic()
+        with self._lock:
+            src.future = None
+            exc = None if fut.cancelled() else fut.exception()
+            _SYNC_SECONDS.observe(now - src.started_at, source=src.name)
+            if not src.timed_out:
+                _SYNC_RUNS.inc(source=src.name, result="error" if exc is not None else "ok")
+            if src.timed_out:
+                src.next_run = max(src.next_run, now)
+            elif exc is not None:
+                src.failures += 1
+                src.next_run = now + self._backoff(src)
+                LOG.error("sync source %s failed (%d in a row), retrying in %.0fs: %s",
+                          src.name, src.failures, src.next_run - now, exc)
+            else:
+                src.failures = 0
+                src.next_run = now + src.interval
+        self._wake.set()
+
+    def _run_source(self, src):
+        with profiling.sample("sync"), profiling.slow_op("sync", source=src.name):
+            return self._sync_source(src)
+
+    def _sync_source(self, src):
+        from . import calendar_sync
+
+        spec = src.spec
+        common = dict(db_path=self.db_path, chunk_size=self.chunk_size, writer=self.writer)
+        if src.kind == "recurrence":
+            from .recurrence import extend_recurrences
+            horizon = int(time.time()) + self.recurrence_days * 86400
+            return self.writer.call(extend_recurrences, self.db_path, horizon)
+        if src.kind == "maintenance":
+            from .retention import run_maintenance
+            return run_maintenance(self.db_path, self.config, writer=self.writer)
+        if src.kind == "ics":
+            return calendar_sync.sync_from_ics(os.path.expanduser(spec["path"]),
+                                               recurrence_days=self.recurrence_days, **common)
+        if src.kind == "caldav":
+            return calendar_sync.sync_from_caldav_nextcloud(
+                spec["url"], spec.get("username"), spec.get("password"), spec.get("calendar_name"),
+                timeout=spec.get("timeout", self.timeout), recurrence_days=self.recurrence_days, **common)
+        if src.kind == "google":
+            return calendar_sync.sync_from_google_calendar(
+                spec.get("client_secrets_file"), spec.get("token_file", "token.json"),
+                spec.get("calendar_id", "primary"), spec.get("lookahead_days", 7), **common)
+        raise ValueError(f"unknown sync source type {src.kind!r}")
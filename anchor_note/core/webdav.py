@@ -0,0 +1,148 @@
+"""
+webdav.py
+
+Minimal CalDAV/WebDAV protocol helpers for incremental calendar sync.
+
+Only raw requests are used (client.request(url, method, body, headers) -> response with
+.status and .raw), which every caldav.DAVClient version provides, so the incremental
+logic doesn't depend on the library's higher-level sync API:
+
+- CalendarCollection(client, url).get_ctag() -> (ctag, sync_token) via PROPFIND depth 0
+- .sync_collection(token) -> (changed, deleted, new_token) via RFC 6578 sync-collection REPORT
+- .list_etags() -> {href: etag} via PROPFIND depth 1 (fallback when sync-collection fails)
+- .multiget(hrefs) -> [(href, etag, calendar_data)] via calendar-multiget REPORT
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+from urllib.parse import quote, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+LOG = logging.getLogger(__name__)
+
+NS = {"d": "DAV:", "cs": "http://calendarserver.org/ns/", "c": "urn:ietf:params:xml:ns:caldav"}
+
+_PROPFIND_CTAG = """<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:" xmlns:cs="http://calendarserver.org/ns/">
+  <d:prop><cs:getctag/><d:sync-token/></d:prop>
+</d:propfind>"""
+
+_PROPFIND_ETAGS = """<?xml version="1.0" encoding="utf-8"?>
+<d:propfind xmlns:d="DAV:"><d:prop><d:getetag/><d:resourcetype/></d:prop></d:propfind>"""
+
+_SYNC_COLLECTION = """<?xml version="1.0" encoding="utf-8"?>
+<d:sync-collection xmlns:d="DAV:">
+  <d:sync-token>{token}</d:sync-token>
+  <d:sync-level>1</d:sync-level>
+  <d:prop><d:getetag/></d:prop>
+</d:sync-collection>"""
+
+_MULTIGET = """<?xml version="1.0" encoding="utf-8"?>
+<c:calendar-multiget xmlns:d="DAV:" xmlns:c="urn:ietf:params:xml:ns:caldav">
+  <d:prop><d:getetag/><c:calendar-data/></d:prop>
+  {hrefs}
+</c:calendar-multiget>"""
+
+MULTIGET_BATCH = 100
+
+
+class WebDAVError(Exception):
+    def __init__(self, status, message=""):
+        super().__init__(f"{status} {message}".strip())
+        self.status = status
+
+
+def _path(href: str) -> str:
+    """Normalise an href or URL to its unquoted path, the key used for state."""
+    return unquote(urlsplit(str(href)).path)
+
+
+def _status_code(text) -> int:
+    # "HTTP/1.1 404 Not Found" -> 404
+    try:
+        return int((text or "").split()[1])
+    except (IndexError, ValueError):
+        return 0
+
+
+def parse_multistatus(raw) -> tuple[list[tuple[str, int, dict]], str | None]:
+    """Return ([(href_path, status, {prop_tag: text})], top-level sync-token)."""
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    root = ET.fromstring(raw)
+    out = []
+    for resp in root.findall("d:response", NS):
+        href = resp.findtext("d:href", default="", namespaces=NS).strip()
+        status = _status_code(resp.findtext("d:status", namespaces=NS))
+        props = {}
+        for ps in resp.findall("d:propstat", NS):
+            code = _status_code(ps.findtext("d:status", namespaces=NS))
+            if code != 200:
+                continue
+            status = status or code
+            prop = ps.find("d:prop", NS)
+            for el in list(prop) if prop is not None else []:
+                props[el.tag] = el.text if len(el) == 0 else el
+        out.append((_path(href), status or 200, props))
+    token = root.findtext("d:sync-token", namespaces=NS)
+    return out, token
+
+
+class CalendarCollection:
+    def __init__(self, client, url):
+        self.client = client
+        self.url = str(url)
+        self.path = _path(self.url)
+
+    def _request(self, method, body, depth):
+        headers = {"Content-Type": 'application/xml; charset="utf-8"'}
+        if depth is not None:
+            headers["Depth"] = str(depth)
+        resp = self.client.request(self.url, method, body, headers)
+        if resp.status not in (200, 207):
+            raise WebDAVError(resp.status, f"{method} {self.url}")
+        return parse_multistatus(resp.raw)
+
+    def get_ctag(self) -> tuple[str | None, str | None]:
+        """Collection ctag (CalendarServer extension) and current sync-token, either may be None."""
+        results, _ = self._request("PROPFIND", _PROPFIND_CTAG, 0)
+        for href, status, props in results:
+            return props.get(f"{{{NS['cs']}}}getctag"), props.get(f"{{{NS['d']}}}sync-token")
+        return None, None
+
+    def sync_collection(self, token: str | None) -> tuple[dict, list, str | None]:
+        """RFC 6578 sync: ({href: etag} changed since token, [deleted hrefs], new token).
+
+        With an empty token the server lists every member (initial sync)."""
+        results, new_token = self._request("REPORT", _SYNC_COLLECTION.format(token=escape(token or "")), 1)
+        changed, deleted = {}, []
+        for href, status, props in results:
+            if href.rstrip("/") == self.path.rstrip("/"):
+                continue
+            if status == 404:
+                deleted.append(href)
+            else:
+                changed[href] = props.get(f"{{{NS['d']}}}getetag")
+        return changed, deleted, new_token
+
+    def list_etags(self) -> dict:
+        """{href: etag} for every member, used when sync-collection isn't supported."""
+        results, _ = self._request("PROPFIND", _PROPFIND_ETAGS, 1)
+        out = {}
+        for href, status, props in results:
+            rtype = props.get(f"{{{NS['d']}}}resourcetype")
+            if href.rstrip("/") == self.path.rstrip("/") or (rtype is not None and not isinstance(rtype, str)):
+                continue  # the collection itself / sub-collections
+            out[href] = props.get(f"{{{NS['d']}}}getetag")
+        return out
+
+    def multiget(self, hrefs):
+        """Yield (href, etag, calendar_data) for hrefs, MULTIGET_BATCH per REPORT."""
+        hrefs = list(hrefs)
+        for i in range(0, len(hrefs), MULTIGET_BATCH):
+            body = "".join(f"<d:href>{escape(quote(h, safe='/:@'))}</d:href>" for h in hrefs[i:i + MULTIGET_BATCH])
+            results, _ = self._request("REPORT", _MULTIGET.format(hrefs=body), 1)
+            for href, status, props in results:
+                data = props.get(f"{{{NS['c']}}}calendar-data")
+                if status == 200 and data:
+                    yield href, props.get(f"{{{NS['d']}}}getetag"), data
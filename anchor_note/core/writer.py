@@ -0,0 +1,154 @@
+"""
+writer.py
+
+Write paths used by the calendar sync adapters.
+
+Adapters never write to the DB directly; they call upsert / delete / set_state on a
+writer object:
+
+- DirectWriter: writes on the calling thread (one-off syncs, CLI)
+- QueuedWriter: funnels every write into one background writer thread. Rows are
+  produced (and network I/O done) on the sync worker's thread and handed over in
+  chunks, so no transaction is held open across a download and concurrent sources
+  never contend for the SQLite write lock. Consecutive chunks queued for the same
+  source are merged into a single transaction.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from .scheduler import upsert_tasks, delete_tasks, set_sync_state
+from ..utils import metrics
+
+LOG = logging.getLogger(__name__)
+
+_QUEUE_DEPTH = metrics.gauge("anchor_writer_queue_depth", "Write batches waiting for the writer thread")
+
+
+class DirectWriter:
+    def upsert(self, db_path, rows, chunk_size=500, source=None) -> int:
+        return upsert_tasks(db_path, rows, chunk_size=chunk_size, source=source)
+
+    def delete(self, db_path, uids) -> int:
+        return delete_tasks(db_path, uids)
+
+    def set_state(self, db_path, source, state):
+        set_sync_state(db_path, source, state)
+
+    def call(self, fn, db_path, *args):
+        """Run any other DB-writing helper fn(db_path, *args) on the write path."""
+        return fn(db_path, *args)
+
+
+DIRECT_WRITER = DirectWriter()
+
+
+class QueuedWriter(threading.Thread):
+    def __init__(self, max_pending: int = 8):
+        super().__init__(daemon=True, name="anchor-note-writer")
+        # bounded so a fast producer blocks instead of buffering a whole calendar in memory
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._stopping = threading.Event()  # not _stop: used by threading.Thread
+
+    # producer side (sync worker threads)
+    def upsert(self, db_path, rows, chunk_size=500, source=None) -> int:
+        chunk_size = max(1, int(chunk_size))
+        futures = []
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                futures.append(self._submit("upsert", db_path, (chunk, source)))
+                chunk = []
+        if chunk:
+            futures.append(self._submit("upsert", db_path, (chunk, source)))
+        return sum(f.result() for f in futures)
+
+    def delete(self, db_path, uids) -> int:
+        uids = list(uids)
+        if not uids:
+            return 0
+        return self._submit("delete", db_path, (uids,)).result()
+
+    def set_state(self, db_path, source, state):
+        # queued after this source's upserts, so state only advances once its rows are committed
+        self._submit("state", db_path, (source, state)).result()
+
+    def call(self, fn, db_path, *args):
+        return self._submit("call", db_path, (fn, args)).result()
+
+    def _submit(self, op, db_path, args) -> Future:
+        fut = Future()
+        if self._stopping.is_set():
+            fut.set_exception(RuntimeError("writer stopped"))
+            return fut
+        self._queue.put((op, db_path, args, fut))
+        return fut
+
+    def stop(self):
+        self._stopping.set()
+        self._queue.put(None)
+
+    # consumer side
+    def run(self):
+        _QUEUE_DEPTH.set_function(self._queue.qsize)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            # drain whatever else is waiting and merge runs of upserts for the same target
+            while True:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._stopping.set()
+                    break
+                batch.append(nxt)
+            self._apply(batch)
+            if self._stopping.is_set() and self._queue.empty():
+                break
+        # fail anything that raced in after stop
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item:
+                item[3].set_exception(RuntimeError("writer stopped"))
+        _QUEUE_DEPTH.remove()
+
+    def _apply(self, batch):
+        i = 0
+        while i < len(batch):
+            op, db_path, args, fut = batch[i]
+            if op == "upsert":
+                group = [batch[i]]
+                while (i + len(group) < len(batch) and batch[i + len(group)][0] == "upsert"
+                       and batch[i + len(group)][1] == db_path and batch[i + len(group)][2][1] == args[1]):
+                    group.append(batch[i + len(group)])
+                rows = [r for g in group for r in g[2][0]]
+                try:
+                    upsert_tasks(db_path, rows, chunk_size=len(rows) or 1, source=args[1])
+                    for g in group:
+                        g[3].set_result(len(g[2][0]))
+                except Exception as exc:
+                    for g in group:
+                        g[3].set_exception(exc)
+                i += len(group)
+                continue
+            try:
+                if op == "delete":
+                    fut.set_result(delete_tasks(db_path, args[0]))
+                elif op == "call":
+                    fut.set_result(args[0](db_path, *args[1]))
+                else:
+                    set_sync_state(db_path, *args)
+                    fut.set_result(None)
+            except Exception as exc:
+                fut.set_exception(exc)
+            i += 1
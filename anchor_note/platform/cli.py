@@ -1,17 +1,68 @@
 """CLI entrypoint used by console_scripts"""
 
 import argparse
+import logging
 import sys
+import time
 from ..core.settings import load_user_config
-from ..core.scheduler import Scheduler
+
+def _wait_forever():
+    # blocks without burning CPU; time.sleep stays interruptible by Ctrl+C on Windows too
+    while True:
+        time.sleep(3600)
+
+def _daemon(args) -> int:
+    from .daemon import AlreadyRunning, Daemon, check_ready
+
+    if args.check:
+        info = check_ready()
+        if info is None:
+            print("anchor-note daemon is not running")
+            return 1
+        print(f"anchor-note daemon ready (pid {info['pid']}, up {info['uptime']}s)")
+        return 0
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.INFO),
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        return Daemon(pidfile=args.pidfile).run()
+    except AlreadyRunning as e:
+        print(e, file=sys.stderr)
+        return 1
+
+def _compact(args) -> int:
+    from ..core.retention import enable_incremental_vacuum, run_maintenance
+    from ..core.scheduler import _ensure_db
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    db_path = load_user_config()["db_path"]
+    _ensure_db(db_path)
+    if enable_incremental_vacuum(db_path):
+        print(f"{db_path} now uses incremental auto-vacuum.")
+    stats = run_maintenance(db_path)
+    print(f"Archived {stats['archived']} rows; {stats['file_bytes_before']} -> {stats['file_bytes_after']} bytes.")
+    return 0
 
 def main(argv=None):
     parser = argparse.ArgumentParser(prog="sticky-remind")
     parser.add_argument("--foreground", action="store_true", help="Run scheduler in foreground")
     parser.add_argument("--gui", action="store_true", help="Start GUI agent (if available)")
     parser.add_argument("--sync-ics", help="Sync an .ics file immediately")
+    sub = parser.add_subparsers(dest="command")
+    d = sub.add_parser("daemon", help="Run scheduler + socket service headless (systemd friendly)")
+    d.add_argument("--pidfile", help="Pidfile path (default: pid_file setting)")
+    d.add_argument("--check", action="store_true", help="Exit 0 if a running daemon answers, else 1")
+    d.add_argument("--log-level", default="info", help="Logging level (default: info)")
+    sub.add_parser("compact", help="Archive old tasks and shrink the DB file (stop the service first: "
+                                   "older DB files are rewritten with a full VACUUM once)")
     args = parser.parse_args(argv or sys.argv[1:])
 
+    if args.command == "daemon":
+        return _daemon(args)
+    if args.command == "compact":
+        return _compact(args)
+
+    from ..core.scheduler import Scheduler  # the DB / sync stack; not needed for --help or daemon --check
+
     sched = Scheduler()
     if args.sync_ics:
         from ..core.calendar_sync import sync_from_ics
@@ -31,8 +82,7 @@ def main(argv=None):
         sched.start()
         print("Scheduler running in foreground. Ctrl+C to stop.")
         try:
-            while True:
-                pass
+            _wait_forever()
         except KeyboardInterrupt:
             sched.stop()
     else:
@@ -40,7 +90,6 @@ def main(argv=None):
         sched.start()
         print("Scheduler running in foreground (default). Ctrl+C to stop.")
         try:
-            while True:
-                pass
+            _wait_forever()
         except KeyboardInterrupt:
             sched.stop()
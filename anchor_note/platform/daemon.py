@@ -0,0 +1,233 @@
+"""
+daemon.py
+
+Headless service for Linux/macOS (`anchor-note daemon`): Scheduler + socket server +
+event feed + command protocol in one process, the same stack the Windows service runs.
+
+- the main thread blocks on an Event, so the process uses no CPU while idle
+- SIGTERM / SIGINT -> graceful shutdown, SIGHUP -> reload config (applied in place)
+- SIGUSR1 -> toggle the slow-op log, SIGUSR2 -> profile the next loop iterations
+  (see utils/profiling.py)
+- pidfile (stale files from a crashed run are replaced)
+- readiness: systemd is told READY=1 (Type=notify) once the socket is listening, and
+  check_ready() pings the running daemon over the socket (`anchor-note daemon --check`)
+
+Example unit:
+
+    [Service]
+    Type=notify
+    ExecStart=/usr/bin/anchor-note daemon
+    ExecReload=/bin/kill -HUP $MAINPID
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+from pathlib import Path
+
+from ..core.scheduler import Scheduler
+from ..core.settings import load_user_config, reload_config
+from ..utils import profiling
+from .service_protocol import ServiceClient, ServiceProtocol
+from .windows_service_socket import server_from_config, feed_from_config
+
+LOG = logging.getLogger(__name__)
+
+READY_TIMEOUT = 10.0
+DEFAULT_SLOW_MS = 500  # SIGUSR1 threshold when profiling_slow_ms isn't configured
+
+
+class AlreadyRunning(RuntimeError):
+    pass
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # exists, owned by someone else
+    except OSError:
+        return False
+    return True
+
+
+def write_pidfile(path) -> Path:
+    """Create the pidfile atomically; raises AlreadyRunning if a live process owns it."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    for _ in range(2):
+        try:
+            fd = os.open(p, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            try:
+                pid = int(p.read_text().strip() or 0)
+            except (OSError, ValueError):
+                pid = 0
+            if pid and pid != os.getpid() and _pid_alive(pid):
+                raise AlreadyRunning(f"anchor-note daemon already running (pid {pid})")
+            LOG.info("removing stale pidfile %s", p)
+            p.unlink(missing_ok=True)
+            continue
+        with os.fdopen(fd, "w") as fh:
+            fh.write(f"{os.getpid()}\n")
+        return p
+    raise AlreadyRunning(f"cannot create pidfile {p}")
+
+
+def remove_pidfile(path):
+    p = Path(path)
+    try:
+        if int(p.read_text().strip() or 0) == os.getpid():
+            p.unlink()
+    except (OSError, ValueError):
+        pass
+
+
+def sd_notify(state: str) -> bool:
+    """Send a systemd notification (no-op unless started with NOTIFY_SOCKET)."""
+    addr = os.environ.get("NOTIFY_SOCKET")
+    if not addr or not hasattr(socket, "AF_UNIX"):
+        return False
+    if addr.startswith("@"):
+        addr = "\0" + addr[1:]  # abstract namespace
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as s:
+            s.connect(addr)
+            s.sendall(state.encode("utf-8"))
+        return True
+    except OSError:
+        LOG.debug("sd_notify failed", exc_info=True)
+        return False
+
+
+def check_ready(config: dict | None = None, timeout: float = 2.0) -> dict | None:
+    """Ping a running daemon; returns its {"pid", "uptime"} or None if it isn't answering."""
+    cfg = config or load_user_config()
+    try:
+        with ServiceClient(cfg.get("socket_host", "127.0.0.1"), int(cfg.get("socket_port", 8765)),
+                           timeout=timeout) as client:
+            return client.call("ping")
+    except Exception:
+        return None
+
+
+class Daemon:
+    def __init__(self, config: dict | None = None, pidfile=None):
+        self._follow_config = config is None  # the Scheduler then applies config.json edits itself
+        self.config = config or load_user_config()
+        self.pidfile = Path(pidfile or self.config["pid_file"]).expanduser()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._reload = False
+        self._toggle_slow = False
+        self._capture = False
+        self.scheduler = None
+        self.server = None
+        self.feed = None
+        self.commands = None
+
+    # signal handlers only set flags; the main loop does the work
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+        self._wake.set()
+
+    def _on_reload(self, signum, frame):
+        self._reload = True
+        self._wake.set()
+
+    def _on_usr1(self, signum, frame):
+        self._toggle_slow = True
+        self._wake.set()
+
+    def _on_usr2(self, signum, frame):
+        self._capture = True
+        self._wake.set()
+
+    def request_stop(self):
+        self._on_stop(None, None)
+
+    def _install_signals(self):
+        if threading.current_thread() is not threading.main_thread():
+            return
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._on_reload)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self._on_usr1)
+            signal.signal(signal.SIGUSR2, self._on_usr2)
+
+    def start(self):
+        self.scheduler = Scheduler(self.config, follow_config=self._follow_config)
+        self.server = server_from_config(self.config)
+        self.feed = feed_from_config(self.server, self.scheduler.config)
+        self.commands = ServiceProtocol(self.server, self.scheduler, self.feed)
+        self.commands.start()
+        self.server.start()
+        if not self.server.ready.wait(READY_TIMEOUT) or self.server.error:
+            self.commands.stop()
+            raise RuntimeError(f"socket server failed to start: {self.server.error}")
+        self.feed.start()
+        self.scheduler.start()
+
+    def reload(self):
+        """Re-read the config now instead of waiting for the file watch.
+
+        The running Scheduler applies it in place (sync sources, intervals, alerts); only a
+        changed db_path restarts it, and the event feed switches to the new DB. The socket
+        stays up; host/port changes need a restart."""
+        sd_notify("RELOADING=1")
+        LOG.info("reloading configuration")
+        config = reload_config()
+        self.config = config
+        if config["db_path"] != self.scheduler.db_path:
+            self.scheduler.stop()
+            self.scheduler = Scheduler(config, follow_config=self._follow_config)
+            self.commands.scheduler = self.scheduler
+            self.feed.retarget(config["db_path"])
+            self.scheduler.start()
+        sd_notify("READY=1")
+
+    def stop(self):
+        sd_notify("STOPPING=1")
+        for part in (self.scheduler, self.feed, self.server, self.commands):
+            if part is None:
+                continue
+            try:
+                part.stop()
+            except Exception:
+                LOG.exception("failed stopping %s", type(part).__name__)
+
+    def run(self) -> int:
+        write_pidfile(self.pidfile)
+        try:
+            self._install_signals()
+            self.start()
+            sd_notify(f"READY=1\nMAINPID={os.getpid()}")
+            LOG.info("anchor-note daemon ready (pid %d)", os.getpid())
+            while not self._stopping:
+                self._wake.wait()
+                self._wake.clear()
+                if self._reload and not self._stopping:
+                    self._reload = False
+                    try:
+                        self.reload()
+                    except Exception:
+                        LOG.exception("reload failed")
+                if self._toggle_slow:
+                    self._toggle_slow = False
+                    on = not profiling.status()["slow_ms"]
+                    profiling.set_slow_threshold(
+                        (self.config.get("profiling_slow_ms") or DEFAULT_SLOW_MS) if on else 0)
+                if self._capture:
+                    self._capture = False
+                    profiling.capture(self.config.get("profiling_iterations"))
+            return 0
+        finally:
+            self.stop()
+            remove_pidfile(self.pidfile)
+            LOG.info("anchor-note daemon stopped")
@@ -9,10 +9,56 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime, timezone
 from ..core.checklist import list_pending_tasks, mark_task_done
+from ..core.settings import load_user_config
+from .service_protocol import ProtocolError, ServiceClient
 
 def _format_dt(dt):
     return dt.strftime("%Y-%m-%d %H:%M") if dt else ""
 
+def _connect():
+    """Client for the running service, or None if it isn't running."""
+    cfg = load_user_config()
+    try:
+        return ServiceClient(cfg.get("socket_host", "127.0.0.1"), int(cfg.get("socket_port", 8765)))
+    except OSError:
+        return None
+
+def _mark_done(task_ids) -> bool:
+    """Ask the service to mark tasks done (it owns the DB); write directly if it isn't running.
+
+    A request the service fails is reported to the user (no direct write behind its back)."""
+    client = _connect()
+    if client is None:
+        for task_id in task_ids:
+            mark_task_done(task_id)
+        return True
+    with client:
+        try:
+            client.call("mark_done", task_ids=list(task_ids))
+        except (ProtocolError, OSError, ValueError) as exc:
+            messagebox.showerror("Mark done failed", str(exc))
+            return False
+    return True
+
+def _service_calls(op, task_ids, action: str) -> bool:
+    """Run op for each task on the service (alerts only ring there). Tells the user and
+    returns False if the service isn't running or any request failed."""
+    client = _connect()
+    if client is None:
+        messagebox.showinfo("Service not running", f"Alerts are raised by the service; start it to {action}.")
+        return False
+    with client:
+        try:
+            results = client.call_many([(op, {"task_id": t}) for t in task_ids])
+        except (OSError, ValueError) as exc:
+            messagebox.showerror(f"Cannot {action}", str(exc))
+            return False
+    errors = [f"task {t}: {r}" for t, r in zip(task_ids, results) if isinstance(r, ProtocolError)]
+    if errors:
+        messagebox.showinfo(f"Cannot {action}", "\n".join(errors))
+        return False
+    return True
+
 class ChecklistWindow(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -37,6 +83,7 @@ class ChecklistWindow(tk.Tk):
         ttk.Button(btnframe, text="Refresh", command=self.refresh_tasks).pack(side=tk.LEFT, padx=4)
         ttk.Button(btnframe, text="Mark Done", command=self.mark_done).pack(side=tk.LEFT, padx=4)
         ttk.Button(btnframe, text="Dismiss Alerts", command=self.dismiss_alerts).pack(side=tk.RIGHT, padx=4)
+        ttk.Button(btnframe, text="Snooze", command=self.snooze).pack(side=tk.RIGHT, padx=4)
 
     def refresh_tasks(self):
         self.tree.delete(*self.tree.get_children())
@@ -51,15 +98,21 @@ class ChecklistWindow(tk.Tk):
             messagebox.showinfo("No selection", "Select a task first.")
             return
         task_id = int(sel[0])
-        mark_task_done(task_id)
+        _mark_done([task_id])
         self.refresh_tasks()
 
+    def snooze(self):
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showinfo("No selection", "Select a task first.")
+            return
+        _service_calls("snooze", [int(sel[0])], "snooze")
+
     def dismiss_alerts(self):
-        # For minimal implementation, "dismiss" equals mark done for red tasks in the list
-        for iid in self.tree.get_children():
-            vals = self.tree.item(iid, "values")
-            if vals[1] == "YES":
-                mark_task_done(int(iid))
+        # silence the red tasks' alerts; they stay in the list until marked done
+        red = [int(iid) for iid in self.tree.get_children() if self.tree.item(iid, "values")[1] == "YES"]
+        if red:
+            _service_calls("ack", red, "dismiss alerts")
         self.refresh_tasks()
 
 def main():
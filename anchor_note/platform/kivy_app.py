@@ -9,7 +9,7 @@ from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.label import Label
 from kivy.clock import Clock
-from ..core.checklist import list_pending_tasks, mark_task_done
+from ..core.checklist import count_pending
 
 class MainBox(BoxLayout):
     def __init__(self, **kwargs):
@@ -19,8 +19,7 @@ class MainBox(BoxLayout):
         Clock.schedule_interval(self.refresh, 5)
 
     def refresh(self, dt):
-        rows = list_pending_tasks()
-        self.lbl.text = f"Sticky Remind — pending tasks: {len(rows)}"
+        self.lbl.text = f"Sticky Remind — pending tasks: {count_pending()}"
 
 class StickyKivyApp(App):
     def build(self):
@@ -0,0 +1,250 @@
+"""
+service_protocol.py
+
+Request/response commands on the service socket, so GUI agents never open the SQLite DB
+themselves: the service process is the only writer.
+
+A request is one JSON line {"id": <any>, "op": <name>, ...args}; the reply is
+{"type": "response", "id": <same>, "ok": true, "result": ...} or
+{"type": "response", "id": <same>, "ok": false, "error": "..."}. Requests may be
+pipelined: a client can send many lines without waiting, replies come back in order
+(event lines from a subscription may be interleaved; match replies by "id").
+
+Ops:
+- ack {task_id}                      -> silence the task's alert, keep the task pending
+- mark_done {task_id | task_ids}     -> mark done; consecutive requests share one transaction
+- snooze {task_id, seconds|minutes}  -> silence now, alert again later (default snooze_default_minutes);
+                                        fails once the alert was snoozed snooze_max times
+- list {status, due_from, due_before, red, limit, cursor}
+                                     -> {"tasks", "cursor"}; status "pending" (default) / "done" /
+                                        "all", pass "cursor" back for the next page
+- subscribe {last_seq, epoch}        -> start the event stream (see EventFeed)
+- ping                               -> {"pid", "uptime"}; used as a readiness/liveness check
+- stats {format}                     -> metrics snapshot (see utils.metrics); format "prometheus"
+                                        returns the text exposition instead
+- profile {action: "status" | "capture" | "cancel" | "slow", iterations, loops, slow_ms}
+                                     -> profiling.status(); "capture" profiles the next iterations
+                                        of the loops, "slow" sets the slow-op threshold (0 = off)
+
+- ServiceProtocol(server, scheduler, feed) -> server-side dispatcher, one worker thread
+- ServiceClient(host, port) -> blocking client with call() and pipelined call_many()
+"""
+
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+
+from ..core.events import task_fields
+from ..core.scheduler import mark_tasks_done, query_tasks
+from ..utils import metrics, profiling
+
+LOG = logging.getLogger(__name__)
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ServiceProtocol(threading.Thread):
+    """Runs client commands on one worker thread, off the socket loop."""
+
+    MAX_BATCH = 256
+
+    def __init__(self, server, scheduler, feed=None):
+        super().__init__(daemon=True, name="anchor-note-commands")
+        self.server = server
+        self.scheduler = scheduler
+        self.feed = feed
+        self._queue = queue.Queue()
+        self._started_at = time.monotonic()
+        server.handler = self.handle
+
+    # socket loop side
+    def handle(self, client, msg):
+        if not isinstance(msg, dict):
+            return
+        if msg.get("op") is None and msg.get("type") == "subscribe":
+            msg = dict(msg, op="subscribe")  # bare subscribe line, no reply expected
+        if msg.get("op") is None:
+            return
+        self._queue.put((client, msg))
+
+    def stop(self):
+        self._queue.put(None)
+
+    # worker side
+    def run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # drain pipelined requests so consecutive mark_done ops share a transaction
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    nxt = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._process(batch)
+                    return
+                batch.append(nxt)
+            with profiling.sample("commands"):
+                self._process(batch)
+
+    def _process(self, batch):
+        i = 0
+        while i < len(batch):
+            if batch[i][1].get("op") == "mark_done":
+                j = i
+                while j < len(batch) and batch[j][1].get("op") == "mark_done":
+                    j += 1
+                self._mark_done(batch[i:j])
+                i = j
+                continue
+            client, msg = batch[i]
+            try:
+                result = self._dispatch(client, msg)
+            except Exception as exc:
+                self._error(client, msg, exc)
+            else:
+                if msg.get("type") != "subscribe":
+                    self._reply(client, msg, result)
+            i += 1
+
+    def _dispatch(self, client, msg):
+        op = msg.get("op")
+        if op == "ping":
+            return {"pid": os.getpid(), "uptime": round(time.monotonic() - self._started_at, 1)}
+        if op == "ack":
+            return {"stopped": self.scheduler.acknowledge(_task_id(msg))}
+        if op == "snooze":
+            seconds = msg.get("seconds")
+            if seconds is None and msg.get("minutes") is not None:
+                seconds = float(msg["minutes"]) * 60
+            due = self.scheduler.snooze(_task_id(msg), seconds)
+            if due is None:
+                raise ProtocolError("no such pending task")
+            return {"due_ts": due}
+        if op == "list":
+            status = msg.get("status", "pending")
+            rows, cursor = query_tasks(self.scheduler.db_path, None if status == "all" else status,
+                                       msg.get("due_from"), msg.get("due_before"), msg.get("red"),
+                                       msg.get("limit"), msg.get("cursor"))
+            return {"tasks": [task_fields(r) for r in rows], "cursor": cursor}
+        if op == "stats":
+            return metrics.render() if msg.get("format") == "prometheus" else metrics.snapshot()
+        if op == "profile":
+            action = msg.get("action", "status")
+            if action == "capture":
+                profiling.capture(msg.get("iterations"), msg.get("loops"))
+            elif action == "cancel":
+                profiling.cancel_captures()
+            elif action == "slow":
+                profiling.set_slow_threshold(float(msg.get("slow_ms", 0)))
+            elif action != "status":
+                raise ProtocolError(f"unknown profile action {action!r}")
+            return profiling.status()
+        if op == "subscribe":
+            if self.feed is None:
+                raise ProtocolError("event stream not available")
+            self.feed.subscribe(client, msg.get("last_seq"), msg.get("epoch"))
+            return {"epoch": self.feed.stream.epoch}
+        raise ProtocolError(f"unknown op {op!r}")
+
+    def _mark_done(self, group):
+        valid = []
+        for client, msg in group:
+            try:
+                valid.append((client, msg, _task_ids(msg)))
+            except ProtocolError as exc:
+                self._error(client, msg, exc)
+        try:
+            done = set(mark_tasks_done(self.scheduler.db_path, [t for _, _, ids in valid for t in ids]))
+        except Exception as exc:
+            for client, msg, _ in valid:
+                self._error(client, msg, exc)
+            return
+        for client, msg, ids in valid:
+            self._reply(client, msg, {"done": [t for t in ids if t in done]})
+
+    def _reply(self, client, msg, result):
+        self.server.send(client, {"type": "response", "id": msg.get("id"), "ok": True, "result": result})
+
+    def _error(self, client, msg, exc):
+        if not isinstance(exc, (ProtocolError, KeyError, TypeError, ValueError)):
+            LOG.exception("command %r failed", msg.get("op"))
+        self.server.send(client, {"type": "response", "id": msg.get("id"), "ok": False, "error": str(exc)})
+
+
+def _task_id(msg) -> int:
+    try:
+        return int(msg["task_id"])
+    except (KeyError, TypeError, ValueError):
+        raise ProtocolError("task_id required") from None
+
+
+def _task_ids(msg) -> list:
+    if "task_ids" in msg:
+        try:
+            return [int(t) for t in msg["task_ids"]]
+        except (TypeError, ValueError):
+            raise ProtocolError("task_ids must be a list of ints") from None
+    return [_task_id(msg)]
+
+
+class ServiceClient:
+    """Minimal blocking client for the service socket (used by GUI agents)."""
+
+    def __init__(self, host="127.0.0.1", port=8765, timeout: float = 5.0, on_event=None):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self.sock.makefile("rb")
+        self._ids = itertools.count(1)
+        self.on_event = on_event  # called with event dicts that arrive between replies
+
+    def close(self):
+        try:
+            self._file.close()
+            self.sock.close()
+        except Exception:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def call(self, op: str, **args):
+        result = self.call_many([(op, args)])[0]
+        if isinstance(result, ProtocolError):
+            raise result
+        return result
+
+    def call_many(self, requests) -> list:
+        """Send every (op, args) request in one write, then collect the replies in order.
+
+        Failed requests come back as ProtocolError instances instead of raising."""
+        ids = []
+        lines = []
+        for op, args in requests:
+            rid = next(self._ids)
+            ids.append(rid)
+            lines.append(json.dumps(dict(args, id=rid, op=op)) + "\n")
+        self.sock.sendall("".join(lines).encode("utf-8"))
+        results = {}
+        while len(results) < len(ids):
+            line = self._file.readline()
+            if not line:
+                raise ConnectionError("service closed the connection")
+            msg = json.loads(line)
+            if msg.get("type") == "response" and msg.get("id") in ids:
+                results[msg["id"]] = msg["result"] if msg.get("ok") else ProtocolError(msg.get("error"))
+            elif self.on_event:
+                self.on_event(msg)
+        return [results[rid] for rid in ids]
@@ -3,15 +3,19 @@ Windows service socket wrapper — lightweight loopback server that allows GUI a
 alerts from the service. The actual service logic runs in core.scheduler.Scheduler.
 
 This file exposes a ServiceFramework implementation (pywin32) that boots a LocalSocketServer
-and the Scheduler. The GUI agent connects to the socket to receive alerts (JSON per-line).
+and the Scheduler. The GUI agent connects to the socket to receive alerts (JSON per-line):
+after sending {"type": "subscribe"} it gets "alert" / "updated" / "done" / "removed"
+events as tasks change (see EventFeed and core/events.py). Commands (ack, mark_done,
+snooze, list) use the request/response protocol in service_protocol.py.
 """
 
 import json
 import logging
+import selectors
 import socket
 import threading
 import time
-from datetime import datetime, timezone
+from collections import deque
 
 # windows_service_socket.py (top)
 try:
@@ -29,95 +33,373 @@ except Exception:
 
 # pywin32 imports guarded (module only needed when run as service on Windows)
 
-from ..core.scheduler import Scheduler
-from ..core.checklist import list_pending_tasks
+from ..core.scheduler import Scheduler, add_task_listener, remove_task_listener, get_pending_tasks
+from ..core.events import EventStream, task_listener, task_fields
+from ..core.settings import load_user_config
+from .service_protocol import ServiceProtocol
+from ..utils import metrics, profiling
 
 LOG = logging.getLogger(__name__)
 HOST = "127.0.0.1"
 PORT = 8765
 
+_CLIENTS = metrics.gauge("anchor_socket_clients", "Connected socket clients")
+_QUEUED = metrics.gauge("anchor_socket_queued_bytes", "Unsent bytes queued for socket clients")
+_QUEUED_MAX = metrics.gauge("anchor_socket_queued_bytes_max", "Largest per-client unsent queue")
+_BROADCAST = metrics.histogram("anchor_socket_broadcast_seconds", "Time to encode and queue one broadcast")
+_MESSAGES = metrics.counter("anchor_socket_messages_total", "Messages queued for socket clients")
+_SLOW = metrics.counter("anchor_socket_slow_consumer_total", "Slow-consumer policy actions")
+
+class _Client:
+    """Per-connection state: line-framing input buffer and bounded outbound queue."""
+    __slots__ = ("sock", "addr", "inbuf", "scan", "outq", "out_offset", "queued_bytes", "dropped", "closing",
+                 "state")
+
+    def __init__(self, sock, addr):
+        self.sock = sock
+        self.addr = addr
+        self.inbuf = bytearray()
+        self.scan = 0            # bytes of inbuf already searched for a newline
+        self.outq = deque()      # encoded messages; the head may be partially sent
+        self.out_offset = 0
+        self.queued_bytes = 0
+        self.dropped = 0
+        self.closing = False
+        self.state = {}          # free for the protocol layer (e.g. "subscribed")
+
+
 class LocalSocketServer(threading.Thread):
-    def __init__(self, host=HOST, port=PORT):
+    """Single-threaded, selector-driven JSON-lines server.
+
+    All sockets are non-blocking and served from one thread. broadcast() only enqueues
+    (it is safe to call from any thread) and wakes the selector; each client has its own
+    bounded outbound queue, so a GUI agent that stops reading never blocks the others.
+    When a client's queue would exceed max_queue_bytes the slow-consumer policy applies:
+    "disconnect" (default) drops the client, "drop_oldest" discards its oldest unsent
+    messages. Incoming lines are passed to `handler(client, obj)` if one is set."""
+
+    MAX_LINE_BYTES = 64 * 1024
+    RECV_SIZE = 64 * 1024
+
+    def __init__(self, host=HOST, port=PORT, handler=None, max_queue_bytes: int = 1 << 20,
+                 slow_consumer: str = "disconnect"):
         super().__init__(daemon=True)
         self.host = host
         self.port = port
-        self._stop = threading.Event()
+        self.handler = handler
+        self.max_queue_bytes = int(max_queue_bytes)
+        self.slow_consumer = slow_consumer
+        self._stopping = threading.Event()  # not _stop: that name is used by threading.Thread
+        self._lock = threading.Lock()  # guards clients / outbound queues (broadcast runs on other threads)
+        self._sel = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
         self.sock = None
-        self.clients = []
+        self.clients: dict[socket.socket, _Client] = {}
+        self.ready = threading.Event()  # set once listening (or once binding failed: see .error)
+        self.error = None
 
     def run(self):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.sock.bind((self.host, self.port))
-        self.sock.listen(5)
-        self.sock.settimeout(1.0)
+        try:
+            self.sock.bind((self.host, self.port))
+            self.sock.listen(128)
+        except OSError as exc:
+            LOG.error("Socket server cannot listen on %s:%d: %s", self.host, self.port, exc)
+            self.error = exc
+            self.sock.close()
+            self.ready.set()
+            return
+        self.sock.setblocking(False)
+        self._sel.register(self.sock, selectors.EVENT_READ, None)
+        self._sel.register(self._wake_r, selectors.EVENT_READ, None)
         LOG.info("Socket server listening on %s:%d", self.host, self.port)
-        while not self._stop.is_set():
+        _CLIENTS.set_function(self.clients.__len__)
+        _QUEUED.set_function(lambda: self._queued_bytes(sum))
+        _QUEUED_MAX.set_function(lambda: self._queued_bytes(max))
+        self.ready.set()
+        try:
+            while not self._stopping.is_set():
+                ready = self._sel.select()
+                with profiling.sample("socket"):
+                    for key, mask in ready:
+                        if key.fileobj is self.sock:
+                            self._accept()
+                        elif key.fileobj is self._wake_r:
+                            self._drain_wakeups()
+                        else:
+                            client = key.data
+                            if mask & selectors.EVENT_READ:
+                                self._read(client)
+                            if mask & selectors.EVENT_WRITE and not client.closing:
+                                self._write(client)
+                    self._update_interest()
+        except Exception:
+            LOG.exception("socket server loop")
+        finally:
+            # cleanup
+            with self._lock:
+                clients = list(self.clients.values())
+            for c in clients:
+                self._close(c)
+            for gauge in (_CLIENTS, _QUEUED, _QUEUED_MAX):
+                gauge.remove()
+            for s in (self.sock, self._wake_r, self._wake_w):
+                try:
+                    s.close()
+                except Exception:
+                    pass
+            self._sel.close()
+
+    def _queued_bytes(self, agg) -> int:
+        with self._lock:
+            return agg((c.queued_bytes for c in self.clients.values()), default=0)
+
+    def _accept(self):
+        while True:
             try:
                 conn, addr = self.sock.accept()
-                conn.settimeout(1.0)
-                self.clients.append(conn)
-                threading.Thread(target=self._client_reader, args=(conn,), daemon=True).start()
-            except socket.timeout:
-                continue
+            except (BlockingIOError, InterruptedError):
+                return
             except Exception:
                 LOG.exception("socket accept")
+                return
+            conn.setblocking(False)
+            client = _Client(conn, addr)
+            with self._lock:
+                self.clients[conn] = client
+            self._sel.register(conn, selectors.EVENT_READ, client)
 
-        # cleanup
-        for c in self.clients:
-            try:
-                c.close()
-            except Exception:
-                pass
+    def _drain_wakeups(self):
         try:
-            self.sock.close()
-        except Exception:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
             pass
 
-    def _client_reader(self, conn):
+    def _wakeup(self):
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, InterruptedError):
+            pass  # a wakeup is already pending
+        except OSError:
+            pass  # server closed
+
+    def _read(self, client):
         try:
-            buf = b""
-            while not self._stop.is_set():
+            data = client.sock.recv(self.RECV_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close(client)
+            return
+        buf = client.inbuf
+        buf += data
+        start = 0
+        while True:
+            nl = buf.find(b"\n", max(start, client.scan))
+            if nl < 0:
+                break
+            line = bytes(buf[start:nl])
+            start = nl + 1
+            client.scan = start
+            if line.strip():
+                self._handle_line(client, line)
+        if start:
+            del buf[:start]
+        client.scan = len(buf)
+        if len(buf) > self.MAX_LINE_BYTES:
+            LOG.warning("client %s sent an oversized line; disconnecting", client.addr)
+            self._close(client)
+
+    def _handle_line(self, client, line: bytes):
+        try:
+            obj = json.loads(line.decode("utf-8"))
+        except Exception:
+            LOG.debug("ignoring malformed line from %s", client.addr)
+            return
+        if self.handler is None:
+            return
+        try:
+            self.handler(client, obj)
+        except Exception:
+            LOG.exception("socket message handler failed")
+
+    def _write(self, client):
+        with self._lock:
+            while client.outq:
+                head = client.outq[0]
                 try:
-                    data = conn.recv(4096)
-                    if not data:
-                        break
-                    buf += data
-                    while b"\n" in buf:
-                        line, buf = buf.split(b"\n", 1)
-                        try:
-                            obj = json.loads(line.decode("utf-8"))
-                            # simple ack handling could be implemented here
-                        except Exception:
-                            pass
-                except socket.timeout:
-                    continue
-        finally:
+                    sent = client.sock.send(memoryview(head)[client.out_offset:])
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    client.closing = True
+                    break
+                client.out_offset += sent
+                if client.out_offset < len(head):
+                    return
+                client.outq.popleft()
+                client.queued_bytes -= len(head)
+                client.out_offset = 0
+        if client.closing:
+            self._close(client)
+
+    def _update_interest(self):
+        with self._lock:
+            clients = list(self.clients.values())
+        for c in clients:
+            if c.closing:
+                self._close(c)
+                continue
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if c.outq else 0)
             try:
-                conn.close()
-            except Exception:
+                if self._sel.get_key(c.sock).events != events:
+                    self._sel.modify(c.sock, events, c)
+            except (KeyError, ValueError):
                 pass
-            if conn in self.clients:
-                self.clients.remove(conn)
 
-    def broadcast(self, obj: dict):
+    def _close(self, client):
+        with self._lock:
+            self.clients.pop(client.sock, None)
+        try:
+            self._sel.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            client.sock.close()
+        except Exception:
+            pass
+
+    def _enqueue(self, client, msg: bytes) -> bool:
+        """Queue msg for one client (lock held). False if the client is being dropped."""
+        if client.closing:
+            return False
+        if client.queued_bytes + len(msg) > self.max_queue_bytes:
+            if self.slow_consumer != "drop_oldest":
+                LOG.warning("client %s is not reading (%d bytes queued); disconnecting",
+                            client.addr, client.queued_bytes)
+                _SLOW.inc(action="disconnect")
+                client.closing = True
+                return False
+            # never drop a partially sent head, that would corrupt the line framing
+            first = 1 if client.out_offset else 0
+            while len(client.outq) > first and client.queued_bytes + len(msg) > self.max_queue_bytes:
+                dropped = client.outq[first]
+                del client.outq[first]
+                client.queued_bytes -= len(dropped)
+                client.dropped += 1
+                _SLOW.inc(action="drop_oldest")
+        client.outq.append(msg)
+        client.queued_bytes += len(msg)
+        return True
+
+    def send(self, client, obj: dict) -> bool:
+        """Queue one message for a single client; safe from any thread."""
         msg = (json.dumps(obj) + "\n").encode("utf-8")
-        dead = []
-        for c in list(self.clients):
-            try:
-                c.sendall(msg)
-            except Exception:
-                dead.append(c)
-                try:
-                    c.close()
-                except Exception:
-                    pass
-        for d in dead:
-            if d in self.clients:
-                self.clients.remove(d)
+        with self._lock:
+            ok = self._enqueue(client, msg)
+        _MESSAGES.inc()
+        self._wakeup()
+        return ok
+
+    def broadcast(self, obj: dict, where=None):
+        """Queue obj for every client (or those for which where(client) is true)."""
+        with metrics.timed(_BROADCAST):
+            msg = (json.dumps(obj) + "\n").encode("utf-8")  # encoded once for all clients
+            queued = 0
+            with self._lock:
+                for c in self.clients.values():
+                    if where is None or where(c):
+                        queued += self._enqueue(c, msg)
+            _MESSAGES.inc(queued)
+        self._wakeup()
+
+    def stop(self):
+        self._stopping.set()
+        self._wakeup()
+
+def server_from_config(config: dict | None = None, **kwargs) -> LocalSocketServer:
+    cfg = config or load_user_config()
+    return LocalSocketServer(cfg.get("socket_host", HOST), int(cfg.get("socket_port", PORT)),
+                             max_queue_bytes=int(cfg.get("socket_max_queue_bytes", 1 << 20)),
+                             slow_consumer=cfg.get("socket_slow_consumer", "disconnect"), **kwargs)
+
+class EventFeed:
+    """Pushes task state changes to subscribed socket clients.
+
+    A client sends {"type": "subscribe"} to start receiving events, optionally with the
+    "epoch" and "last_seq" it saw before a reconnect: missed events are then replayed
+    from the ring buffer, or a {"type": "snapshot"} of all pending tasks is sent when
+    they're gone. Live events follow without gaps or duplicates."""
+
+    def __init__(self, server: LocalSocketServer, db_path: str, capacity: int = 1024):
+        self.server = server
+        self.db_path = db_path
+        self.stream = EventStream(capacity)
+        self.alerting = set()  # task ids whose alert is active, for snapshots
+        self._listener = task_listener(self.stream, db_path)
+        self.stream.subscribe(self._forward)
+
+    def start(self):
+        add_task_listener(self._listener)
 
     def stop(self):
-        self._stop.set()
+        remove_task_listener(self._listener)
+
+    def retarget(self, db_path: str):
+        """Follow another tasks DB (db_path reload): subscribers get a snapshot of it, then its events."""
+        with self.stream.lock:
+            remove_task_listener(self._listener)
+            self.db_path = db_path
+            self.alerting.clear()
+            self._listener = task_listener(self.stream, db_path)
+            add_task_listener(self._listener)
+            snapshot = self.snapshot()
+            self.server.broadcast(snapshot, where=lambda c: c.state.get("subscribed"))
+
+    def _forward(self, event):
+        # runs with stream.lock held
+        if event["type"] == "alert":
+            self.alerting.add(event["task_id"])
+        elif event["type"] in ("done", "removed"):
+            self.alerting.discard(event["task_id"])
+        self.server.broadcast(event, where=lambda c: c.state.get("subscribed"))
+
+    def handle(self, client, msg: dict):
+        if msg.get("type") == "subscribe":
+            self.subscribe(client, msg.get("last_seq"), msg.get("epoch"))
+
+    def subscribe(self, client, last_seq=None, epoch=None):
+        with self.stream.lock:  # no event can be published between the replay and going live
+            events = None
+            if last_seq is not None:
+                try:
+                    events = self.stream.since(int(last_seq), epoch)
+                except (TypeError, ValueError):
+                    events = None
+            if events is None:
+                self.server.send(client, self.snapshot())
+            else:
+                for event in events:
+                    self.server.send(client, event)
+            client.state["subscribed"] = True
+
+    def snapshot(self) -> dict:
+        tasks = []
+        for row in get_pending_tasks(self.db_path):
+            fields = task_fields(row)
+            fields["alerting"] = fields["task_id"] in self.alerting
+            tasks.append(fields)
+        return {"type": "snapshot", "epoch": self.stream.epoch, "seq": self.stream.seq, "tasks": tasks}
+
+def feed_from_config(server: LocalSocketServer, config: dict | None = None) -> EventFeed:
+    cfg = config or load_user_config()
+    return EventFeed(server, cfg["db_path"], int(cfg.get("event_buffer_size", 1024)))
 
 # Basic service wrapper for Windows using pywin32
 if win32serviceutil:
@@ -129,8 +411,10 @@ if win32serviceutil:
             win32serviceutil.ServiceFramework.__init__(self, args)
             self.hWaitStop = win32event.CreateEvent(None, 0, 0, None)
             self._stop = threading.Event()
-            self.server = LocalSocketServer()
+            self.server = server_from_config()
             self.scheduler = Scheduler()
+            self.feed = feed_from_config(self.server, self.scheduler.config)
+            self.commands = ServiceProtocol(self.server, self.scheduler, self.feed)
             self._thread = None
 
         def SvcStop(self):
@@ -150,44 +434,37 @@ if win32serviceutil:
             servicemanager.LogMsg(servicemanager.EVENTLOG_INFORMATION_TYPE,
                                   servicemanager.PYS_SERVICE_STARTED,
                                   (self._svc_name_, ""))
-            # start socket server and scheduler
+            # start socket server and scheduler; task changes reach clients through the feed
+            self.commands.start()
             self.server.start()
+            self.feed.start()
             self.scheduler.start()
-
-            # poll loop: broadcast due tasks to connected clients
             try:
-                while not self._stop.is_set():
-                    now_ts = int(datetime.now(timezone.utc).timestamp())
-                    rows = list_pending_tasks()
-                    for t in rows:
-                        if t["end"] and t["end"].timestamp() <= now_ts and t["status"] != "done":
-                            payload = {
-                                "type": "alert",
-                                "task_id": t["id"],
-                                "uid": t["uid"],
-                                "title": t["title"],
-                                "start_ts": int(t["start"].timestamp()) if t["start"] else 0,
-                                "end_ts": int(t["end"].timestamp()) if t["end"] else 0,
-                                "red": 1 if t["red"] else 0
-                            }
-                            self.server.broadcast(payload)
-                    time.sleep(5)
+                self._stop.wait()
             finally:
-                self.server.stop()
                 self.scheduler.stop()
+                self.feed.stop()
+                self.server.stop()
+                self.commands.stop()
 
 # If not running as service (e.g., running on non-Windows), provide a simple main for testing
 def main():
-    srv = LocalSocketServer()
-    srv.start()
+    srv = server_from_config()
     sched = Scheduler()
+    feed = feed_from_config(srv, sched.config)
+    commands = ServiceProtocol(srv, sched, feed)
+    commands.start()
+    srv.start()
+    feed.start()
     sched.start()
     try:
         while True:
             time.sleep(1)
     except KeyboardInterrupt:
-        srv.stop()
         sched.stop()
+        feed.stop()
+        srv.stop()
+        commands.stop()
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,11 @@
 # utils package
-from .audio import play_once, RepeatingAlert  # noqa: F401
 from .logging import configure_logging  # noqa: F401
 from .time_utils import utc_now_ts  # noqa: F401
+
+
+def __getattr__(name):
+    # audio pulls in pygame; import it only when a caller actually wants sound
+    if name in ("play_once", "RepeatingAlert"):
+        from . import audio
+        return getattr(audio, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
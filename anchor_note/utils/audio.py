@@ -4,18 +4,28 @@ audio.py
 Small wrapper around pygame.mixer to:
 - play a sound once
 - run a repeating alert: play continuously for 'burst_seconds', stop, sleep repeat_interval_seconds, repeat until stopped
+
+All repeating alerts are driven by one shared AudioEngine thread:
+- decoded sounds are cached per file (reloaded only if the file changes)
+- alerts with the same sound/burst/interval/volume are coalesced into a single burst/repeat
+  cycle, so twenty overdue tasks play one sound, not twenty
+- burst ends and repeats come from a single timer queue; stopping the last alert of a
+  cycle silences it immediately
+- RepeatingAlert is a thin handle registering itself with the engine
 """
 
+import heapq
+import itertools
 import threading
 import time
 import os
 import logging
-import pygame
 
 LOG = logging.getLogger(__name__)
 
-# Initialize mixer lazily
+# Initialize mixer lazily (importing pygame alone costs ~150ms)
 def _ensure_mixer():
+    import pygame
     try:
         if not pygame.mixer.get_init():
             pygame.mixer.init()
@@ -26,73 +36,182 @@ def _ensure_mixer():
         except Exception:
             LOG.exception("pygame mixer init failed")
 
+_SOUNDS: dict[str, tuple[int, object]] = {}
+_SOUNDS_LOCK = threading.Lock()
+
+def load_sound(sound_path: str):
+    """Decoded pygame Sound for sound_path, cached until the file changes; None if unavailable."""
+    if not sound_path:
+        return None
+    try:
+        mtime = os.stat(sound_path).st_mtime_ns
+    except OSError:
+        LOG.warning("sound file not found: %s", sound_path)
+        return None
+    with _SOUNDS_LOCK:
+        cached = _SOUNDS.get(sound_path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        try:
+            _ensure_mixer()
+            import pygame
+            sound = pygame.mixer.Sound(sound_path)
+        except Exception:
+            LOG.exception("loading sound failed: %s", sound_path)
+            return None
+        _SOUNDS[sound_path] = (mtime, sound)
+        return sound
+
 def play_once(sound_path: str):
     """Play a single sound once (non-blocking)."""
-    if not sound_path or not os.path.exists(sound_path):
+    s = load_sound(sound_path)
+    if s is None:
         LOG.warning("play_once: sound file not found: %s", sound_path)
         return
     try:
-        _ensure_mixer()
-        s = pygame.mixer.Sound(sound_path)
         s.play()
     except Exception:
         LOG.exception("play_once failed")
 
-class RepeatingAlert:
-    def __init__(self, sound_file: str, burst_seconds: int = 30, repeat_interval_seconds: int = 120):
-        self.sound_file = sound_file
-        self.burst_seconds = int(burst_seconds)
-        self.repeat_interval_seconds = int(repeat_interval_seconds)
-        self._stop = threading.Event()
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        # preload sound if possible
-        try:
-            _ensure_mixer()
-            if sound_file and os.path.exists(sound_file):
-                self._sound = pygame.mixer.Sound(sound_file)
-            else:
-                self._sound = None
-        except Exception:
-            self._sound = None
 
-    def start(self):
-        if not self._thread.is_alive():
-            self._stop.clear()
-            self._thread = threading.Thread(target=self._run, daemon=True)
+class _Cycle:
+    """One burst/repeat cycle shared by every alert with the same key."""
+    __slots__ = ("key", "handles", "channel", "playing", "gen")
+
+    def __init__(self, key):
+        self.key = key          # (sound_file, burst_seconds, repeat_interval_seconds, volume)
+        self.handles = set()
+        self.channel = None
+        self.playing = False
+        self.gen = 0            # bumped on every state change; stale timers are ignored
+
+
+class AudioEngine:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._timers = []       # heap of (when, seq, key, gen)
+        self._seq = itertools.count()
+        self._cycles: dict[tuple, _Cycle] = {}
+        self._thread = None
+        self._stopped = False
+
+    def add(self, handle):
+        key = handle.key
+        with self._cond:
+            cyc = self._cycles.get(key)
+            if cyc is None:
+                cyc = self._cycles[key] = _Cycle(key)
+            cyc.handles.add(handle)
+            if not cyc.playing:
+                # a new alert is heard right away; alerts already waiting join this burst
+                self._start_burst(cyc, time.monotonic())
+            self._ensure_thread()
+            self._cond.notify()
+
+    def remove(self, handle):
+        with self._cond:
+            cyc = self._cycles.get(handle.key)
+            if cyc is None or handle not in cyc.handles:
+                return
+            cyc.handles.discard(handle)
+            if not cyc.handles:
+                del self._cycles[cyc.key]
+                cyc.gen += 1
+                self._halt(cyc)
+                self._cond.notify()
+
+    def active(self) -> int:
+        """Number of registered alerts across all cycles."""
+        with self._cond:
+            return sum(len(c.handles) for c in self._cycles.values())
+
+    def shutdown(self):
+        with self._cond:
+            self._stopped = True
+            for cyc in self._cycles.values():
+                self._halt(cyc)
+            self._cycles.clear()
+            self._timers.clear()
+            self._cond.notify()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    # internals, called with self._cond held
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, daemon=True, name="anchor-note-audio")
             self._thread.start()
 
-    def stop(self):
-        self._stop.set()
-        # stop playback
+    def _schedule(self, when, cyc):
+        heapq.heappush(self._timers, (when, next(self._seq), cyc.key, cyc.gen))
+
+    def _start_burst(self, cyc, now):
+        sound_file, burst, _, volume = cyc.key
+        sound = load_sound(sound_file)
+        cyc.channel = None
+        if sound is not None:
+            try:
+                cyc.channel = sound.play(loops=-1)  # loop during burst
+                if cyc.channel is not None:
+                    cyc.channel.set_volume(volume)  # per channel: cycles share the cached Sound
+            except Exception:
+                LOG.exception("sound play failed")
+        cyc.playing = True
+        cyc.gen += 1
+        self._schedule(now + burst, cyc)
+
+    def _halt(self, cyc):
+        cyc.playing = False
         try:
-            if self._sound:
-                self._sound.stop()
+            if cyc.channel is not None:
+                cyc.channel.stop()
         except Exception:
             pass
-        # wait a short time for thread to finish
-        if self._thread.is_alive():
-            self._thread.join(timeout=1)
+        cyc.channel = None
 
     def _run(self):
-        while not self._stop.is_set():
-            if self._sound:
-                try:
-                    self._sound.play(loops=-1)  # loop during burst
-                except Exception:
-                    LOG.exception("sound play failed")
-            # burst duration
-            for _ in range(self.burst_seconds):
-                if self._stop.is_set():
-                    break
-                time.sleep(1)
-            # stop burst
-            try:
-                if self._sound:
-                    self._sound.stop()
-            except Exception:
-                pass
-            # wait until next repeat or exit
-            for _ in range(self.repeat_interval_seconds):
-                if self._stop.is_set():
-                    break
-                time.sleep(1)
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    _, _, key, gen = heapq.heappop(self._timers)
+                    cyc = self._cycles.get(key)
+                    if cyc is None or cyc.gen != gen:
+                        continue
+                    if cyc.playing:
+                        # burst over: silence, then repeat after the interval
+                        self._halt(cyc)
+                        cyc.gen += 1
+                        self._schedule(now + key[2], cyc)
+                    else:
+                        self._start_burst(cyc, now)
+                timeout = self._timers[0][0] - now if self._timers else None
+                self._cond.wait(timeout)
+
+
+_ENGINE = AudioEngine()
+
+def get_engine() -> AudioEngine:
+    return _ENGINE
+
+
+class RepeatingAlert:
+    """Handle for one repeating alert; playback is done by the shared AudioEngine."""
+
+    def __init__(self, sound_file: str, burst_seconds: int = 30, repeat_interval_seconds: int = 120,
+                 engine: AudioEngine | None = None, volume: float = 1.0):
+        self.sound_file = sound_file
+        self.burst_seconds = max(0, int(burst_seconds))
+        self.repeat_interval_seconds = max(1, int(repeat_interval_seconds))
+        self.volume = min(1.0, max(0.0, float(volume)))
+        self.key = (sound_file, self.burst_seconds, self.repeat_interval_seconds, self.volume)
+        self._engine = engine or _ENGINE
+        load_sound(sound_file)  # decode now, outside the engine lock (cached afterwards)
+
+    def start(self):
+        self._engine.add(self)
+
+    def stop(self):
+        self._engine.remove(self)
@@ -0,0 +1,312 @@
+"""
+metrics.py
+
+In-process counters, gauges and histograms for the service's hot paths, exported as
+Prometheus text (optional local HTTP endpoint) or as a dict (the socket "stats" command).
+
+Recording is off unless enabled (setting "metrics_enabled"); while off, every
+inc/set/observe returns after one flag check and timed() hands back a shared no-op
+context manager, so the instrumented paths cost a function call.
+
+- counter(name, help) / gauge(name, help) / histogram(name, help, buckets) -> metric
+  (registered once, the same object is returned for the same name)
+- timed(hist, **labels) -> context manager observing the block's duration in seconds
+- instrument(hist, **labels) -> decorator doing the same for every call of a function
+- enable(flag) / enabled() -> switch recording on or off
+- render() -> Prometheus text exposition format
+- snapshot() -> {name: {"type", "help", "values": [...]}} for JSON
+- serve(host, port) -> start the HTTP endpoint (GET /metrics) on a daemon thread
+- configure(config) -> apply "metrics_enabled" / "metrics_port" (idempotent)
+"""
+
+import bisect
+import functools
+import logging
+import threading
+import time
+from contextlib import nullcontext
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                   60.0, 300.0)
+
+_enabled = False
+_REGISTRY: dict = {}
+_REGISTRY_LOCK = threading.Lock()
+_NOOP = nullcontext()
+
+
+def enable(flag: bool = True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _fmt_labels(key: tuple, extra: tuple = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _fmt_value(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self._values: dict = {}
+
+    def remove(self, **labels):
+        with self._lock:
+            self._values.pop(_key(labels), None)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def _samples(self):
+        with self._lock:
+            return [(k, v) for k, v in self._values.items()]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, value in self._samples():
+            lines.append(f"{self.name}{_fmt_labels(key)} {_fmt_value(value)}")
+        return lines
+
+    def snapshot(self) -> dict:
+        return {"type": self.type, "help": self.help,
+                "values": [{"labels": dict(k), "value": v} for k, v in self._samples()]}
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not _enabled:
+            return
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """Set directly, or backed by a callback evaluated at collection time."""
+
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[_key(labels)] = value
+
+    def set_function(self, fn, **labels):
+        # registered regardless of the flag: costs nothing until collected
+        with self._lock:
+            self._values[_key(labels)] = fn
+
+    def _samples(self):
+        out = []
+        for key, value in super()._samples():
+            if callable(value):
+                try:
+                    value = value()
+                except Exception:
+                    LOG.debug("gauge %s callback failed", self.name, exc_info=True)
+                    continue
+            out.append((key, value))
+        return out
+
+
+class _HistogramValue:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, n: int):
+        self.counts = [0] * n
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+
+    def observe(self, value: float, **labels):
+        if not _enabled:
+            return
+        key = _key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            h = self._values.get(key)
+            if h is None:
+                h = self._values[key] = _HistogramValue(len(self.buckets) + 1)
+            h.counts[idx] += 1
+            h.sum += value
+            h.count += 1
+
+    def _samples(self):
+        with self._lock:
+            return [(k, (list(h.counts), h.sum, h.count)) for k, h in self._values.items()]
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for key, (counts, total, count) in self._samples():
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_fmt_labels(key, (('le', _fmt_value(bound)),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(key)} {_fmt_value(total)}")
+            lines.append(f"{self.name}_count{_fmt_labels(key)} {count}")
+        return lines
+
+    def snapshot(self) -> dict:
+        values = []
+        for key, (counts, total, count) in self._samples():
+            values.append({"labels": dict(key), "count": count, "sum": total,
+                           "buckets": dict(zip([*map(_fmt_value, self.buckets), "+Inf"], counts))})
+        return {"type": self.type, "help": self.help, "buckets": list(self.buckets), "values": values}
+
+
+class _Timer:
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist, labels):
+        self.hist = hist
+        self.labels = labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(time.perf_counter() - self.t0, **self.labels)
+        return False
+
+
+def timed(hist: Histogram, **labels):
+    """Time a block into hist; a shared no-op while metrics are disabled."""
+    if not _enabled:
+        return _NOOP
+    return _Timer(hist, labels)
+
+
+def instrument(hist: Histogram, **labels):
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                hist.observe(time.perf_counter() - t0, **labels)
+        return wrapper
+    return decorate
+
+
+def _register(cls, name, help, **kwargs):
+    with _REGISTRY_LOCK:
+        metric = _REGISTRY.get(name)
+        if metric is None:
+            metric = _REGISTRY[name] = cls(name, help, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"metric {name} already registered as {metric.type}")
+        return metric
+
+
+def counter(name: str, help: str = "") -> Counter:
+    return _register(Counter, name, help)
+
+
+def gauge(name: str, help: str = "") -> Gauge:
+    return _register(Gauge, name, help)
+
+
+def histogram(name: str, help: str = "", buckets=DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, help, buckets=buckets)
+
+
+def _metrics():
+    with _REGISTRY_LOCK:
+        return sorted(_REGISTRY.values(), key=lambda m: m.name)
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics():
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+
+def snapshot() -> dict:
+    return {"enabled": _enabled, "metrics": {m.name: m.snapshot() for m in _metrics()}}
+
+
+def serve(host: str = "127.0.0.1", port: int = 9108):
+    """Serve render() at http://host:port/metrics from a daemon thread; returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            LOG.debug("metrics endpoint: " + fmt, *args)
+
+    server = ThreadingHTTPServer((host, int(port)), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="anchor-note-metrics").start()
+    LOG.info("metrics endpoint on http://%s:%d/metrics", host, server.server_address[1])
+    return server
+
+
+_SERVER = None
+_SERVER_LOCK = threading.Lock()
+
+
+def configure(config: dict):
+    """Enable/disable recording and start the HTTP endpoint once if metrics_port is set."""
+    global _SERVER
+    enable(config.get("metrics_enabled", False))
+    port = int(config.get("metrics_port", 0) or 0)
+    if not _enabled or not port:
+        return
+    with _SERVER_LOCK:
+        if _SERVER is not None:
+            if _SERVER.server_address[1] != port:
+                LOG.warning("metrics_port changed to %d; restart the service to move the endpoint", port)
+            return
+        try:
+            _SERVER = serve("127.0.0.1", port)
+        except OSError as exc:
+            LOG.error("metrics endpoint cannot listen on port %d: %s", port, exc)
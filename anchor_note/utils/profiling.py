@@ -0,0 +1,342 @@
+"""
+profiling.py
+
+Opt-in diagnosis for stalls in production: a slow-operation log and sampled
+cProfile/tracemalloc captures of the service loops. Both are off by default and can be
+switched at runtime (config, SIGUSR1/SIGUSR2 in the daemon, or the socket "profile"
+command).
+
+Slow-op log: code wraps DB calls, syncs and notifications in slow_op(name). While a
+threshold is set, an op that exceeds it is logged with the stack it was called from;
+an op that is *still running* past the threshold is logged once with the live stack of
+its thread (by a watchdog thread), so a hung notify() or a blocked SQLite call shows
+where it is stuck before it returns.
+
+Captures: loops wrap one iteration in sample(loop_name). After capture(n) the next n
+iterations of each loop are profiled; the cProfile stats (.prof, readable with pstats
+or snakeviz) and a tracemalloc diff of the same window (.mem.txt) are written to the
+profile directory.
+
+- slow_op(name, **context) -> context manager; slow_ops(name) -> decorator
+- sample(loop) -> context manager around one loop iteration
+- set_slow_threshold(ms) / capture(iterations, loops=None) / cancel_captures() / status()
+- configure(config) -> apply "profiling_slow_ms", "profiling_dir", "profiling_iterations"
+"""
+
+import functools
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from pathlib import Path
+
+LOG = logging.getLogger(__name__)
+SLOW_LOG = logging.getLogger("anchor_note.slow")
+
+_threshold = 0.0  # seconds; 0 = slow-op log off
+_armed = False    # a capture is pending or running
+_NOOP = nullcontext()
+
+_active: dict = {}  # op id -> [name, context, thread id, start, reported]
+_active_lock = threading.Lock()
+_ids = itertools.count()
+_watchdog = None
+
+_profile_dir = Path.home() / ".anchor_note" / "profiles"
+_default_iterations = 20
+_captures: dict = {}  # loop name -> _Capture
+_capture_lock = threading.Lock()
+_traced = False  # tracemalloc was started by capture(); stopped again once no capture is left
+
+
+def _caller_stack(skip: int) -> str:
+    return "".join(traceback.format_stack(sys._getframe(skip), limit=12))
+
+
+def _watch():
+    while True:
+        threshold = _threshold
+        if not threshold:
+            return
+        time.sleep(max(0.05, threshold / 2))
+        now = time.perf_counter()
+        with _active_lock:
+            stuck = [op for op in _active.values() if not op[4] and now - op[3] > threshold]
+            for op in stuck:
+                op[4] = True
+        frames = sys._current_frames() if stuck else {}
+        for name, context, tid, start, _ in stuck:
+            frame = frames.get(tid)
+            stack = "".join(traceback.format_stack(frame, limit=20)) if frame else "(thread gone)\n"
+            SLOW_LOG.warning("slow op %s %s still running after %.0f ms; thread stack:\n%s",
+                             name, context or "", (now - start) * 1000, stack)
+
+
+class _SlowOp:
+    __slots__ = ("name", "context", "op_id", "start")
+
+    def __init__(self, name, context):
+        self.name = name
+        self.context = context
+
+    def __enter__(self):
+        self.op_id = next(_ids)
+        self.start = time.perf_counter()
+        with _active_lock:
+            _active[self.op_id] = [self.name, self.context, threading.get_ident(), self.start, False]
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _active_lock:
+            op = _active.pop(self.op_id, None)
+        threshold = _threshold
+        if threshold and elapsed > threshold:
+            reported = op is not None and op[4]
+            SLOW_LOG.warning("slow op %s %s took %.0f ms (threshold %.0f ms)%s", self.name, self.context or "",
+                             elapsed * 1000, threshold * 1000,
+                             "" if reported else "; called from:\n" + _caller_stack(2))
+        return False
+
+
+def slow_op(name: str, **context):
+    """Time a block for the slow-op log; a shared no-op while the log is off."""
+    if not _threshold:
+        return _NOOP
+    return _SlowOp(name, context)
+
+
+def slow_ops(name: str):
+    """Decorator form of slow_op for every call of a function."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _threshold:
+                return fn(*args, **kwargs)
+            with _SlowOp(name, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def set_slow_threshold(ms: float):
+    """Log ops slower than ms milliseconds (0 turns the slow-op log off)."""
+    global _threshold, _watchdog
+    _threshold = max(0.0, float(ms or 0)) / 1000.0
+    if _threshold and (_watchdog is None or not _watchdog.is_alive()):
+        _watchdog = threading.Thread(target=_watch, daemon=True, name="anchor-note-slow-ops")
+        _watchdog.start()
+    LOG.info("slow-op log %s", f"on (threshold {ms:g} ms)" if _threshold else "off")
+
+
+LOOPS = ("scheduler", "sync", "socket", "commands")  # names passed to sample() by the service
+CAPTURE_TIMEOUT = 300.0  # a loop that stays idle this long is dumped with what it has so far
+
+
+class _Capture:
+    def __init__(self, loop: str, iterations: int, out_dir: Path):
+        self.loop = loop
+        self.iterations = iterations
+        self.remaining = iterations
+        self.running = 0
+        self.finished = False
+        self.expired = False
+        self.out_dir = out_dir
+        self.profiles = {}  # thread id -> cProfile.Profile (sync runs on several worker threads)
+        self.lock = threading.Lock()
+        self.mem_before = None
+
+    def dump(self) -> Path:
+        import pstats
+        import tracemalloc
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = self.out_dir / f"{self.loop}-{stamp}-{os.getpid()}"
+        profiles = list(self.profiles.values())
+        stats = pstats.Stats(profiles[0])
+        for prof in profiles[1:]:
+            stats.add(prof)
+        stats.dump_stats(str(base) + ".prof")
+        if self.mem_before is not None and tracemalloc.is_tracing():
+            diff = tracemalloc.take_snapshot().compare_to(self.mem_before, "lineno")
+            with open(str(base) + ".mem.txt", "w", encoding="utf-8") as fh:
+                fh.write(f"# tracemalloc diff over {self.iterations} iterations of {self.loop}\n")
+                fh.writelines(f"{stat}\n" for stat in diff[:50])
+        LOG.info("profile of %d %s iterations written to %s.prof", self.iterations, self.loop, base)
+        return base
+
+
+def capture(iterations: int | None = None, loops=None, out_dir=None, timeout: float = CAPTURE_TIMEOUT) -> list:
+    """Profile the next `iterations` iterations of each loop (default: all of LOOPS)."""
+    global _armed, _traced
+    import tracemalloc
+
+    n = max(1, int(iterations or _default_iterations))
+    target = Path(out_dir).expanduser() if out_dir else _profile_dir
+    with _capture_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+            _traced = True
+    mem_before = tracemalloc.take_snapshot()
+    started = []
+    with _capture_lock:
+        for loop in (loops or LOOPS):
+            if loop not in _captures:
+                cap = _captures[loop] = _Capture(loop, n, target)
+                cap.mem_before = mem_before
+                started.append(cap)
+        _armed = True
+        armed = sorted(_captures)
+    timer = threading.Timer(timeout, _expire, args=(started,))
+    timer.daemon = True
+    timer.start()
+    return armed
+
+
+def _expire(caps):
+    for cap in caps:
+        with cap.lock:
+            if cap.finished:
+                continue
+            cap.expired = True
+            cap.iterations -= cap.remaining
+            cap.remaining = 0
+            if cap.running:
+                continue  # the iteration in flight finishes it
+            cap.finished = True
+        _finish(cap)
+
+
+def _finish(cap: _Capture):
+    global _armed
+    with _capture_lock:
+        if _captures.get(cap.loop) is cap:
+            del _captures[cap.loop]
+        _armed = bool(_captures)
+        last = not _captures
+    try:
+        if cap.profiles:
+            cap.dump()
+    except Exception:
+        LOG.exception("writing profile for %s failed", cap.loop)
+    if last:
+        _stop_tracing()
+
+
+def _stop_tracing():
+    """Stop tracemalloc if capture() started it and no capture needs it any more."""
+    global _traced
+    import tracemalloc
+
+    with _capture_lock:
+        if not _traced or _captures:
+            return
+        _traced = False
+    tracemalloc.stop()
+
+
+class _Sample:
+    """Profiles one iteration; never raises into the loop it wraps.
+
+    On Python 3.12+ cProfile sits on sys.monitoring, which allows one active profiler
+    per process: while another loop's iteration is being profiled, enable() raises
+    ValueError and this iteration runs unprofiled (it isn't counted, so the capture
+    still collects its iterations, or expires)."""
+
+    __slots__ = ("cap", "prof")
+
+    def __init__(self, cap):
+        self.cap = cap
+        self.prof = None
+
+    def __enter__(self):
+        cap = self.cap
+        with cap.lock:
+            if cap.remaining <= 0:
+                return self
+            cap.remaining -= 1
+            cap.running += 1
+        try:
+            import cProfile
+
+            tid = threading.get_ident()
+            prof = cap.profiles.get(tid) or cProfile.Profile()
+            prof.enable()
+            with cap.lock:
+                cap.profiles[tid] = prof
+        except Exception as exc:
+            LOG.debug("not profiling this %s iteration: %s", cap.loop, exc)
+            with cap.lock:
+                if not cap.expired:
+                    cap.remaining += 1
+                cap.running -= 1
+            self._maybe_finish()
+            return self
+        self.prof = prof
+        return self
+
+    def __exit__(self, *exc):
+        if self.prof is None:
+            return False
+        try:
+            self.prof.disable()
+        except Exception:
+            LOG.debug("disabling profiler failed", exc_info=True)
+        with self.cap.lock:
+            self.cap.running -= 1
+        self._maybe_finish()
+        return False
+
+    def _maybe_finish(self):
+        cap = self.cap
+        with cap.lock:
+            done = cap.remaining <= 0 and cap.running == 0 and not cap.finished
+            if done:
+                cap.finished = True
+        if done:
+            _finish(cap)
+
+
+def sample(loop: str):
+    """Wrap one iteration of a loop; profiled only while a capture is armed for it."""
+    if not _armed:
+        return _NOOP
+    with _capture_lock:
+        cap = _captures.get(loop)
+    return _NOOP if cap is None else _Sample(cap)
+
+
+def cancel_captures():
+    """Drop pending captures without writing them, and stop the tracing they started."""
+    global _armed
+    with _capture_lock:
+        caps = list(_captures.values())
+        _captures.clear()
+        _armed = False
+    for cap in caps:
+        with cap.lock:
+            cap.finished = True  # an iteration still in flight doesn't write a profile
+    _stop_tracing()
+
+
+def status() -> dict:
+    with _capture_lock:
+        captures = {k: c.remaining for k, c in _captures.items()}
+    with _active_lock:
+        running = len(_active)
+    return {"slow_ms": _threshold * 1000, "captures": captures, "ops_in_flight": running,
+            "profile_dir": str(_profile_dir)}
+
+
+def configure(config: dict):
+    global _profile_dir, _default_iterations
+    _profile_dir = Path(config.get("profiling_dir") or _profile_dir).expanduser()
+    _default_iterations = max(1, int(config.get("profiling_iterations", 20) or 20))
+    ms = float(config.get("profiling_slow_ms", 0) or 0)
+    if ms != _threshold * 1000:
+        set_slow_threshold(ms)
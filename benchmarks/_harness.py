@@ -0,0 +1,178 @@
+"""
+_harness.py
+
+Shared helpers for the benchmark scripts (stdlib only, runs offline).
+
+- Bench(name) -> collects per-operation latencies; report() prints one JSON line with
+  throughput, p50/p99 latency (ms) and the process's peak RSS
+- FakeClock -> deterministic time()/monotonic()/sleep() for scheduler benchmarks
+- headless_alerts() -> replaces desktop notifications and sound with a recorder
+- temp_db() -> path of a fresh tasks DB in a temporary directory
+- write_ics(path, n, recurring=0.0) -> synthetic calendar with n events
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))  # run against the working tree, installed or not
+
+
+def peak_rss_mb() -> float | None:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+class Bench:
+    """Times operations for one benchmark case."""
+
+    def __init__(self, name: str, **params):
+        self.name = name
+        self.params = params
+        self.latencies = []
+        self.ops = 0
+        self.elapsed = 0.0
+
+    @contextlib.contextmanager
+    def op(self, count: int = 1):
+        """Time one operation that processes `count` items."""
+        t0 = time.perf_counter()
+        yield
+        dt = time.perf_counter() - t0
+        self.latencies.append(dt)
+        self.elapsed += dt
+        self.ops += count
+
+    def report(self, **extra) -> dict:
+        result = {
+            "bench": self.name,
+            **self.params,
+            "ops": self.ops,
+            "seconds": round(self.elapsed, 4),
+            "ops_per_sec": round(self.ops / self.elapsed, 1) if self.elapsed else None,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 3),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 3),
+            "peak_rss_mb": peak_rss_mb(),
+            **extra,
+        }
+        print(json.dumps(result), flush=True)
+        return result
+
+
+class FakeClock:
+    """Stand-in for the `time` module: time only moves when advance() is called."""
+
+    def __init__(self, start: float | None = None):
+        self.now = float(start if start is not None else time.time())
+        self._mono = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self._mono
+
+    def perf_counter(self) -> float:
+        return time.perf_counter()
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def advance(self, seconds: float):
+        self.now += seconds
+        self._mono += seconds
+
+
+@contextlib.contextmanager
+def headless_alerts():
+    """Route Scheduler alerts to a list instead of plyer/pygame; yields that list."""
+    from anchor_note.core import scheduler
+
+    fired = []
+    saved = scheduler.notify_and_alert, scheduler.stop_alert_for_task
+    scheduler.notify_and_alert = lambda task_id, title, red, config=None, repeat=False: fired.append(task_id)
+    scheduler.stop_alert_for_task = lambda task_id: True
+    try:
+        yield fired
+    finally:
+        scheduler.notify_and_alert, scheduler.stop_alert_for_task = saved
+
+
+@contextlib.contextmanager
+def temp_db():
+    from anchor_note.core.db import close_connections
+    from anchor_note.core.scheduler import _ensure_db
+
+    with tempfile.TemporaryDirectory(prefix="anchor-bench-") as d:
+        path = os.path.join(d, "tasks.db")
+        _ensure_db(path)
+        try:
+            yield path
+        finally:
+            close_connections(path)
+
+
+def _ics_dt(dt: datetime) -> str:
+    return dt.strftime("%Y%m%dT%H%M%SZ")
+
+
+def write_ics(path, n: int, recurring: float = 0.0, seed: int = 0, start: datetime | None = None) -> Path:
+    """Write a calendar with n events spread over the next 30 days.
+
+    A `recurring` fraction of them are DAILY/WEEKLY series; one in ten titles is a
+    red-alert keyword ("take pill")."""
+    rnd = random.Random(seed)
+    base = (start or datetime.now(timezone.utc)).replace(microsecond=0)
+    stamp = _ics_dt(base)
+    p = Path(path)
+    with p.open("w", encoding="utf-8", newline="") as fh:
+        fh.write("BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//anchor-note//bench//EN\r\n")
+        for i in range(n):
+            begin = base + timedelta(minutes=rnd.randrange(0, 30 * 24 * 60))
+            end = begin + timedelta(minutes=rnd.choice((15, 30, 60)))
+            title = "take pill" if i % 10 == 0 else f"event {i}"
+            lines = ["BEGIN:VEVENT", f"UID:bench-{seed}-{i}@anchor-note", f"DTSTAMP:{stamp}",
+                     f"DTSTART:{_ics_dt(begin)}", f"DTEND:{_ics_dt(end)}", f"SUMMARY:{title}"]
+            if rnd.random() < recurring:
+                lines.append(rnd.choice(("RRULE:FREQ=DAILY;COUNT=30", "RRULE:FREQ=WEEKLY;BYDAY=MO,WE,FR")))
+            lines.append("END:VEVENT")
+            fh.write("\r\n".join(lines) + "\r\n")
+        fh.write("END:VCALENDAR\r\n")
+    return p
+
+
+def parse_args(description: str, default_sizes: str, argv=None, full_size: int | None = None):
+    """--sizes, plus --full (append full_size, the slow largest tier) where the script has one."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--sizes", default=default_sizes,
+                        help=f"comma-separated problem sizes (default: {default_sizes})")
+    if full_size:
+        parser.add_argument("--full", action="store_true",
+                            help=f"also run the {full_size:,} tier (slow: minutes, up to about 1 GB of RAM)")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s.replace("_", "")) for s in str(args.sizes).split(",") if s.strip()]
+    if full_size and args.full and full_size not in args.sizes:
+        args.sizes.append(full_size)
+    return args
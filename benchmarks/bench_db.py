@@ -0,0 +1,65 @@
+"""
+bench_db.py
+
+Tasks DB helpers: single-row upsert_task, bulk upsert_tasks, get_pending_tasks, paged
+query_tasks and the cached checklist view.
+
+    python benchmarks/bench_db.py --sizes 1000,100000
+    python benchmarks/bench_db.py --full            # adds the 1,000,000-row tier
+"""
+
+import time
+
+from _harness import Bench, parse_args, temp_db
+
+
+def run(sizes):
+    from anchor_note.core import scheduler
+    from anchor_note.core.checklist import TaskView
+
+    for n in sizes:
+        now = int(time.time())
+        rows = [(f"bench-{i}", f"event {i}", now + i * 60, now + i * 60 + 1800, int(i % 10 == 0))
+                for i in range(n)]
+        with temp_db() as db:
+            single = Bench("upsert_task", rows=n)
+            for row in rows[:min(n, 5000)]:  # one transaction each; capped to keep runs short
+                with single.op():
+                    scheduler.upsert_task(db, *row)
+            single.report()
+
+            bulk = Bench("upsert_tasks", rows=n)
+            with bulk.op(n):
+                scheduler.upsert_tasks(db, rows, chunk_size=500)
+            bulk.report()
+
+            pending = Bench("get_pending_tasks", rows=n)
+            for _ in range(5):
+                with pending.op():
+                    scheduler.get_pending_tasks(db)
+            pending.report()
+
+            paged = Bench("query_tasks.page", rows=n, limit=100)
+            cursor = None
+            for _ in range(min(50, n // 100 + 1)):
+                with paged.op():
+                    _, cursor = scheduler.query_tasks(db, due_from=1, limit=100, cursor=cursor)
+                if cursor is None:
+                    break
+            paged.report()
+
+            view = TaskView(db)
+            view.snapshot()
+            cached = Bench("TaskView.count_pending.cached", rows=n)
+            for _ in range(1000):
+                with cached.op():
+                    view.count_pending()
+            cached.report()
+
+
+def main(argv=None):
+    run(parse_args(__doc__.strip().splitlines()[2], "1000,100000", argv, full_size=1_000_000).sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+bench_import.py
+
+Cold import time of the CLI entry point, measured with `python -X importtime` in fresh
+interpreters. Exits 1 when the median exceeds --budget-ms, so it can gate CI.
+
+    python benchmarks/bench_import.py --budget-ms 150 --module anchor_note.platform.cli
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+from _harness import ROOT, percentile
+
+
+def import_us(module: str) -> int:
+    """Cumulative import time of module in microseconds, from one fresh interpreter."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True, check=True)
+    for line in proc.stderr.splitlines():
+        parts = [p.strip() for p in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1])
+    raise RuntimeError(f"no importtime line for {module}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="CLI import-time check")
+    parser.add_argument("--module", default="anchor_note.platform.cli")
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--budget-ms", type=float, default=150.0)
+    args = parser.parse_args(argv)
+    samples = [import_us(args.module) / 1000.0 for _ in range(args.runs)]
+    p50 = percentile(samples, 50)
+    print(json.dumps({"bench": "import", "module": args.module, "runs": args.runs,
+                      "p50_ms": round(p50, 1), "max_ms": round(max(samples), 1),
+                      "budget_ms": args.budget_ms, "ok": p50 <= args.budget_ms}), flush=True)
+    return 0 if p50 <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
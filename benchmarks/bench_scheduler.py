@@ -0,0 +1,60 @@
+"""
+bench_scheduler.py
+
+The Scheduler's deadline loop under a fake clock: seeding deadlines from the DB, then
+firing them one simulated minute at a time with notifications/sound stubbed out. Each
+op is one loop iteration (_fire_due), which is what runs whenever a deadline passes.
+
+    python benchmarks/bench_scheduler.py --sizes 1000,100000
+    python benchmarks/bench_scheduler.py --full     # adds the 1,000,000-task tier
+"""
+
+import logging
+
+from _harness import Bench, FakeClock, headless_alerts, parse_args, temp_db
+
+TICK_SECONDS = 60
+
+
+def run(sizes):
+    from anchor_note.core import scheduler
+    from anchor_note.core.settings import DEFAULT_CONFIG
+
+    logging.getLogger(scheduler.__name__).setLevel(logging.ERROR)
+
+    for n in sizes:
+        clock = FakeClock()
+        start = int(clock.time())
+        span = max(TICK_SECONDS, n // 10 * TICK_SECONDS)  # ~10 tasks due per simulated minute
+        rows = [(f"bench-{i}", f"event {i}", start, start + 1 + i * span // n, int(i % 10 == 0))
+                for i in range(n)]
+        with temp_db() as db, headless_alerts() as fired:
+            scheduler.upsert_tasks(db, rows, chunk_size=500)
+            # red alerts still repeat, but stop after a few (alert_max_repeats): left ringing, every
+            # red task fired so far would repeat each tick and the run would grow quadratically.
+            # Escalation is off and the cap's warnings are muted to keep log lines out of the report.
+            sched = scheduler.Scheduler(dict(DEFAULT_CONFIG, db_path=db, escalate_after_repeats=0,
+                                             alert_max_repeats=3))
+            real_time, scheduler.time = scheduler.time, clock
+            try:
+                seed = Bench("Scheduler._load_deadlines", tasks=n)
+                with seed.op(n):
+                    sched._load_deadlines()
+                seed.report()
+
+                loop = Bench("Scheduler._fire_due", tasks=n, tick_s=TICK_SECONDS)
+                while len(sched._alerts) < n:  # red alerts also repeat; count distinct tasks
+                    clock.advance(TICK_SECONDS)
+                    with loop.op():
+                        sched._fire_due()
+                loop.report(alerts=len(fired), tasks_alerted=len(sched._alerts), simulated_hours=round((clock.time() - start) / 3600, 1))
+            finally:
+                scheduler.time = real_time
+
+
+def main(argv=None):
+    run(parse_args(__doc__.strip().splitlines()[2], "1000,100000", argv, full_size=1_000_000).sizes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+bench_socket.py
+
+LocalSocketServer.broadcast fan-out to N connected clients. The clients are drained by
+one selector thread in this process; an op is one broadcast until every client has
+received the line (fan-out latency).
+
+    python benchmarks/bench_socket.py --sizes 1,10,100 --messages 2000
+"""
+
+import selectors
+import socket
+import threading
+import time
+
+from _harness import Bench, parse_args
+
+
+class _Readers(threading.Thread):
+    """Reads every client socket and counts complete lines per client."""
+
+    def __init__(self, socks):
+        super().__init__(daemon=True)
+        self.sel = selectors.DefaultSelector()
+        self.counts = {s: 0 for s in socks}
+        self.cond = threading.Condition()
+        self.done = False
+        for s in socks:
+            s.setblocking(False)
+            self.sel.register(s, selectors.EVENT_READ)
+
+    def min_count(self) -> int:
+        return min(self.counts.values())
+
+    def run(self):
+        while not self.done:
+            for key, _ in self.sel.select(0.2):
+                try:
+                    data = key.fileobj.recv(1 << 16)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    self.sel.unregister(key.fileobj)
+                    continue
+                with self.cond:
+                    self.counts[key.fileobj] += data.count(b"\n")
+                    self.cond.notify_all()
+
+    def wait_for(self, n: int, timeout: float = 30.0) -> bool:
+        with self.cond:
+            return self.cond.wait_for(lambda: self.min_count() >= n, timeout)
+
+
+def run(sizes, messages: int):
+    from anchor_note.platform.windows_service_socket import LocalSocketServer
+
+    payload = {"type": "alert", "task_id": 1, "title": "take pill", "end_ts": int(time.time()), "red": 1}
+    for n in sizes:
+        server = LocalSocketServer("127.0.0.1", 0, max_queue_bytes=64 << 20)
+        server.start()
+        server.ready.wait(5)
+        port = server.sock.getsockname()[1]
+        socks = [socket.create_connection(("127.0.0.1", port)) for _ in range(n)]
+        deadline = time.monotonic() + 10
+        while len(server.clients) < n and time.monotonic() < deadline:
+            time.sleep(0.01)
+        readers = _Readers(socks)
+        readers.start()
+        try:
+            latency = Bench("broadcast.fanout", clients=n)
+            for i in range(1, min(messages, 500) + 1):
+                with latency.op(n):
+                    server.broadcast(dict(payload, seq=i))
+                    readers.wait_for(i)
+            latency.report()
+
+            base = readers.min_count()
+            burst = Bench("broadcast.burst", clients=n, messages=messages)
+            with burst.op(messages * n):
+                for i in range(messages):
+                    server.broadcast(dict(payload, seq=i))
+                ok = readers.wait_for(base + messages, timeout=60)
+            burst.report(delivered=ok)
+        finally:
+            readers.done = True
+            for s in socks:
+                s.close()
+            server.stop()
+            server.join(2)
+
+
+def main(argv=None):
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(add_help=False)
+    parser.add_argument("--messages", type=int, default=2000)
+    known, rest = parser.parse_known_args(argv)
+    run(parse_args(__doc__.strip().splitlines()[2], "1,10,100", rest).sizes, known.messages)
+
+
+if __name__ == "__main__":
+    main()
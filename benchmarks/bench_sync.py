@@ -0,0 +1,46 @@
+"""
+bench_sync.py
+
+sync_from_ics throughput on synthetic calendars: a cold import into an empty DB, then
+a forced re-sync of the unchanged file (parse + etag compare, no writes).
+
+    python benchmarks/bench_sync.py --sizes 1000,100000,1000000 --recurring 0,0.5
+    python benchmarks/bench_sync.py --full          # default sizes plus the 1,000,000-event tier
+"""
+
+import os
+import tempfile
+
+from _harness import Bench, parse_args, temp_db, write_ics
+
+
+def run(sizes, recurring_ratios):
+    from anchor_note.core.calendar_sync import sync_from_ics
+
+    for n in sizes:
+        for ratio in recurring_ratios:
+            with tempfile.TemporaryDirectory(prefix="anchor-bench-") as d, temp_db() as db:
+                ics = write_ics(os.path.join(d, "bench.ics"), n, recurring=ratio)
+                size_mb = round(ics.stat().st_size / (1 << 20), 2)
+                cold = Bench("sync_from_ics.cold", events=n, recurring=ratio)
+                with cold.op(n):
+                    sync_from_ics(str(ics), db_path=db, chunk_size=500, recurrence_days=14)
+                cold.report(file_mb=size_mb)
+                warm = Bench("sync_from_ics.unchanged", events=n, recurring=ratio)
+                with warm.op(n):
+                    sync_from_ics(str(ics), db_path=db, chunk_size=500, recurrence_days=14, force=True)
+                warm.report(file_mb=size_mb)
+
+
+def main(argv=None):
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(add_help=False)
+    parser.add_argument("--recurring", default="0,0.5")
+    known, rest = parser.parse_known_args(argv)
+    args = parse_args(__doc__.strip().splitlines()[2], "1000,100000", rest, full_size=1_000_000)
+    run(args.sizes, [float(r) for r in known.recurring.split(",")])
+
+
+if __name__ == "__main__":
+    main()
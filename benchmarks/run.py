@@ -0,0 +1,63 @@
+"""
+run.py
+
+Runs every benchmark script in its own interpreter (so peak RSS is per script) and
+writes the JSON result lines to stdout or --out.
+
+    python benchmarks/run.py                # default sizes
+    python benchmarks/run.py --quick        # small sizes, for a smoke run
+    python benchmarks/run.py --full         # default sizes plus the 1,000,000-row tiers (slow)
+    python benchmarks/run.py --out results.jsonl
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+QUICK = {
+    "bench_sync.py": ["--sizes", "1000", "--recurring", "0,0.5"],
+    "bench_db.py": ["--sizes", "1000"],
+    "bench_scheduler.py": ["--sizes", "1000"],
+    "bench_socket.py": ["--sizes", "1,10", "--messages", "500"],
+    "bench_import.py": ["--runs", "3"],
+}
+FULL = {  # scripts with a 1,000,000-row tier behind their --full flag
+    "bench_sync.py": ["--full"],
+    "bench_db.py": ["--full"],
+    "bench_scheduler.py": ["--full"],
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the anchor-note benchmarks")
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument("--full", action="store_true", help="include the 1,000,000-row tiers")
+    parser.add_argument("--out", help="append JSON lines to this file")
+    parser.add_argument("only", nargs="*", help="script names to run (default: all)")
+    args = parser.parse_args(argv)
+    scripts = args.only or sorted(p.name for p in HERE.glob("bench_*.py"))
+    failed = 0
+    lines = []
+    for name in scripts:
+        cmd = [sys.executable, str(HERE / name)] + (QUICK.get(name, []) if args.quick else [])
+        if args.full:
+            cmd += FULL.get(name, [])
+        print(f"# {name}", file=sys.stderr, flush=True)
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        out = [l for l in proc.stdout.splitlines() if l.startswith("{")]
+        lines += out
+        print("\n".join(out), flush=True)
+        if proc.returncode:
+            failed += 1
+            print(f"# {name} exited {proc.returncode}\n{proc.stderr[-2000:]}", file=sys.stderr)
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as fh:
+            fh.write("".join(l + "\n" for l in lines))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
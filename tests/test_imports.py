@@ -0,0 +1,38 @@
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP = "import anchor_note, anchor_note.core, anchor_note.utils, anchor_note.platform.cli"
+# loaded on first use only (the first alert, sync or scheduler start), never by the imports above
+HEAVY = ("anchor_note.core.scheduler", "anchor_note.core.db", "anchor_note.core.alerts",
+         "anchor_note.core.calendar_sync", "anchor_note.utils.audio", "sqlite3",
+         "pygame", "plyer", "ics", "caldav", "googleapiclient", "dateutil")
+IMPORT_BUDGET_MS = 100  # about 15 ms on a desktop; leaves room for slow ARM devices and CI noise
+
+
+def _python(*args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, *args], capture_output=True, text=True, env=env, check=True)
+
+
+def test_startup_imports_no_heavy_modules():
+    out = _python("-c", f"{STARTUP}; import sys; print('\\n'.join(sys.modules))").stdout.split()
+    assert [m for m in HEAVY if m in out] == []
+
+
+def _import_ms() -> float:
+    # -X importtime: "import time: self [us] | cumulative | name", nested imports indented;
+    # the package's top-level entries include everything they pulled in (site etc. excluded)
+    total = 0
+    for line in _python("-X", "importtime", "-c", STARTUP).stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \| anchor_note", line)
+        if m:
+            total += int(m.group(1))
+    return total / 1000
+
+
+def test_startup_import_time_budget():
+    best = min(_import_ms() for _ in range(3))
+    assert best < IMPORT_BUDGET_MS, f"importing the package and CLI took {best:.1f} ms"
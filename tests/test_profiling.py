@@ -0,0 +1,39 @@
+import tracemalloc
+
+import pytest
+
+from anchor_note.utils import profiling
+
+
+@pytest.fixture(autouse=True)
+def no_captures():
+    yield
+    profiling.cancel_captures()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_capture_writes_profile_and_stops_tracing(tmp_path):
+    profiling.capture(2, loops=["test"], out_dir=tmp_path)
+    assert tracemalloc.is_tracing()
+    for _ in range(2):
+        with profiling.sample("test"):
+            sum(range(1000))
+    assert list(tmp_path.glob("test-*.prof"))
+    assert not tracemalloc.is_tracing()
+
+
+def test_cancel_stops_tracing_it_started(tmp_path):
+    profiling.capture(5, loops=["test"], out_dir=tmp_path)
+    with profiling.sample("test"):  # in flight while cancelled: no profile written
+        profiling.cancel_captures()
+    assert not tracemalloc.is_tracing()
+    assert profiling.status()["captures"] == {}
+    assert not list(tmp_path.iterdir())
+
+
+def test_cancel_leaves_foreign_tracing_alone(tmp_path):
+    tracemalloc.start()
+    profiling.capture(5, loops=["test"], out_dir=tmp_path)
+    profiling.cancel_captures()
+    assert tracemalloc.is_tracing()
@@ -0,0 +1,68 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from anchor_note.core import scheduler
+from anchor_note.core.settings import DEFAULT_CONFIG
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def fired(monkeypatch):
+    """task title -> threading.Event set when the Scheduler alerts for it (no desktop/audio)."""
+    events = {}
+
+    def fake_notify(task_id, title, red_flag, config=None, repeat=False):
+        events.setdefault(title, threading.Event()).set()
+
+    monkeypatch.setattr(scheduler, "notify_and_alert", fake_notify)
+    return lambda title: events.setdefault(title, threading.Event())
+
+
+@pytest.fixture
+def sched(tmp_path):
+    config = dict(DEFAULT_CONFIG, db_path=str(tmp_path / "tasks.db"), ics_path="", db_watch_seconds=0.2)
+    s = scheduler.Scheduler(config)
+    s.start()
+    yield s
+    s.stop()
+
+
+def test_fires_task_upserted_in_process(sched, fired):
+    now = int(time.time())
+    scheduler.upsert_task(sched.db_path, "local", "Local", now, now + 1)
+    assert fired("Local").wait(5)
+
+
+def test_fires_task_written_by_another_process(sched, fired):
+    now = int(time.time())
+    code = ("import sys; from anchor_note.core.scheduler import upsert_task; "
+            "upsert_task(sys.argv[1], 'ext', 'External', int(sys.argv[2]), int(sys.argv[2]) + 2)")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, "-c", code, sched.db_path, str(now)], check=True, env=env)
+    assert fired("External").wait(5)
+
+
+def test_alerted_task_moved_later_fires_again(sched, fired):
+    now = int(time.time())
+    scheduler.upsert_task(sched.db_path, "moving", "Before", now, now + 1)
+    assert fired("Before").wait(5)
+    scheduler.upsert_task(sched.db_path, "moving", "After", now, int(time.time()) + 1)
+    assert fired("After").wait(5)
+
+
+def test_tasks_changed_since_tracks_upserts(tmp_path):
+    db = str(tmp_path / "tasks.db")
+    scheduler._ensure_db(db)
+    scheduler.upsert_tasks(db, [("a", "A", 1, 100, 0), ("b", "B", 1, 200, 0)])
+    rows, rev = scheduler.tasks_changed_since(db, 0)
+    assert sorted(r[1] for r in rows) == ["a", "b"]
+    assert scheduler.tasks_changed_since(db, rev) == ([], rev)
+    scheduler.upsert_task(db, "a", "A", 1, 300)
+    rows, _ = scheduler.tasks_changed_since(db, rev)
+    assert [(r[1], r[4]) for r in rows] == [("a", 300)]
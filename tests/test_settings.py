@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from anchor_note.core import scheduler, settings
+from anchor_note.core.settings import DEFAULT_CONFIG, ConfigService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"db_path": str(tmp_path / "tasks.db"), "ics_path": ""}))
+    svc = ConfigService(path)
+    monkeypatch.setattr(settings, "_SERVICE", svc)
+    yield svc
+    svc.stop_watching()
+
+
+def test_load_user_config_returns_a_private_copy(service):
+    cfg = settings.load_user_config()
+    cfg["check_interval_seconds"] = 1
+    cfg["sync_sources"].append({"type": "ics", "path": "x.ics"})
+    fresh = settings.load_user_config()
+    assert fresh["check_interval_seconds"] == DEFAULT_CONFIG["check_interval_seconds"]
+    assert fresh["sync_sources"] == []
+
+
+def test_null_switches_off_optional_paths(service, tmp_path):
+    service.path.write_text(json.dumps({"ics_path": None, "escalation_command": None, "db_path": None}))
+    cfg = settings.reload_config()
+    assert cfg["ics_path"] is None
+    assert cfg["escalation_command"] is None
+    assert cfg["db_path"] == DEFAULT_CONFIG["db_path"]  # not optional: mistyped, default kept
+
+
+def test_scheduler_follows_config_only_when_asked(service, tmp_path):
+    followed = scheduler.Scheduler(follow_config=True)
+    pinned = scheduler.Scheduler(settings.load_user_config())  # equal to the file, but a caller's own copy
+    followed.start()
+    pinned.start()
+    try:
+        data = json.loads(service.path.read_text())
+        service.path.write_text(json.dumps(dict(data, red_alert_repeat_seconds=45)))
+        service.reload()
+        assert followed.config["red_alert_repeat_seconds"] == 45
+        assert pinned.config["red_alert_repeat_seconds"] == DEFAULT_CONFIG["red_alert_repeat_seconds"]
+    finally:
+        followed.stop()
+        pinned.stop()